@@ -0,0 +1,52 @@
+"""add attendance daily rollups
+
+Revision ID: 3b7d2c9e4f10
+Revises: e1fa3f829298
+Create Date: 2026-10-17 10:12:41.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7d2c9e4f10'
+down_revision: Union[str, None] = 'e1fa3f829298'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Reuse the existing attendancestatus enum type on PostgreSQL
+    attendance_status = postgresql.ENUM(
+        'PRESENT', 'ABSENT', 'LATE', 'EXCUSED', name='attendancestatus', create_type=False
+    )
+    op.create_table('attendance_daily_rollups',
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('status', attendance_status, nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ),
+    sa.PrimaryKeyConstraint('date', 'group_id', 'subject_id', 'status')
+    )
+
+    # Backfill from existing attendance rows
+    op.execute(
+        """
+        INSERT INTO attendance_daily_rollups (date, group_id, subject_id, status, count)
+        SELECT a.date, st.group_id, sc.subject_id, a.status, COUNT(a.id)
+        FROM attendances a
+        JOIN students st ON st.id = a.student_id
+        JOIN schedules sc ON sc.id = a.schedule_id
+        GROUP BY a.date, st.group_id, sc.subject_id, a.status
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('attendance_daily_rollups')
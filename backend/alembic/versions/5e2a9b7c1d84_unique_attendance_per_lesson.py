@@ -0,0 +1,50 @@
+"""unique attendance per student, schedule and date
+
+Revision ID: 5e2a9b7c1d84
+Revises: 8c41f0a7d2b3
+Create Date: 2026-10-17 13:20:07.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2a9b7c1d84'
+down_revision: Union[str, None] = '8c41f0a7d2b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the most recent mark when a student was marked twice for the same lesson
+    op.execute(
+        """
+        DELETE FROM attendances
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM attendances GROUP BY student_id, schedule_id, date
+        )
+        """
+    )
+    # Rebuild the rollup so it no longer counts the removed duplicates
+    op.execute("DELETE FROM attendance_daily_rollups")
+    op.execute(
+        """
+        INSERT INTO attendance_daily_rollups (date, group_id, subject_id, status, count)
+        SELECT a.date, st.group_id, sc.subject_id, a.status, COUNT(a.id)
+        FROM attendances a
+        JOIN students st ON st.id = a.student_id
+        JOIN schedules sc ON sc.id = a.schedule_id
+        GROUP BY a.date, st.group_id, sc.subject_id, a.status
+        """
+    )
+    op.create_index(
+        'uq_attendances_student_schedule_date', 'attendances',
+        ['student_id', 'schedule_id', 'date'], unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_attendances_student_schedule_date', table_name='attendances')
@@ -0,0 +1,43 @@
+"""add student risk flags
+
+Revision ID: 8c41f0a7d2b3
+Revises: 3b7d2c9e4f10
+Create Date: 2026-10-17 12:03:18.541920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c41f0a7d2b3'
+down_revision: Union[str, None] = '3b7d2c9e4f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('student_risk_flags',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('flag', sa.Enum('LOW_ATTENDANCE', 'FALLING_GRADES', 'DISCIPLINARY', name='riskflagtype'), nullable=False),
+    sa.Column('value', sa.Float(), nullable=False),
+    sa.Column('threshold', sa.Float(), nullable=False),
+    sa.Column('details', sa.Text(), nullable=True),
+    sa.Column('detected_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('student_id', 'flag', name='uq_student_risk_flags_student_flag')
+    )
+    op.create_index(op.f('ix_student_risk_flags_flag'), 'student_risk_flags', ['flag'], unique=False)
+    op.create_index(op.f('ix_student_risk_flags_id'), 'student_risk_flags', ['id'], unique=False)
+    op.create_index(op.f('ix_student_risk_flags_student_id'), 'student_risk_flags', ['student_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_student_risk_flags_student_id'), table_name='student_risk_flags')
+    op.drop_index(op.f('ix_student_risk_flags_id'), table_name='student_risk_flags')
+    op.drop_index(op.f('ix_student_risk_flags_flag'), table_name='student_risk_flags')
+    op.drop_table('student_risk_flags')
@@ -0,0 +1,38 @@
+"""unique grade per student and assessment event
+
+Revision ID: 9d3f6a2e7b15
+Revises: 5e2a9b7c1d84
+Create Date: 2026-10-17 15:02:44.530917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3f6a2e7b15'
+down_revision: Union[str, None] = '5e2a9b7c1d84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the most recent grade when a student was graded twice for the same event
+    op.execute(
+        """
+        DELETE FROM grades
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM grades GROUP BY student_id, assessment_event_id
+        )
+        """
+    )
+    op.create_index(
+        'uq_grades_student_event', 'grades',
+        ['student_id', 'assessment_event_id'], unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_grades_student_event', table_name='grades')
@@ -0,0 +1,153 @@
+"""add content-addressed storage blobs
+
+Revision ID: a7c3e9d2f418
+Revises: f3b8d1e5a927
+Create Date: 2026-10-17 23:41:52.207194
+
+Moves existing local uploads (LOCAL_STORAGE_PATH) into the blobs/ layout,
+keeping one file per distinct content. S3 attachments keep their keys and
+no blob; they are deleted the old way.
+
+The old files are left in place: the migration may still roll back after
+this step. Remove them once it has committed with
+``scripts/clean_uploads.py --delete``.
+
+"""
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e9d2f418'
+down_revision: Union[str, None] = 'f3b8d1e5a927'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+storage_blobs = sa.table(
+    'storage_blobs',
+    sa.column('id', sa.Integer),
+    sa.column('sha256', sa.String),
+    sa.column('storage_backend', sa.String),
+    sa.column('storage_key', sa.String),
+    sa.column('size', sa.BigInteger),
+    sa.column('ref_count', sa.Integer),
+)
+attachments = sa.table(
+    'attachments',
+    sa.column('id', sa.Integer),
+    sa.column('storage_key', sa.String),
+    sa.column('storage_backend', sa.String),
+    sa.column('url', sa.String),
+    sa.column('blob_id', sa.Integer),
+)
+
+
+def upgrade() -> None:
+    op.create_table('storage_blobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False, comment='SHA-256 of the content'),
+    sa.Column('storage_backend', sa.String(length=20), nullable=False, comment="Storage backend: 'local' or 's3'"),
+    sa.Column('storage_key', sa.String(length=500), nullable=False, comment='Content-addressed key in storage system'),
+    sa.Column('size', sa.BigInteger(), nullable=False, comment='File size in bytes'),
+    sa.Column('ref_count', sa.Integer(), nullable=False, comment='Number of attachments referencing this blob'),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sha256', 'storage_backend', name='uq_storage_blobs_sha256_backend')
+    )
+    op.create_index(op.f('ix_storage_blobs_id'), 'storage_blobs', ['id'], unique=False)
+
+    # Identical uploads now share a storage key
+    op.drop_index('ix_attachments_storage_key', table_name='attachments')
+    op.create_index(op.f('ix_attachments_storage_key'), 'attachments', ['storage_key'], unique=False)
+    with op.batch_alter_table('attachments') as batch_op:
+        batch_op.add_column(sa.Column(
+            'blob_id', sa.Integer(), nullable=True,
+            comment='Content-addressed blob; NULL for files stored before deduplication',
+        ))
+        batch_op.create_foreign_key('fk_attachments_blob_id', 'storage_blobs', ['blob_id'], ['id'])
+    op.create_index(op.f('ix_attachments_blob_id'), 'attachments', ['blob_id'], unique=False)
+
+    _dedupe_local_uploads(op.get_bind())
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _dedupe_local_uploads(bind) -> None:
+    uploads = Path(os.getenv('LOCAL_STORAGE_PATH', 'uploads'))
+    rows = bind.execute(
+        sa.select(attachments.c.id, attachments.c.storage_key, attachments.c.url)
+        .where(attachments.c.storage_backend == 'local')
+        .order_by(attachments.c.id)
+    ).all()
+
+    blobs = {}  # sha256 -> [blob id, key, references]
+    replaced = 0  # Old files no attachment points at any more
+    for attachment_id, key, url in rows:
+        path = uploads / key
+        if not path.is_file():
+            continue  # Missing file: leave the attachment as it is
+        sha256 = _sha256(path)
+
+        if sha256 not in blobs:
+            blob_key = f'blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}{path.suffix.lower()}'
+            target = uploads / blob_key
+            if not target.exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(path, target)
+                except OSError:
+                    shutil.copy2(path, target)
+            blob_id = bind.execute(storage_blobs.insert().values(
+                sha256=sha256,
+                storage_backend='local',
+                storage_key=blob_key,
+                size=path.stat().st_size,
+                ref_count=0,
+            ).returning(storage_blobs.c.id)).scalar_one()
+            blobs[sha256] = [blob_id, blob_key, 0]
+
+        blob = blobs[sha256]
+        blob[2] += 1
+        bind.execute(
+            attachments.update().where(attachments.c.id == attachment_id).values(
+                storage_key=blob[1],
+                blob_id=blob[0],
+                url=url.replace(key, blob[1]) if url else url,
+            )
+        )
+        if key != blob[1]:
+            replaced += 1
+
+    for blob_id, _, references in blobs.values():
+        bind.execute(
+            storage_blobs.update().where(storage_blobs.c.id == blob_id).values(ref_count=references)
+        )
+
+    if rows:
+        print(f'Moved {replaced} local uploads into {len(blobs)} content-addressed blobs')
+    if replaced:
+        print('Remove the old files after the upgrade with: python scripts/clean_uploads.py --delete')
+
+
+def downgrade() -> None:
+    # Files stay in the blobs/ layout, and storage_key stays non-unique since
+    # deduplicated attachments keep sharing their file
+    op.drop_index(op.f('ix_attachments_blob_id'), table_name='attachments')
+    with op.batch_alter_table('attachments') as batch_op:
+        batch_op.drop_constraint('fk_attachments_blob_id', type_='foreignkey')
+        batch_op.drop_column('blob_id')
+    op.drop_index(op.f('ix_storage_blobs_id'), table_name='storage_blobs')
+    op.drop_table('storage_blobs')
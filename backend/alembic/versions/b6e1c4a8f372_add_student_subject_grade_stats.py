@@ -0,0 +1,55 @@
+"""add student subject grade stats
+
+Revision ID: b6e1c4a8f372
+Revises: 9d3f6a2e7b15
+Create Date: 2026-10-17 16:21:09.775104
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e1c4a8f372'
+down_revision: Union[str, None] = '9d3f6a2e7b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('student_subject_grade_stats',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('academic_year', sa.String(length=9), nullable=False),
+    sa.Column('semester', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('score_sum', sa.Float(), nullable=False),
+    sa.Column('score_sum_sq', sa.Float(), nullable=False),
+    sa.Column('min_score', sa.Float(), nullable=True),
+    sa.Column('max_score', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ),
+    sa.PrimaryKeyConstraint('student_id', 'subject_id', 'academic_year', 'semester')
+    )
+
+    # Backfill from existing grades
+    op.execute(
+        """
+        INSERT INTO student_subject_grade_stats
+            (student_id, subject_id, academic_year, semester,
+             count, score_sum, score_sum_sq, min_score, max_score)
+        SELECT g.student_id, e.subject_id, e.academic_year, e.semester,
+               COUNT(g.id), SUM(g.score), SUM(g.score * g.score), MIN(g.score), MAX(g.score)
+        FROM grades g
+        JOIN assessment_events e ON e.id = g.assessment_event_id
+        JOIN students st ON st.id = g.student_id
+        WHERE g.score IS NOT NULL
+        GROUP BY g.student_id, e.subject_id, e.academic_year, e.semester
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('student_subject_grade_stats')
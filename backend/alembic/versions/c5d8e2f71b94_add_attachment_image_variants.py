@@ -0,0 +1,50 @@
+"""add generated image variants to attachments
+
+Revision ID: c5d8e2f71b94
+Revises: a7c3e9d2f418
+Create Date: 2026-10-18 01:12:37.640215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d8e2f71b94'
+down_revision: Union[str, None] = 'a7c3e9d2f418'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('attachments') as batch_op:
+        batch_op.add_column(sa.Column(
+            'variant', sa.String(length=20), nullable=True,
+            comment="'thumbnail' or 'webp' for generated variants, NULL for uploads",
+        ))
+        batch_op.add_column(sa.Column(
+            'thumbnail_attachment_id', sa.Integer(), nullable=True,
+            comment='Generated thumbnail of an image',
+        ))
+        batch_op.add_column(sa.Column(
+            'webp_attachment_id', sa.Integer(), nullable=True,
+            comment='Generated full-size WebP version of an image',
+        ))
+        batch_op.create_foreign_key(
+            'fk_attachments_thumbnail_attachment_id', 'attachments', ['thumbnail_attachment_id'], ['id']
+        )
+        batch_op.create_foreign_key(
+            'fk_attachments_webp_attachment_id', 'attachments', ['webp_attachment_id'], ['id']
+        )
+
+
+def downgrade() -> None:
+    # Generated variants become ordinary attachments
+    with op.batch_alter_table('attachments') as batch_op:
+        batch_op.drop_constraint('fk_attachments_webp_attachment_id', type_='foreignkey')
+        batch_op.drop_constraint('fk_attachments_thumbnail_attachment_id', type_='foreignkey')
+        batch_op.drop_column('webp_attachment_id')
+        batch_op.drop_column('thumbnail_attachment_id')
+        batch_op.drop_column('variant')
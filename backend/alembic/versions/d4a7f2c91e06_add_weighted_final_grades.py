@@ -0,0 +1,78 @@
+"""add grade weights and weighted final grades
+
+Revision ID: d4a7f2c91e06
+Revises: b6e1c4a8f372
+Create Date: 2026-10-17 17:48:30.204611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7f2c91e06'
+down_revision: Union[str, None] = 'b6e1c4a8f372'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Reuse the existing assessmenteventtype enum type on PostgreSQL
+    event_type = postgresql.ENUM(
+        'MIDTERM_1', 'MIDTERM_2', 'EXAM_1', 'EXAM_2', 'CUSTOM', name='assessmenteventtype', create_type=False
+    )
+    op.create_table('grade_weights',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_type', event_type, nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=True),
+    sa.Column('weight', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('event_type', 'subject_id', name='uq_grade_weights_event_type_subject')
+    )
+    op.create_index(op.f('ix_grade_weights_id'), 'grade_weights', ['id'], unique=False)
+
+    op.create_table('final_grades',
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('academic_year', sa.String(length=9), nullable=False),
+    sa.Column('semester', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('grades_count', sa.Integer(), nullable=False),
+    sa.Column('weight_total', sa.Float(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ),
+    sa.PrimaryKeyConstraint('student_id', 'subject_id', 'academic_year', 'semester')
+    )
+
+    # Backfill with every event type weighted equally (no weights are configured yet)
+    op.execute(
+        """
+        INSERT INTO final_grades
+            (student_id, subject_id, academic_year, semester, score, grades_count, weight_total)
+        SELECT student_id, subject_id, academic_year, semester,
+               AVG(average), SUM(grades_count), COUNT(*)
+        FROM (
+            SELECT g.student_id, e.subject_id, e.academic_year, e.semester, e.event_type,
+                   AVG(g.score) AS average, COUNT(g.id) AS grades_count
+            FROM grades g
+            JOIN assessment_events e ON e.id = g.assessment_event_id
+            JOIN students st ON st.id = g.student_id
+            WHERE g.score IS NOT NULL
+            GROUP BY g.student_id, e.subject_id, e.academic_year, e.semester, e.event_type
+        ) AS type_averages
+        GROUP BY student_id, subject_id, academic_year, semester
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('final_grades')
+    op.drop_index(op.f('ix_grade_weights_id'), table_name='grade_weights')
+    op.drop_table('grade_weights')
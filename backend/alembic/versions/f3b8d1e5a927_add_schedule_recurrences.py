@@ -0,0 +1,78 @@
+"""add recurring lesson templates
+
+Revision ID: f3b8d1e5a927
+Revises: d4a7f2c91e06
+Create Date: 2026-10-17 19:12:04.518337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d1e5a927'
+down_revision: Union[str, None] = 'd4a7f2c91e06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('schedule_recurrences',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('teacher_id', sa.Integer(), nullable=False),
+    sa.Column('day_of_week', sa.Enum('MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', name='dayofweek'), nullable=False),
+    sa.Column('start_time', sa.Time(), nullable=False),
+    sa.Column('end_time', sa.Time(), nullable=False),
+    sa.Column('room', sa.String(length=50), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('end_date', sa.Date(), nullable=False),
+    sa.Column('interval_weeks', sa.Integer(), nullable=False),
+    sa.Column('semester', sa.Integer(), nullable=False),
+    sa.Column('academic_year', sa.String(length=9), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ),
+    sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ),
+    sa.ForeignKeyConstraint(['teacher_id'], ['teachers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_schedule_recurrences_id'), 'schedule_recurrences', ['id'], unique=False)
+    op.create_index(op.f('ix_schedule_recurrences_group_id'), 'schedule_recurrences', ['group_id'], unique=False)
+    op.create_index(op.f('ix_schedule_recurrences_teacher_id'), 'schedule_recurrences', ['teacher_id'], unique=False)
+
+    op.create_table('schedule_recurrence_exceptions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recurrence_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('reason', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['recurrence_id'], ['schedule_recurrences.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('recurrence_id', 'date', name='uq_schedule_recurrence_exceptions_recurrence_date')
+    )
+    op.create_index(op.f('ix_schedule_recurrence_exceptions_id'), 'schedule_recurrence_exceptions', ['id'], unique=False)
+
+    with op.batch_alter_table('schedules') as batch_op:
+        batch_op.add_column(sa.Column('recurrence_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_schedules_recurrence_id', 'schedule_recurrences', ['recurrence_id'], ['id'], ondelete='SET NULL'
+        )
+    op.create_index('uq_schedules_recurrence_date', 'schedules', ['recurrence_id', 'specific_date'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_schedules_recurrence_date', table_name='schedules')
+    with op.batch_alter_table('schedules') as batch_op:
+        batch_op.drop_constraint('fk_schedules_recurrence_id', type_='foreignkey')
+        batch_op.drop_column('recurrence_id')
+    op.drop_index(op.f('ix_schedule_recurrence_exceptions_id'), table_name='schedule_recurrence_exceptions')
+    op.drop_table('schedule_recurrence_exceptions')
+    op.drop_index(op.f('ix_schedule_recurrences_teacher_id'), table_name='schedule_recurrences')
+    op.drop_index(op.f('ix_schedule_recurrences_group_id'), table_name='schedule_recurrences')
+    op.drop_index(op.f('ix_schedule_recurrences_id'), table_name='schedule_recurrences')
+    op.drop_table('schedule_recurrences')
+    sa.Enum(name='dayofweek').drop(op.get_bind(), checkfirst=True)
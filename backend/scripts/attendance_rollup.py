@@ -0,0 +1,59 @@
+"""
+Maintain the attendance_daily_rollups table.
+
+Usage:
+    uv run python scripts/attendance_rollup.py rebuild   # backfill from raw attendance rows
+    uv run python scripts/attendance_rollup.py check     # report drift between rollup and raw rows
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add project root to path
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[1]
+sys.path.append(str(project_root))
+
+from src.database import async_session
+from src.rollups import rebuild_attendance_rollup, check_attendance_rollup
+
+
+async def rebuild():
+    async with async_session() as session:
+        rows = await rebuild_attendance_rollup(session)
+        await session.commit()
+    print(f"Rebuilt attendance rollup: {rows} rows")
+
+
+async def check() -> int:
+    async with async_session() as session:
+        mismatches = await check_attendance_rollup(session)
+
+    if not mismatches:
+        print("Attendance rollup is consistent with raw attendance rows")
+        return 0
+
+    print(f"Found {len(mismatches)} mismatching rollup keys:")
+    for m in mismatches:
+        print(
+            f"  {m['date']} group={m['group_id']} subject={m['subject_id']} "
+            f"status={m['status']}: expected {m['expected']}, got {m['actual']}"
+        )
+    print("Run 'attendance_rollup.py rebuild' to fix.")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        asyncio.run(rebuild())
+    else:
+        sys.exit(asyncio.run(check()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark bulk attendance marking.
+
+Marks ``--students`` cadets for one lesson per iteration and reports p50/p99
+for the previous per-student implementation (one SELECT and INSERT per
+student, refresh after commit) and the current /attendance/bulk and
+/attendance/bulk-simple endpoints.
+
+Usage:
+    python scripts/bench_attendance_bulk.py
+    python scripts/bench_attendance_bulk.py --students 1000 --iterations 20
+"""
+import argparse
+import asyncio
+from datetime import date, time, timedelta
+
+from bench_common import (
+    DEFAULT_BENCH_DATABASE_URL,
+    configure_database,
+    reset_schema,
+    seed_reference_data,
+    admin_token,
+    measure,
+    report,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark bulk attendance marking")
+    parser.add_argument("--database-url", default=DEFAULT_BENCH_DATABASE_URL)
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=20)
+    return parser.parse_args()
+
+
+async def legacy_bulk(session, schedule_id, day, records):
+    """The previous /attendance/bulk loop."""
+    from sqlalchemy import select, and_
+    from src.models import Attendance
+
+    created = []
+    for record in records:
+        existing = await session.execute(
+            select(Attendance).where(
+                and_(
+                    Attendance.student_id == record["student_id"],
+                    Attendance.schedule_id == schedule_id,
+                    Attendance.date == day,
+                )
+            )
+        )
+        if existing.scalar_one_or_none():
+            continue
+        attendance = Attendance(schedule_id=schedule_id, date=day, **record)
+        session.add(attendance)
+        created.append(attendance)
+    await session.commit()
+    for attendance in created:
+        await session.refresh(attendance)
+
+
+async def run(args):
+    import httpx
+    from sqlalchemy import insert
+    from src.database import async_session
+    from src.main import app
+    from src.models import Schedule
+    from src.models.attendance import AttendanceStatus
+
+    await reset_schema()
+    async with async_session() as session:
+        ids = await seed_reference_data(session, groups=1, students_per_group=args.students)
+        schedule_ids = (await session.execute(
+            insert(Schedule).returning(Schedule.id),
+            [
+                {
+                    "group_id": ids["groups"][0],
+                    "subject_id": ids["subjects"][0],
+                    "teacher_id": ids["teachers"][0],
+                    "specific_date": date.today(),
+                    "start_time": time(9, 0),
+                    "end_time": time(10, 30),
+                    "room": "101",
+                    "semester": 1,
+                    "academic_year": "2025-2026",
+                }
+            ],
+        )).scalars().all()
+        await session.commit()
+    schedule_id = schedule_ids[0]
+    print(f"Seeded {len(ids['students'])} students")
+
+    statuses = list(AttendanceStatus)
+    days = iter(date.today() - timedelta(days=n) for n in range(100000))
+
+    def records(offset=0):
+        return [
+            {"student_id": sid, "status": statuses[(i + offset) % len(statuses)]}
+            for i, sid in enumerate(ids["students"])
+        ]
+
+    async def legacy():
+        async with async_session() as session:
+            await legacy_bulk(session, schedule_id, next(days), records())
+
+    headers = {"Authorization": f"Bearer {admin_token(ids['admin'][0])}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        async def bulk():
+            response = await client.post("/api/attendance/bulk", json={
+                "schedule_id": schedule_id,
+                "date": next(days).isoformat(),
+                "records": [{**r, "status": r["status"].value} for r in records()],
+            })
+            response.raise_for_status()
+
+        simple_day = date.today() + timedelta(days=1)
+        flip = iter(range(100000))
+
+        async def bulk_simple():
+            response = await client.post("/api/attendance/bulk-simple", json={
+                "group_id": ids["groups"][0],
+                "date": simple_day.isoformat(),
+                "records": [{**r, "status": r["status"].value} for r in records(next(flip))],
+            })
+            response.raise_for_status()
+
+        report(f"legacy loop ({args.students})", await measure(legacy, args.iterations, warmup=1))
+        report(f"POST /attendance/bulk", await measure(bulk, args.iterations, warmup=1))
+        report(f"POST /attendance/bulk-simple", await measure(bulk_simple, args.iterations, warmup=1))
+
+
+def main():
+    args = parse_args()
+    configure_database(args.database_url)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Shared helpers for the benchmark scripts in this folder.
+
+Benchmarks run against a throwaway database (SQLite by default) so they never
+touch the development database. Call ``configure_database`` before importing
+anything from ``src`` - the engine is created from DATABASE_URL at import time.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+# Add project root to path
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[1]
+sys.path.append(str(project_root))
+
+DEFAULT_BENCH_DATABASE_URL = "sqlite+aiosqlite:///./bench.db"
+PROBE_INTERVAL = 0.005
+
+
+def configure_database(database_url: str) -> None:
+    """Point the application at the benchmark database."""
+    if database_url.startswith("sqlite") and ":///" in database_url:
+        db_path = Path(database_url.split(":///", 1)[1])
+        if db_path.exists():
+            db_path.unlink()
+    os.environ["DATABASE_URL"] = database_url
+
+
+async def reset_schema() -> None:
+    """Drop and recreate all tables in the benchmark database."""
+    from src.database import engine
+    from src.models import Base
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def seed_reference_data(
+    session,
+    groups: int,
+    students_per_group: int,
+    subjects: int = 8,
+    teachers: int = 1,
+) -> Dict[str, List[int]]:
+    """
+    Insert an admin/teacher, groups, subjects and students with core bulk inserts.
+    Teachers beyond the first get their own users.
+    Returns the created ids by kind. Caller commits.
+    """
+    from sqlalchemy import insert, select
+    from src.models import User, UserRole, Teacher, Group, Subject, Student
+
+    admin_id = (await session.execute(
+        insert(User).returning(User.id),
+        [{"email": "admin@bench.local", "password_hash": "-", "role": UserRole.ADMIN}],
+    )).scalar_one()
+    teacher_id = (await session.execute(
+        insert(Teacher).returning(Teacher.id),
+        [{"user_id": admin_id, "first_name": "Bench", "last_name": "Teacher"}],
+    )).scalar_one()
+    teacher_ids = [teacher_id]
+    if teachers > 1:
+        teacher_user_ids = list((await session.execute(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [
+                {"email": f"teacher{i}@bench.local", "password_hash": "-", "role": UserRole.TEACHER}
+                for i in range(1, teachers)
+            ],
+        )).scalars())
+        teacher_ids += list((await session.execute(
+            insert(Teacher).returning(Teacher.id, sort_by_parameter_order=True),
+            [
+                {"user_id": user_id, "first_name": "Bench", "last_name": f"Teacher{i}"}
+                for i, user_id in enumerate(teacher_user_ids, start=1)
+            ],
+        )).scalars())
+
+    await session.execute(insert(Group), [
+        {"name": f"BG-{i:03d}", "course": i % 4 + 1, "year": 2020 + i % 4} for i in range(groups)
+    ])
+    group_ids = list((await session.execute(select(Group.id).order_by(Group.id))).scalars())
+
+    await session.execute(insert(Subject), [
+        {"name": f"Bench subject {i}", "code": f"BS-{i:03d}", "credits": 3} for i in range(subjects)
+    ])
+    subject_ids = list((await session.execute(select(Subject.id).order_by(Subject.id))).scalars())
+
+    total = groups * students_per_group
+    await session.execute(insert(User), [
+        {"email": f"cadet{i}@bench.local", "password_hash": "-", "role": UserRole.STUDENT}
+        for i in range(total)
+    ])
+    user_ids = list((await session.execute(
+        select(User.id).where(User.role == UserRole.STUDENT).order_by(User.id)
+    )).scalars())
+    await session.execute(insert(Student), [
+        {
+            "user_id": user_id,
+            "group_id": group_ids[i // students_per_group],
+            "first_name": f"Cadet{i}",
+            "last_name": f"Bench{i}",
+            "enrollment_date": date(2024, 9, 1),
+        }
+        for i, user_id in enumerate(user_ids)
+    ])
+    student_ids = list((await session.execute(select(Student.id).order_by(Student.id))).scalars())
+
+    return {
+        "admin": [admin_id],
+        "teachers": teacher_ids,
+        "groups": group_ids,
+        "subjects": subject_ids,
+        "students": student_ids,
+    }
+
+
+def admin_token(user_id: int) -> str:
+    """Create a bearer token for the seeded admin user."""
+    from src.security import create_access_token
+    return create_access_token({"sub": str(user_id), "role": "admin"})
+
+
+async def measure(fn: Callable[[], Awaitable], iterations: int, warmup: int = 3) -> List[float]:
+    """Run ``fn`` repeatedly and return latencies in milliseconds."""
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def report(label: str, samples: List[float]) -> None:
+    """Print p50/p99/mean for a list of latency samples (ms)."""
+    print(
+        f"{label:<28} n={len(samples):<5} "
+        f"p50={percentile(samples, 50):8.2f} ms  "
+        f"p99={percentile(samples, 99):8.2f} ms  "
+        f"mean={statistics.mean(samples):8.2f} ms"
+    )
+
+
+async def lag_probe(stop: asyncio.Event, samples: List[float]) -> None:
+    """Record how many ms past its deadline a short sleep wakes up, until ``stop`` is set."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        samples.append((time.perf_counter() - started - PROBE_INTERVAL) * 1000)
+
+
+def report_lag(label: str, samples: List[float]) -> None:
+    """Print p50/p99/max of event-loop lag samples (ms)."""
+    print(
+        f"{label + ' loop lag':<28} n={len(samples):<5} "
+        f"p50={percentile(samples, 50):8.2f} ms  p99={percentile(samples, 99):8.2f} ms  max={max(samples):8.2f} ms"
+    )
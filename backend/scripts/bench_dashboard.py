@@ -0,0 +1,201 @@
+"""
+Benchmark the analytics dashboard query.
+
+Seeds a throwaway database with roughly ``--students * --days`` attendance rows
+and reports p50/p99 latency for the previous sequential implementation
+(eight round trips) and the current single-statement query, both directly and
+through the ``/api/analytics/dashboard`` endpoint. The endpoint is timed cold
+(``analytics_cache`` cleared before every request) and warm (cache hits).
+
+Usage:
+    python scripts/bench_dashboard.py
+    python scripts/bench_dashboard.py --students 1000 --days 120 --iterations 200
+    python scripts/bench_dashboard.py --database-url postgresql+asyncpg://.../bench
+"""
+import argparse
+import asyncio
+import random
+from datetime import date, time, timedelta
+
+from bench_common import (
+    DEFAULT_BENCH_DATABASE_URL,
+    configure_database,
+    reset_schema,
+    seed_reference_data,
+    admin_token,
+    measure,
+    report,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the analytics dashboard")
+    parser.add_argument("--database-url", default=DEFAULT_BENCH_DATABASE_URL)
+    parser.add_argument("--groups", type=int, default=40)
+    parser.add_argument("--students", type=int, default=1000, help="total number of students")
+    parser.add_argument("--days", type=int, default=120, help="days of attendance history")
+    parser.add_argument("--iterations", type=int, default=200)
+    return parser.parse_args()
+
+
+async def seed(args):
+    from sqlalchemy import insert, select
+    from src.database import async_session
+    from src.models import Student, Schedule, Attendance, AssessmentEvent, Grade
+    from src.models.attendance import AttendanceStatus
+    from src.models.assessment_events import AssessmentEventType
+    from src.rollups import rebuild_attendance_rollup
+
+    rng = random.Random(42)
+    statuses = list(AttendanceStatus)
+    weights = [85, 7, 5, 3]
+    today = date.today()
+
+    async with async_session() as session:
+        ids = await seed_reference_data(
+            session,
+            groups=args.groups,
+            students_per_group=max(1, args.students // args.groups),
+        )
+        teacher_id = ids["teachers"][0]
+
+        await session.execute(insert(Schedule), [
+            {
+                "group_id": group_id,
+                "subject_id": ids["subjects"][day % len(ids["subjects"])],
+                "teacher_id": teacher_id,
+                "specific_date": today - timedelta(days=day),
+                "start_time": time(9, 0),
+                "end_time": time(10, 30),
+                "room": "101",
+                "semester": 1,
+                "academic_year": f"{today.year}-{today.year + 1}",
+            }
+            for group_id in ids["groups"]
+            for day in range(args.days)
+        ])
+        schedules = (await session.execute(
+            select(Schedule.id, Schedule.group_id, Schedule.specific_date)
+        )).all()
+        schedules_by_group = {}
+        for row in schedules:
+            schedules_by_group.setdefault(row.group_id, []).append(row)
+
+        students = (await session.execute(select(Student.id, Student.group_id))).all()
+
+        batch = []
+        total = 0
+        for student_id, group_id in students:
+            for schedule in schedules_by_group.get(group_id, []):
+                batch.append({
+                    "student_id": student_id,
+                    "schedule_id": schedule.id,
+                    "date": schedule.specific_date,
+                    "status": rng.choices(statuses, weights)[0],
+                })
+                if len(batch) >= 10000:
+                    await session.execute(insert(Attendance), batch)
+                    total += len(batch)
+                    batch = []
+        if batch:
+            await session.execute(insert(Attendance), batch)
+            total += len(batch)
+
+        await session.execute(insert(AssessmentEvent), [
+            {
+                "name": f"Контроль {i}",
+                "event_type": list(AssessmentEventType)[0],
+                "group_id": group_id,
+                "subject_id": ids["subjects"][i % len(ids["subjects"])],
+                "date": today - timedelta(days=i * 7),
+                "semester": 1,
+                "academic_year": f"{today.year}-{today.year + 1}",
+                "max_score": 100,
+            }
+            for group_id in ids["groups"]
+            for i in range(4)
+        ])
+        events = (await session.execute(select(AssessmentEvent.id, AssessmentEvent.group_id))).all()
+        events_by_group = {}
+        for event_id, group_id in events:
+            events_by_group.setdefault(group_id, []).append(event_id)
+        await session.execute(insert(Grade), [
+            {"student_id": student_id, "assessment_event_id": event_id, "score": rng.uniform(40, 100)}
+            for student_id, group_id in students
+            for event_id in events_by_group.get(group_id, [])
+        ])
+
+        rollup_rows = await rebuild_attendance_rollup(session)
+        await session.commit()
+
+    print(f"Seeded {len(students)} students, {total} attendance rows, {rollup_rows} rollup rows")
+    return ids
+
+
+async def legacy_dashboard(session, today):
+    """The previous implementation: one round trip per aggregate."""
+    from sqlalchemy import select, func
+    from src.models import (
+        Student, Teacher, Group, Subject, Grade, DisciplinaryRecord, AttendanceDailyRollup,
+    )
+
+    rollup = AttendanceDailyRollup
+    for model in (Student, Teacher, Group, Subject):
+        await session.execute(select(func.count(model.id)))
+    await session.execute(
+        select(rollup.status, func.sum(rollup.count)).where(rollup.date == today).group_by(rollup.status)
+    )
+    await session.execute(
+        select(rollup.status, func.sum(rollup.count))
+        .where(rollup.date >= today - timedelta(days=120)).group_by(rollup.status)
+    )
+    await session.execute(select(func.avg(Grade.score)).where(Grade.score.isnot(None)))
+    await session.execute(
+        select(func.count(DisciplinaryRecord.id)).where(DisciplinaryRecord.date >= today - timedelta(days=30))
+    )
+
+
+async def run(args):
+    import httpx
+    from src.database import async_session
+    from src.main import app
+    from src.api.analytics import dashboard_stats_query
+    from src.cache import analytics_cache
+
+    await reset_schema()
+    ids = await seed(args)
+    today = date.today()
+
+    async def legacy():
+        async with async_session() as session:
+            await legacy_dashboard(session, today)
+
+    async def single():
+        async with async_session() as session:
+            (await session.execute(dashboard_stats_query(today))).one()
+
+    headers = {"Authorization": f"Bearer {admin_token(ids['admin'][0])}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        async def endpoint():
+            response = await client.get("/api/analytics/dashboard")
+            response.raise_for_status()
+
+        async def endpoint_uncached():
+            analytics_cache.clear()
+            await endpoint()
+
+        report("queries: sequential (8)", await measure(legacy, args.iterations))
+        report("queries: single statement", await measure(single, args.iterations))
+        report("GET dashboard: cold cache", await measure(endpoint_uncached, args.iterations))
+        report("GET dashboard: warm cache", await measure(endpoint, args.iterations))
+
+
+def main():
+    args = parse_args()
+    configure_database(args.database_url)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark bulk grade entry.
+
+Submits ``--students`` grades for one assessment event per iteration and
+reports p50/p99 for the previous per-grade implementation (a student check and
+a grade lookup per entry) and the current /grades/bulk and
+/assessment-events/{id}/grades/bulk endpoints. Every iteration changes all
+scores, so the endpoints update the whole sheet.
+
+Usage:
+    python scripts/bench_grades_bulk.py
+    python scripts/bench_grades_bulk.py --students 500 --iterations 20
+"""
+import argparse
+import asyncio
+from datetime import date
+from itertools import count
+
+from bench_common import (
+    DEFAULT_BENCH_DATABASE_URL,
+    configure_database,
+    reset_schema,
+    seed_reference_data,
+    admin_token,
+    measure,
+    report,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark bulk grade entry")
+    parser.add_argument("--database-url", default=DEFAULT_BENCH_DATABASE_URL)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--iterations", type=int, default=20)
+    return parser.parse_args()
+
+
+async def legacy_bulk(session, event_id, grades):
+    """The previous /grades/bulk loop."""
+    from sqlalchemy import select
+    from src.models import Grade, Student
+
+    for grade_input in grades:
+        student = await session.execute(select(Student).where(Student.id == grade_input["student_id"]))
+        if not student.scalar_one_or_none():
+            continue
+        existing = (await session.execute(
+            select(Grade).where(
+                Grade.student_id == grade_input["student_id"],
+                Grade.assessment_event_id == event_id,
+            )
+        )).scalar_one_or_none()
+        if existing:
+            existing.score = grade_input["score"]
+        else:
+            session.add(Grade(assessment_event_id=event_id, **grade_input))
+    await session.commit()
+
+
+async def run(args):
+    import httpx
+    from sqlalchemy import insert
+    from src.database import async_session
+    from src.main import app
+    from src.models import AssessmentEvent, AssessmentEventType
+
+    await reset_schema()
+    async with async_session() as session:
+        ids = await seed_reference_data(session, groups=1, students_per_group=args.students)
+        event_ids = (await session.execute(
+            insert(AssessmentEvent).returning(AssessmentEvent.id),
+            [
+                {
+                    "name": f"Bench exam {i}",
+                    "event_type": AssessmentEventType.EXAM_1,
+                    "group_id": ids["groups"][0],
+                    "subject_id": ids["subjects"][0],
+                    "date": date.today(),
+                    "semester": 1,
+                    "academic_year": "2025-2026",
+                }
+                for i in range(3)
+            ],
+        )).scalars().all()
+        await session.commit()
+    print(f"Seeded {len(ids['students'])} students")
+
+    rounds = count()
+
+    def grades():
+        offset = next(rounds)
+        return [
+            {"student_id": sid, "score": float((i + offset) % 101)}
+            for i, sid in enumerate(ids["students"])
+        ]
+
+    async def legacy():
+        async with async_session() as session:
+            await legacy_bulk(session, event_ids[0], grades())
+
+    headers = {"Authorization": f"Bearer {admin_token(ids['admin'][0])}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        async def grades_bulk():
+            response = await client.post("/api/grades/bulk", json={
+                "assessment_event_id": event_ids[1],
+                "grades": grades(),
+            })
+            response.raise_for_status()
+
+        async def event_bulk():
+            response = await client.post(f"/api/assessment-events/{event_ids[2]}/grades/bulk", json=grades())
+            response.raise_for_status()
+
+        report(f"legacy loop ({args.students})", await measure(legacy, args.iterations, warmup=1))
+        report("POST /grades/bulk", await measure(grades_bulk, args.iterations, warmup=1))
+        report("POST /assessment-events/{id}/grades/bulk", await measure(event_bulk, args.iterations, warmup=1))
+
+
+def main():
+    args = parse_args()
+    configure_database(args.database_url)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
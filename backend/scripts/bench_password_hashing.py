@@ -0,0 +1,113 @@
+"""
+Benchmark concurrent logins and the event-loop lag they cause.
+
+Seeds ``--users`` accounts sharing one bcrypt hash and fires ``--logins``
+POST /auth/login requests, ``--concurrency`` at a time, while a probe task
+measures how late a 5 ms sleep wakes up. Compares verifying the password
+inline in the handler (the previous behaviour) with the password worker pool.
+
+Usage:
+    python scripts/bench_password_hashing.py
+    python scripts/bench_password_hashing.py --logins 200 --concurrency 32
+    PASSWORD_HASH_WORKERS=8 python scripts/bench_password_hashing.py
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from bench_common import (
+    DEFAULT_BENCH_DATABASE_URL,
+    configure_database,
+    lag_probe,
+    reset_schema,
+    report,
+    report_lag,
+)
+
+PASSWORD = "bench-password"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent logins")
+    parser.add_argument("--database-url", default=DEFAULT_BENCH_DATABASE_URL)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    return parser.parse_args()
+
+
+async def seed_users(count: int) -> List[str]:
+    from sqlalchemy import insert
+    from src.database import async_session
+    from src.models import User, UserRole
+    from src.security import hash_password
+
+    password_hash = hash_password(PASSWORD)
+    emails = [f"login{i}@bench.example.com" for i in range(count)]
+    async with async_session() as session:
+        await session.execute(insert(User), [
+            {"email": email, "password_hash": password_hash, "role": UserRole.STUDENT} for email in emails
+        ])
+        await session.commit()
+    return emails
+
+
+async def run_logins(client, emails: List[str], logins: int, concurrency: int) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def login(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/auth/login", json={"email": emails[i % len(emails)], "password": PASSWORD}
+            )
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(login(i) for i in range(logins)))
+    return latencies
+
+
+async def bench(label: str, client, emails: List[str], args) -> None:
+    stop = asyncio.Event()
+    lag = []
+    probe = asyncio.create_task(lag_probe(stop, lag))
+    started = time.perf_counter()
+    latencies = await run_logins(client, emails, args.logins, args.concurrency)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    report(f"{label} login", latencies)
+    report_lag(label, lag)
+    print(f"{label + ' throughput':<28} {args.logins / elapsed:8.1f} logins/s")
+
+
+async def main():
+    args = parse_args()
+    configure_database(args.database_url)
+
+    import httpx
+    from src.api import auth
+    from src.main import app
+    from src.security import PASSWORD_HASH_WORKERS, verify_password, verify_password_async
+
+    await reset_schema()
+    emails = await seed_users(args.users)
+    print(f"{args.logins} logins, {args.concurrency} concurrent, {PASSWORD_HASH_WORKERS} password workers")
+
+    async def verify_inline(plain_password: str, hashed_password: str) -> bool:
+        return verify_password(plain_password, hashed_password)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        auth.verify_password_async = verify_inline
+        await bench("inline", client, emails, args)
+        auth.verify_password_async = verify_password_async
+        await bench("worker pool", client, emails, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+"""
+Benchmark copying a template week across a semester.
+
+Seeds ``--groups`` groups with one week of lessons each and copies that week
+into ``--weeks`` following weeks for every group, comparing the previous
+per-lesson /schedule/copy-week loop (one clash SELECT and one INSERT per
+lesson, one call per group and week) with a single /schedule/copy-weeks call.
+Each iteration copies into a fresh range of weeks so nothing is skipped.
+
+Usage:
+    python scripts/bench_schedule_copy.py
+    python scripts/bench_schedule_copy.py --groups 30 --weeks 18 --iterations 3
+"""
+import argparse
+import asyncio
+from datetime import date, time, timedelta
+from itertools import count
+
+from bench_common import (
+    DEFAULT_BENCH_DATABASE_URL,
+    configure_database,
+    reset_schema,
+    seed_reference_data,
+    admin_token,
+    measure,
+    report,
+)
+
+LESSON_SLOTS = [(time(9, 0), time(10, 30)), (time(10, 40), time(12, 10)), (time(13, 0), time(14, 30)), (time(14, 40), time(16, 10))]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark semester schedule copy")
+    parser.add_argument("--database-url", default=DEFAULT_BENCH_DATABASE_URL)
+    parser.add_argument("--groups", type=int, default=30)
+    parser.add_argument("--weeks", type=int, default=18)
+    parser.add_argument("--iterations", type=int, default=3)
+    return parser.parse_args()
+
+
+async def legacy_copy_week(session, group_id, source_week_start, target_week_start):
+    """The previous /schedule/copy-week loop."""
+    from sqlalchemy import select, and_
+    from src.models import Schedule
+
+    source = (await session.execute(
+        select(Schedule).where(
+            and_(
+                Schedule.group_id == group_id,
+                Schedule.specific_date >= source_week_start,
+                Schedule.specific_date <= source_week_start + timedelta(days=6),
+                Schedule.is_active == True,
+            )
+        )
+    )).scalars().all()
+    day_offset = (target_week_start - source_week_start).days
+    for lesson in source:
+        new_date = lesson.specific_date + timedelta(days=day_offset)
+        existing = await session.execute(
+            select(Schedule).where(
+                and_(
+                    Schedule.group_id == group_id,
+                    Schedule.specific_date == new_date,
+                    Schedule.start_time == lesson.start_time,
+                    Schedule.is_active == True,
+                )
+            )
+        )
+        if existing.scalar_one_or_none():
+            continue
+        session.add(Schedule(
+            group_id=lesson.group_id, subject_id=lesson.subject_id, teacher_id=lesson.teacher_id,
+            specific_date=new_date, start_time=lesson.start_time, end_time=lesson.end_time,
+            room=lesson.room, semester=lesson.semester, academic_year=lesson.academic_year, is_active=True,
+        ))
+    await session.commit()
+
+
+async def run(args):
+    import httpx
+    from sqlalchemy import insert
+    from src.database import async_session
+    from src.main import app
+    from src.models import Schedule
+
+    source_week = date(2025, 9, 1)  # Monday
+    await reset_schema()
+    async with async_session() as session:
+        # Each group gets its own teacher and room so copies never double-book
+        ids = await seed_reference_data(session, groups=args.groups, students_per_group=1, teachers=args.groups)
+        await session.execute(insert(Schedule), [
+            {
+                "group_id": group_id,
+                "subject_id": ids["subjects"][(day + slot) % len(ids["subjects"])],
+                "teacher_id": ids["teachers"][g],
+                "specific_date": source_week + timedelta(days=day),
+                "start_time": start,
+                "end_time": end,
+                "room": f"{100 + g}",
+                "semester": 1,
+                "academic_year": "2025-2026",
+            }
+            for g, group_id in enumerate(ids["groups"])
+            for day in range(5)
+            for slot, (start, end) in enumerate(LESSON_SLOTS)
+        ])
+        await session.commit()
+    lessons = args.groups * 5 * len(LESSON_SLOTS)
+    print(f"Seeded {args.groups} groups, {lessons} template lessons; copying to {args.weeks} weeks "
+          f"({lessons * args.weeks} lessons per run)")
+
+    ranges = count(1)
+
+    def next_weeks():
+        first = source_week + timedelta(weeks=next(ranges) * args.weeks)
+        return [first + timedelta(weeks=n) for n in range(args.weeks)]
+
+    async def legacy():
+        async with async_session() as session:
+            for week_start in next_weeks():
+                for group_id in ids["groups"]:
+                    await legacy_copy_week(session, group_id, source_week, week_start)
+
+    headers = {"Authorization": f"Bearer {admin_token(ids['admin'][0])}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=None) as client:
+        async def copy_weeks():
+            response = await client.post("/api/schedule/copy-weeks", json={
+                "source_date": source_week.isoformat(),
+                "group_ids": ids["groups"],
+                "target_date": next_weeks()[0].isoformat(),
+                "weeks": args.weeks,
+            })
+            response.raise_for_status()
+            assert response.json()["created"] == lessons * args.weeks
+
+        report("legacy copy-week loop", await measure(legacy, args.iterations, warmup=0))
+        report("POST /schedule/copy-weeks", await measure(copy_weeks, args.iterations, warmup=0))
+
+
+def main():
+    args = parse_args()
+    configure_database(args.database_url)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark concurrent uploads through LocalStorageBackend.save.
+
+Writes one ``--size-mb`` source file and saves it ``--uploads`` times,
+``--concurrency`` at a time, into a throwaway media folder while a probe task
+measures event-loop lag. Compares the previous save (size, checksum and copy
+as three blocking passes on the event loop) with the single-pass save that
+streams into a temp file from a worker thread.
+
+Usage:
+    python scripts/bench_storage_save.py
+    python scripts/bench_storage_save.py --size-mb 50 --uploads 16 --concurrency 8
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import BinaryIO, List, Optional
+
+from bench_common import lag_probe, report, report_lag
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent storage saves")
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--uploads", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=8)
+    return parser.parse_args()
+
+
+def make_source(folder: Path, size_mb: int) -> Path:
+    path = folder / "source.bin"
+    block = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+    return path
+
+
+def legacy_save_backend(config):
+    """A LocalStorageBackend whose save does what it did before streaming."""
+    from src.storage import LocalStorageBackend
+
+    class LegacyLocalStorageBackend(LocalStorageBackend):
+        async def save(self, file: BinaryIO, filename: str, content_type: Optional[str] = None, folder: str = ""):
+            file.seek(0, 2)
+            size = file.tell()
+            file.seek(0)
+            self.validate_file(filename, size)
+            key = self.generate_key(filename, folder)
+            file_path = self.base_path / key
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            self.calculate_checksum(file)
+            with open(file_path, "wb") as f:
+                file.seek(0)
+                for chunk in iter(lambda: file.read(8192), b""):
+                    f.write(chunk)
+
+    return LegacyLocalStorageBackend(config)
+
+
+async def bench(label: str, backend, source: Path, args) -> None:
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def upload() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            with open(source, "rb") as f:
+                await backend.save(f, "upload.pdf", folder="bench")
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    stop = asyncio.Event()
+    lag: List[float] = []
+    probe = asyncio.create_task(lag_probe(stop, lag))
+    started = time.perf_counter()
+    await asyncio.gather(*(upload() for _ in range(args.uploads)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    report(f"{label} save", latencies)
+    report_lag(label, lag)
+    print(f"{label + ' throughput':<28} {args.uploads * args.size_mb / elapsed:8.1f} MB/s")
+
+
+async def main():
+    args = parse_args()
+
+    from src.storage import LocalStorageBackend, StorageConfig
+
+    with tempfile.TemporaryDirectory(prefix="bench-storage-") as tmp:
+        folder = Path(tmp)
+        source = make_source(folder, args.size_mb)
+        config = StorageConfig(local_storage_path=str(folder / "media"), max_file_size_mb=args.size_mb + 1)
+        print(f"{args.uploads} uploads of {args.size_mb} MB, {args.concurrency} concurrent")
+
+        await bench("three-pass", legacy_save_backend(config), source, args)
+        await bench("single-pass", LocalStorageBackend(config), source, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+Remove local upload files that no attachment or storage blob points at.
+
+Run after ``alembic upgrade head`` to drop the pre-deduplication files the
+a7c3e9d2f418 migration leaves behind, or at any time to collect files whose
+deletion failed after a commit. Lists the files by default; pass --delete to
+remove them. Files younger than --min-age-minutes are kept, since an upload
+is moved into place before its row is committed.
+
+Usage:
+    uv run python scripts/clean_uploads.py
+    uv run python scripts/clean_uploads.py --delete
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[1]
+sys.path.append(str(project_root))
+
+from sqlalchemy import select, union
+
+from src.database import async_session
+from src.models.attachments import Attachment, StorageBlob
+
+STAGING_DIR = ".staging"
+
+
+async def referenced_keys() -> set:
+    async with async_session() as session:
+        result = await session.execute(union(
+            select(Attachment.storage_key).where(Attachment.storage_backend == "local"),
+            select(StorageBlob.storage_key).where(StorageBlob.storage_backend == "local"),
+        ))
+        return set(result.scalars().all())
+
+
+def unreferenced_files(uploads: Path, keys: set, min_age_minutes: float):
+    cutoff = time.time() - min_age_minutes * 60
+    for path in sorted(uploads.rglob("*")):
+        key = path.relative_to(uploads).as_posix()
+        if key.split("/")[0] == STAGING_DIR or not path.is_file():
+            continue
+        if key not in keys and path.stat().st_mtime < cutoff:
+            yield path
+
+
+def remove(uploads: Path, path: Path) -> None:
+    path.unlink(missing_ok=True)
+    parent = path.parent
+    while parent != uploads and parent.is_dir() and not any(parent.iterdir()):
+        parent.rmdir()
+        parent = parent.parent
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delete", action="store_true", help="remove the files instead of listing them")
+    parser.add_argument("--min-age-minutes", type=float, default=60)
+    args = parser.parse_args()
+
+    uploads = Path(os.getenv("LOCAL_STORAGE_PATH", "uploads"))
+    if not uploads.is_dir():
+        print(f"No local uploads at {uploads}")
+        return
+
+    keys = await referenced_keys()
+    files = list(unreferenced_files(uploads, keys, args.min_age_minutes))
+    size = sum(path.stat().st_size for path in files)
+    for path in files:
+        print(f"  {path.relative_to(uploads).as_posix()}")
+        if args.delete:
+            remove(uploads, path)
+
+    action = "Removed" if args.delete else "Found"
+    print(f"{action} {len(files)} unreferenced files ({size / 1024 / 1024:.1f} MB) in {uploads}")
+    if files and not args.delete:
+        print("Run with --delete to remove them.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
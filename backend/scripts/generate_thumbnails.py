@@ -0,0 +1,58 @@
+"""
+Generate thumbnails and WebP variants for images uploaded before the
+background pipeline existed (or while it was disabled).
+
+Usage:
+    uv run python scripts/generate_thumbnails.py
+    THUMBNAIL_WORKERS=4 uv run python scripts/generate_thumbnails.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add project root to path
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[1]
+sys.path.append(str(project_root))
+
+from sqlalchemy import select
+
+from src.database import async_session
+from src.models.attachments import Attachment, AttachmentType
+from src.thumbnails import THUMBNAIL_WORKERS, create_executor, generate_variants
+
+
+async def main():
+    async with async_session() as session:
+        result = await session.execute(
+            select(Attachment.id).where(
+                Attachment.attachment_type == AttachmentType.IMAGE,
+                Attachment.variant.is_(None),
+                Attachment.thumbnail_attachment_id.is_(None),
+                Attachment.deleted_at.is_(None),
+            ).order_by(Attachment.id)
+        )
+        attachment_ids = list(result.scalars().all())
+
+    workers = max(1, THUMBNAIL_WORKERS)
+    semaphore = asyncio.Semaphore(workers)
+    generated = failed = 0
+
+    async def process(attachment_id: int) -> None:
+        nonlocal generated, failed
+        async with semaphore:
+            try:
+                if await generate_variants(attachment_id, executor):
+                    generated += 1
+            except Exception as exc:
+                failed += 1
+                print(f"  attachment {attachment_id}: {exc}")
+
+    with create_executor(workers) as executor:
+        await asyncio.gather(*(process(attachment_id) for attachment_id in attachment_ids))
+
+    print(f"Checked {len(attachment_ids)} images: {generated} generated, {failed} failed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
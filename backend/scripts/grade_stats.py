@@ -0,0 +1,59 @@
+"""
+Maintain the student_subject_grade_stats table.
+
+Usage:
+    uv run python scripts/grade_stats.py rebuild   # backfill from raw grade rows
+    uv run python scripts/grade_stats.py check     # report drift between stats and raw rows
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add project root to path
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[1]
+sys.path.append(str(project_root))
+
+from src.database import async_session
+from src.grade_stats import rebuild_grade_stats, check_grade_stats
+
+
+async def rebuild():
+    async with async_session() as session:
+        rows = await rebuild_grade_stats(session)
+        await session.commit()
+    print(f"Rebuilt grade stats: {rows} rows")
+
+
+async def check() -> int:
+    async with async_session() as session:
+        mismatches = await check_grade_stats(session)
+
+    if not mismatches:
+        print("Grade stats are consistent with raw grade rows")
+        return 0
+
+    print(f"Found {len(mismatches)} mismatching grade stats rows:")
+    for m in mismatches:
+        print(
+            f"  student={m['student_id']} subject={m['subject_id']} "
+            f"{m['academic_year']}/{m['semester']}: expected {m['expected']}, got {m['actual']}"
+        )
+    print("Run 'grade_stats.py rebuild' to fix.")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        asyncio.run(rebuild())
+    else:
+        sys.exit(asyncio.run(check()))
+
+
+if __name__ == "__main__":
+    main()
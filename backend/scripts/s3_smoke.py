@@ -0,0 +1,81 @@
+"""
+Smoke-test the S3 storage backend against a real or local S3-compatible server.
+
+Uploads a file through S3StorageBackend.save (large enough to go multipart),
+streams it back with S3StorageBackend.stream, compares the checksum and
+deletes it. Reads the same AWS_* / S3_* variables as the application.
+
+Usage (with a local stand-in, e.g. `moto_server -p 9000` or MinIO):
+    AWS_S3_ENDPOINT_URL=http://127.0.0.1:9000 AWS_S3_BUCKET=journal \\
+    AWS_ACCESS_KEY_ID=test AWS_SECRET_ACCESS_KEY=test \\
+    uv run python scripts/s3_smoke.py --size-mb 40 --create-bucket
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+current_file = Path(__file__).resolve()
+project_root = current_file.parents[1]
+sys.path.append(str(project_root))
+
+from src.storage import S3StorageBackend, StorageConfig
+
+
+async def run(size_mb: int, create_bucket: bool) -> int:
+    config = StorageConfig.from_env()
+    if not config.use_s3:
+        print("S3 is not configured: set AWS_S3_BUCKET, AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY")
+        return 1
+
+    backend = S3StorageBackend(config)
+    if create_bucket:
+        try:
+            backend.client.create_bucket(Bucket=config.s3_bucket)
+        except backend.client.exceptions.BucketAlreadyOwnedByYou:
+            pass
+
+    with tempfile.TemporaryFile() as source:
+        for _ in range(size_mb):
+            source.write(os.urandom(1024 * 1024))
+
+        started = time.perf_counter()
+        stored = await backend.save(source, "smoke.mp4", folder="smoke")
+        print(f"save      {stored.key}  {stored.size} bytes  {time.perf_counter() - started:.2f} s")
+
+    started = time.perf_counter()
+    chunks, content_type = await backend.stream(stored.key)
+    md5 = hashlib.md5()
+    received = 0
+    async for chunk in chunks:
+        md5.update(chunk)
+        received += len(chunk)
+    print(f"stream    {content_type}  {received} bytes  {time.perf_counter() - started:.2f} s")
+
+    await backend.delete(stored.key)
+    if await backend.exists(stored.key):
+        print("delete    FAILED: object still exists")
+        return 1
+
+    if md5.hexdigest() != stored.checksum or received != stored.size:
+        print(f"checksum  MISMATCH: {md5.hexdigest()} != {stored.checksum}")
+        return 1
+    print(f"checksum  ok ({stored.checksum})")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Smoke-test the S3 storage backend")
+    parser.add_argument("--size-mb", type=int, default=40)
+    parser.add_argument("--create-bucket", action="store_true", help="Create the bucket first (local stand-ins)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.size_mb, args.create_bucket)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+"""
+Columnar in-memory analytics engine.
+
+Loads attendances and grades into compact NumPy column arrays (int32 ids,
+uint8 status codes, float32 scores) and answers cross-tab questions with
+vectorized group-bys instead of one SQL round trip per slice.
+
+The arrays are refreshed incrementally: rows whose ``updated_at`` moved past
+the last seen watermark are merged in by id, and comparing the row count and
+the sum of ids with the database catches deletes (which trigger a full
+reload). Ids only grow, so a delete followed by an insert still changes the
+sum; an id reused after deleting the newest row comes back with a fresh
+``updated_at`` and is merged in place. Changes to students or assessment
+events, which the rows are denormalised from, also trigger a full reload.
+
+NumPy is an optional dependency and is imported lazily; the engine is used by
+``/analytics/reports/semester`` and, when ``ANALYTICS_ENGINE=columnar`` is set,
+by the analytics endpoints that have a columnar implementation.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache import table_versions
+from src.exceptions import BusinessLogicError
+from src.models.assessment_events import AssessmentEvent
+from src.models.attendance import Attendance, AttendanceStatus
+from src.models.grades import Grade
+from src.models.schedule import Schedule
+from src.models.students import Student
+
+
+ANALYTICS_ENGINE = os.getenv("ANALYTICS_ENGINE", "sql").lower()
+
+# A full reload also runs periodically to pick up rows committed with an
+# updated_at older than the watermark (long transactions) or by other workers.
+FULL_RELOAD_SECONDS = float(os.getenv("ANALYTICS_ENGINE_FULL_RELOAD_SECONDS", "900"))
+
+STATUS_CODES = {status: code for code, status in enumerate(AttendanceStatus)}
+ATTENDED_CODES = [STATUS_CODES[AttendanceStatus.PRESENT], STATUS_CODES[AttendanceStatus.LATE]]
+
+LETTER_GRADE_BINS = [60, 70, 80, 90]
+LETTER_GRADES = "FDCBA"
+
+# Re-read rows from slightly before the watermark: timestamps may have
+# one-second resolution (SQLite CURRENT_TIMESTAMP). Re-reading is idempotent.
+WATERMARK_OVERLAP = timedelta(seconds=1)
+
+_ROW_TABLES = (Attendance.__tablename__, Grade.__tablename__)
+_SOURCE_TABLES = (Student.__tablename__, AssessmentEvent.__tablename__, Schedule.__tablename__)
+
+
+def columnar_engine_enabled() -> bool:
+    """Whether analytics endpoints should route to the columnar engine."""
+    return ANALYTICS_ENGINE == "columnar"
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise BusinessLogicError(
+            code="ANALYTICS_ENGINE_UNAVAILABLE",
+            message="Колоночный движок аналитики недоступен. Install with: pip install numpy",
+        )
+    return numpy
+
+
+class _ColumnTable:
+    """A set of equally long column arrays sorted by ``id``."""
+
+    def __init__(self, np, dtypes: Dict[str, Any]):
+        self.np = np
+        self.dtypes = dtypes
+        self.columns = {name: np.empty(0, dtype=dtype) for name, dtype in dtypes.items()}
+
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+
+    def id_sum(self) -> int:
+        return int(self.columns["id"].sum(dtype=self.np.int64))
+
+    def build(self, rows: Dict[str, list]) -> Dict[str, Any]:
+        return {
+            name: self.np.asarray(rows[name], dtype=dtype)
+            for name, dtype in self.dtypes.items()
+        }
+
+    def replace(self, rows: Dict[str, list]) -> None:
+        columns = self.build(rows)
+        order = self.np.argsort(columns["id"], kind="stable")
+        self.columns = {name: values[order] for name, values in columns.items()}
+
+    def upsert(self, rows: Dict[str, list]) -> None:
+        """Overwrite rows with known ids in place and merge in new ones."""
+        np = self.np
+        incoming = self.build(rows)
+        if not len(incoming["id"]):
+            return
+        ids = self.columns["id"]
+        positions = np.searchsorted(ids, incoming["id"])
+        known = positions < len(ids)
+        known[known] = ids[positions[known]] == incoming["id"][known]
+
+        for name, values in self.columns.items():
+            values[positions[known]] = incoming[name][known]
+
+        if not known.all():
+            fresh = ~known
+            merged = {
+                name: np.concatenate([values, incoming[name][fresh]])
+                for name, values in self.columns.items()
+            }
+            order = np.argsort(merged["id"], kind="stable")
+            self.columns = {name: values[order] for name, values in merged.items()}
+
+
+class ColumnarAnalyticsEngine:
+    """In-memory column store for attendances and grades."""
+
+    def __init__(self):
+        self.np = _numpy()
+        np = self.np
+        self.attendance = _ColumnTable(np, {
+            "id": np.int32,
+            "student_id": np.int32,
+            "group_id": np.int32,
+            "subject_id": np.int32,
+            "status": np.uint8,
+            "academic_year": np.int16,
+            "semester": np.uint8,
+        })
+        self.grades = _ColumnTable(np, {
+            "id": np.int32,
+            "student_id": np.int32,
+            "group_id": np.int32,
+            "subject_id": np.int32,
+            "score": np.float32,  # NaN when not graded yet
+            "academic_year": np.int16,
+            "semester": np.uint8,
+        })
+        self._academic_years: Dict[str, int] = {}
+        self._watermarks: Dict[str, Optional[datetime]] = {"attendance": None, "grades": None}
+        self._row_versions = None
+        self._source_versions = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    # ---------- loading ----------
+
+    def _year_code(self, academic_year: Optional[str]) -> int:
+        if academic_year is None:
+            return -1
+        return self._academic_years.setdefault(academic_year, len(self._academic_years))
+
+    def _attendance_query(self):
+        return select(
+            Attendance.id,
+            Attendance.student_id,
+            Student.group_id,
+            Schedule.subject_id,
+            Attendance.status,
+            Schedule.academic_year,
+            Schedule.semester,
+            Attendance.updated_at,
+        ).join(Student, Attendance.student_id == Student.id).join(
+            Schedule, Attendance.schedule_id == Schedule.id
+        )
+
+    def _grades_query(self):
+        return select(
+            Grade.id,
+            Grade.student_id,
+            Student.group_id,
+            AssessmentEvent.subject_id,
+            Grade.score,
+            AssessmentEvent.academic_year,
+            AssessmentEvent.semester,
+            Grade.updated_at,
+        ).join(Student, Grade.student_id == Student.id).join(
+            AssessmentEvent, Grade.assessment_event_id == AssessmentEvent.id
+        )
+
+    def _attendance_columns(self, rows) -> Dict[str, list]:
+        return {
+            "id": [r.id for r in rows],
+            "student_id": [r.student_id for r in rows],
+            "group_id": [r.group_id for r in rows],
+            "subject_id": [r.subject_id for r in rows],
+            "status": [STATUS_CODES[r.status] for r in rows],
+            "academic_year": [self._year_code(r.academic_year) for r in rows],
+            "semester": [r.semester for r in rows],
+        }
+
+    def _grades_columns(self, rows) -> Dict[str, list]:
+        nan = float("nan")
+        return {
+            "id": [r.id for r in rows],
+            "student_id": [r.student_id for r in rows],
+            "group_id": [r.group_id for r in rows],
+            "subject_id": [r.subject_id for r in rows],
+            "score": [nan if r.score is None else r.score for r in rows],
+            "academic_year": [self._year_code(r.academic_year) for r in rows],
+            "semester": [r.semester for r in rows],
+        }
+
+    @staticmethod
+    def _max_updated_at(rows, current: Optional[datetime]) -> Optional[datetime]:
+        stamps = [r.updated_at for r in rows if r.updated_at is not None]
+        if current is not None:
+            stamps.append(current)
+        return max(stamps) if stamps else None
+
+    def _sources(self, name: str):
+        if name == "attendance":
+            return self.attendance, self._attendance_query(), self._attendance_columns, Attendance
+        return self.grades, self._grades_query(), self._grades_columns, Grade
+
+    async def _load(self, session: AsyncSession, name: str) -> None:
+        """Load changed rows of one table (all rows when there is no watermark)."""
+        table, query, to_columns, model = self._sources(name)
+        watermark = self._watermarks[name]
+        if watermark is not None:
+            query = query.where(model.updated_at >= watermark - WATERMARK_OVERLAP)
+
+        rows = (await session.execute(query)).all()
+        if watermark is None:
+            table.replace(to_columns(rows))
+        else:
+            table.upsert(to_columns(rows))
+        self._watermarks[name] = self._max_updated_at(rows, watermark)
+
+        if watermark is not None:
+            count, id_sum = (await session.execute(
+                select(func.count(model.id), func.coalesce(func.sum(model.id), 0))
+            )).one()
+            if count != len(table) or id_sum != table.id_sum():
+                # Rows were deleted since the last refresh
+                self._watermarks[name] = None
+                await self._load(session, name)
+
+    async def refresh(self, session: AsyncSession, force: bool = False) -> None:
+        """Bring the column arrays up to date with the database."""
+        async with self._lock:
+            row_versions = table_versions(_ROW_TABLES)
+            source_versions = table_versions(_SOURCE_TABLES)
+            stale = time.monotonic() - self._loaded_at > FULL_RELOAD_SECONDS
+            if force or stale or source_versions != self._source_versions:
+                self._watermarks = {"attendance": None, "grades": None}
+                self._academic_years = {}
+            elif row_versions == self._row_versions:
+                return
+
+            full = self._watermarks["attendance"] is None
+            await self._load(session, "attendance")
+            await self._load(session, "grades")
+            self._row_versions = row_versions
+            self._source_versions = source_versions
+            if full:
+                self._loaded_at = time.monotonic()
+
+    # ---------- filtering ----------
+
+    def _mask(
+        self,
+        table: _ColumnTable,
+        group_id: Optional[int] = None,
+        subject_id: Optional[int] = None,
+        academic_year: Optional[str] = None,
+        semester: Optional[int] = None,
+    ):
+        np = self.np
+        columns = table.columns
+        mask = np.ones(len(table), dtype=bool)
+        if group_id is not None:
+            mask &= columns["group_id"] == group_id
+        if subject_id is not None:
+            mask &= columns["subject_id"] == subject_id
+        if academic_year:
+            mask &= columns["academic_year"] == self._academic_years.get(academic_year, -2)
+        if semester:
+            mask &= columns["semester"] == semester
+        return mask
+
+    def _group_keys(self, high, low):
+        """Factorize (high, low) int32 pairs into dense group indices."""
+        np = self.np
+        keys = (high.astype(np.int64) << 32) | low.astype(np.int64)
+        unique, inverse = np.unique(keys, return_inverse=True)
+        return (unique >> 32).astype(np.int64), (unique & 0xFFFFFFFF).astype(np.int64), inverse
+
+    # ---------- cross-tabs ----------
+
+    def attendance_by_student_subject(self, **filters) -> List[Dict[str, Any]]:
+        """Attendance counts and rate per student x subject."""
+        np = self.np
+        mask = self._mask(self.attendance, **filters)
+        columns = {name: values[mask] for name, values in self.attendance.columns.items()}
+        if not len(columns["id"]):
+            return []
+
+        students, subjects, inverse = self._group_keys(columns["student_id"], columns["subject_id"])
+        n_status = len(STATUS_CODES)
+        counts = np.bincount(
+            inverse * n_status + columns["status"], minlength=len(students) * n_status
+        ).reshape(-1, n_status)
+        totals = counts.sum(axis=1)
+        attended = counts[:, ATTENDED_CODES].sum(axis=1)
+        rates = np.round(attended / totals * 100, 2)
+
+        return [
+            {
+                "student_id": int(students[i]),
+                "subject_id": int(subjects[i]),
+                "total": int(totals[i]),
+                **{status.value: int(counts[i, code]) for status, code in STATUS_CODES.items()},
+                "rate": float(rates[i]),
+            }
+            for i in range(len(students))
+        ]
+
+    def grade_stats_by_subject_group(self, **filters) -> List[Dict[str, Any]]:
+        """Count, mean, std-dev, min/max and quartiles per subject x group."""
+        np = self.np
+        mask = self._mask(self.grades, **filters) & ~np.isnan(self.grades.columns["score"])
+        scores = self.grades.columns["score"][mask].astype(np.float64)
+        if not len(scores):
+            return []
+
+        subjects, groups, inverse = self._group_keys(
+            self.grades.columns["subject_id"][mask], self.grades.columns["group_id"][mask]
+        )
+        counts = np.bincount(inverse)
+        sums = np.bincount(inverse, weights=scores)
+        squares = np.bincount(inverse, weights=scores * scores)
+        means = sums / counts
+        stds = np.sqrt(np.maximum(squares / counts - means * means, 0))
+
+        order = np.lexsort((scores, inverse))
+        ordered = scores[order]
+        starts = np.cumsum(counts) - counts
+
+        def quantile(q):
+            position = starts + q * (counts - 1)
+            lower = np.floor(position).astype(np.int64)
+            upper = np.ceil(position).astype(np.int64)
+            fraction = position - lower
+            return ordered[lower] * (1 - fraction) + ordered[upper] * fraction
+
+        p25, median, p75 = quantile(0.25), quantile(0.5), quantile(0.75)
+        minimums = ordered[starts]
+        maximums = ordered[starts + counts - 1]
+
+        return [
+            {
+                "subject_id": int(subjects[i]),
+                "group_id": int(groups[i]),
+                "count": int(counts[i]),
+                "mean": round(float(means[i]), 2),
+                "std": round(float(stds[i]), 2),
+                "min": round(float(minimums[i]), 2),
+                "p25": round(float(p25[i]), 2),
+                "median": round(float(median[i]), 2),
+                "p75": round(float(p75[i]), 2),
+                "max": round(float(maximums[i]), 2),
+            }
+            for i in range(len(counts))
+        ]
+
+    def attendance_grade_correlation(self, **filters) -> Dict[str, Any]:
+        """
+        Pearson correlation between a student's attendance rate and mean score,
+        overall and per group.
+        """
+        np = self.np
+        att_mask = self._mask(self.attendance, **filters)
+        att_students, att_inverse = np.unique(
+            self.attendance.columns["student_id"][att_mask], return_inverse=True
+        )
+        attended = np.isin(self.attendance.columns["status"][att_mask], ATTENDED_CODES)
+        rates = (
+            np.bincount(att_inverse, weights=attended, minlength=len(att_students))
+            / np.maximum(np.bincount(att_inverse, minlength=len(att_students)), 1)
+            * 100
+        )
+
+        grade_mask = self._mask(self.grades, **filters) & ~np.isnan(self.grades.columns["score"])
+        grade_students, first_index, grade_inverse = np.unique(
+            self.grades.columns["student_id"][grade_mask], return_index=True, return_inverse=True
+        )
+        scores = self.grades.columns["score"][grade_mask].astype(np.float64)
+        means = np.bincount(grade_inverse, weights=scores) / np.bincount(grade_inverse)
+        student_groups = self.grades.columns["group_id"][grade_mask][first_index]
+
+        students, att_index, grade_index = np.intersect1d(
+            att_students, grade_students, assume_unique=True, return_indices=True
+        )
+        x = rates[att_index]
+        y = means[grade_index]
+        groups, group_inverse = np.unique(student_groups[grade_index], return_inverse=True)
+
+        def pearson(n, sx, sy, sxy, sxx, syy):
+            denominator = np.sqrt(np.maximum(n * sxx - sx * sx, 0) * np.maximum(n * syy - sy * sy, 0))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                r = (n * sxy - sx * sy) / denominator
+            return np.where((n >= 2) & (denominator > 0), r, np.nan)
+
+        def sums(index, size):
+            return [
+                np.bincount(index, weights=w, minlength=size)
+                for w in (np.ones_like(x), x, y, x * y, x * x, y * y)
+            ]
+
+        overall = pearson(*sums(np.zeros(len(x), dtype=np.int64), 1))[0]
+        per_group = pearson(*sums(group_inverse, len(groups)))
+        group_sizes = np.bincount(group_inverse, minlength=len(groups))
+
+        def value(r):
+            return None if np.isnan(r) else round(float(r), 4)
+
+        return {
+            "students": int(len(students)),
+            "overall": value(overall),
+            "by_group": [
+                {"group_id": int(groups[i]), "students": int(group_sizes[i]), "correlation": value(per_group[i])}
+                for i in range(len(groups))
+            ],
+        }
+
+    def grades_distribution(self, **filters) -> Dict[str, Any]:
+        """Letter grade distribution, same shape as /analytics/grades/distribution."""
+        np = self.np
+        mask = self._mask(self.grades, **filters)
+        scores = self.grades.columns["score"][mask]
+        scores = scores[~np.isnan(scores)]
+        counts = np.bincount(np.digitize(scores, LETTER_GRADE_BINS), minlength=len(LETTER_GRADES))
+        total = int(len(scores))
+        by_letter = {letter: int(counts[i]) for i, letter in enumerate(LETTER_GRADES)}
+        return {
+            **{letter: by_letter[letter] for letter in "ABCDF"},
+            "total": total,
+            "percentages": {
+                letter: round(by_letter[letter] / total * 100 if total > 0 else 0, 2)
+                for letter in "ABCDF"
+            },
+        }
+
+
+_engine: Optional[ColumnarAnalyticsEngine] = None
+
+
+async def get_analytics_engine(session: AsyncSession) -> ColumnarAnalyticsEngine:
+    """Get the process-wide engine, refreshed against the current database."""
+    global _engine
+    if _engine is None:
+        _engine = ColumnarAnalyticsEngine()
+    await _engine.refresh(session)
+    return _engine
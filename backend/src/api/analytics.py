@@ -1,24 +1,103 @@
-from typing import List, Dict, Any
-from datetime import date, datetime
-from fastapi import APIRouter, HTTPException, status
-from sqlalchemy import select, func, and_
-from sqlalchemy.orm import selectinload
-
-from src.api.dependencies import SessionDep, TeacherUser, CurrentUser
-from src.models.users import User, UserRole
+from bisect import bisect_right
+from typing import List, Dict, Any, Literal, Optional
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, HTTPException, Query, status
+from sqlalchemy import select, func, and_, cast, Date
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.dependencies import SessionDep, TeacherUser, CurrentUser, CurrentIdentity, AdminUser
+from src.cache import analytics_cache
+from src.identity import Identity
+from src.analytics_engine import columnar_engine_enabled, get_analytics_engine
+from src.rankings import get_rankings
+from src.risk import risk_job
+from src.models.users import UserRole
 from src.models.students import Student
 from src.models.teachers import Teacher
 from src.models.groups import Group
 from src.models.subjects import Subject
-from src.models.attendance import Attendance, AttendanceStatus
-from src.models.grades import Grade
+from src.models.attendance import Attendance, AttendanceStatus, AttendanceDailyRollup
+from src.models.grades import Grade, StudentSubjectGradeStats
 from src.models.disciplinary import DisciplinaryRecord
+from src.models.risk import RiskFlagType, StudentRiskFlag
 from src.models.schedule import Schedule
 from src.models.assessment_events import AssessmentEvent
-from src.schemas.analytics import DashboardStats, GroupAnalytics, StudentAnalytics
+from src.schemas.analytics import (
+    DashboardStats, GroupAnalytics, StudentAnalytics, StudentAnalyticsBatchRequest, CacheStats,
+    StudentStanding, Leaderboard, RiskFlagRead, AtRiskStudent,
+)
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
+# Tables each cached endpoint reads; a committed write to any of them
+# invalidates that endpoint's cache entries (see src/cache.py).
+DASHBOARD_TABLES = (
+    Student.__tablename__, Teacher.__tablename__, Group.__tablename__, Subject.__tablename__,
+    AttendanceDailyRollup.__tablename__, StudentSubjectGradeStats.__tablename__,
+    DisciplinaryRecord.__tablename__,
+)
+GROUP_ANALYTICS_TABLES = (
+    Group.__tablename__, Student.__tablename__, Subject.__tablename__, Schedule.__tablename__,
+    Attendance.__tablename__, StudentSubjectGradeStats.__tablename__,
+)
+STUDENT_ANALYTICS_TABLES = GROUP_ANALYTICS_TABLES + (DisciplinaryRecord.__tablename__,)
+GRADES_DISTRIBUTION_TABLES = (
+    Grade.__tablename__, AssessmentEvent.__tablename__, Student.__tablename__,
+)
+
+
+def _scalar(query):
+    """Wrap an aggregate query as a scalar subquery."""
+    return query.scalar_subquery()
+
+
+def _stats_average():
+    """Mean score over the grade stats rows aggregated by the enclosing query."""
+    stats = StudentSubjectGradeStats
+    return func.sum(stats.score_sum) / func.nullif(func.sum(stats.count), 0)
+
+
+def dashboard_stats_query(today: date):
+    """
+    Build a single statement that computes every dashboard aggregate.
+
+    Each figure is an independent scalar subquery, so the database evaluates
+    them all in one round trip instead of one query per number.
+    Attendance figures come from the daily rollup (see src/rollups.py) and
+    the grade average from the per-student grade stats (see src/grade_stats.py).
+    """
+    rollup = AttendanceDailyRollup
+    attended = rollup.status.in_([AttendanceStatus.PRESENT, AttendanceStatus.LATE])
+    attendance_sum = func.coalesce(func.sum(rollup.count), 0)
+    semester_start = today - timedelta(days=120)  # Approximate - last 4 months
+
+    return select(
+        _scalar(select(func.count(Student.id))).label("total_students"),
+        _scalar(select(func.count(Teacher.id))).label("total_teachers"),
+        _scalar(select(func.count(Group.id))).label("total_groups"),
+        _scalar(select(func.count(Subject.id))).label("total_subjects"),
+        _scalar(
+            select(attendance_sum).where(rollup.date == today)
+        ).label("today_total"),
+        _scalar(
+            select(attendance_sum).where(and_(rollup.date == today, attended))
+        ).label("today_present"),
+        _scalar(
+            select(attendance_sum).where(rollup.date >= semester_start)
+        ).label("semester_total"),
+        _scalar(
+            select(attendance_sum).where(and_(rollup.date >= semester_start, attended))
+        ).label("semester_present"),
+        _scalar(
+            select(_stats_average())
+        ).label("average_grade"),
+        _scalar(
+            select(func.count(DisciplinaryRecord.id)).where(
+                DisciplinaryRecord.date >= today - timedelta(days=30)
+            )
+        ).label("recent_violations"),
+    )
+
 
 @router.get("/dashboard", response_model=DashboardStats)
 async def get_dashboard_stats(
@@ -28,72 +107,48 @@ async def get_dashboard_stats(
     """
     Get dashboard statistics for admin/teacher overview.
     """
-    # Count totals
-    students_result = await session.execute(select(func.count(Student.id)))
-    total_students = students_result.scalar() or 0
-
-    teachers_result = await session.execute(select(func.count(Teacher.id)))
-    total_teachers = teachers_result.scalar() or 0
-
-    groups_result = await session.execute(select(func.count(Group.id)))
-    total_groups = groups_result.scalar() or 0
-
-    subjects_result = await session.execute(select(func.count(Subject.id)))
-    total_subjects = subjects_result.scalar() or 0
-
-    # Today's attendance
     today = date.today()
-    today_attendance_query = select(
-        Attendance.status,
-        func.count(Attendance.id).label("count")
-    ).where(Attendance.date == today).group_by(Attendance.status)
-
-    today_result = await session.execute(today_attendance_query)
-    today_stats = {r.status.value: r.count for r in today_result.all()}
-
-    today_total = sum(today_stats.values())
-    today_present = today_stats.get("present", 0) + today_stats.get("late", 0)
-    today_rate = (today_present / today_total * 100) if today_total > 0 else 0
-
-    # Semester attendance (approximate - last 4 months)
-    from datetime import timedelta
-    semester_start = today - timedelta(days=120)
-
-    semester_query = select(
-        Attendance.status,
-        func.count(Attendance.id).label("count")
-    ).where(Attendance.date >= semester_start).group_by(Attendance.status)
-
-    semester_result = await session.execute(semester_query)
-    semester_stats = {r.status.value: r.count for r in semester_result.all()}
+    return await analytics_cache.get_or_compute(
+        ("dashboard", today),
+        DASHBOARD_TABLES,
+        lambda: _compute_dashboard_stats(session, today),
+    )
 
-    semester_total = sum(semester_stats.values())
-    semester_present = semester_stats.get("present", 0) + semester_stats.get("late", 0)
-    semester_rate = (semester_present / semester_total * 100) if semester_total > 0 else 0
 
-    # Average grade (score is already 0-100)
-    avg_grade_result = await session.execute(
-        select(func.avg(Grade.score)).where(Grade.score.isnot(None))
-    )
-    avg_grade = avg_grade_result.scalar() or 0
+async def _compute_dashboard_stats(session: AsyncSession, today: date) -> DashboardStats:
+    """All aggregates are fetched with a single statement."""
+    result = await session.execute(dashboard_stats_query(today))
+    r = result.one()
 
-    # Recent violations (last 30 days)
-    violations_result = await session.execute(
-        select(func.count(DisciplinaryRecord.id)).where(
-            DisciplinaryRecord.date >= today - timedelta(days=30)
-        )
-    )
-    recent_violations = violations_result.scalar() or 0
+    today_rate = (r.today_present / r.today_total * 100) if r.today_total else 0
+    semester_rate = (r.semester_present / r.semester_total * 100) if r.semester_total else 0
 
     return DashboardStats(
-        total_students=total_students,
-        total_teachers=total_teachers,
-        total_groups=total_groups,
-        total_subjects=total_subjects,
+        total_students=r.total_students or 0,
+        total_teachers=r.total_teachers or 0,
+        total_groups=r.total_groups or 0,
+        total_subjects=r.total_subjects or 0,
         today_attendance_rate=round(today_rate, 2),
         semester_attendance_rate=round(semester_rate, 2),
-        average_grade=round(float(avg_grade), 2),
-        recent_violations=recent_violations,
+        average_grade=round(float(r.average_grade or 0), 2),
+        recent_violations=r.recent_violations or 0,
+    )
+
+
+@router.get("/groups", response_model=List[GroupAnalytics])
+async def get_all_groups_analytics(
+    session: SessionDep,
+    current_user: TeacherUser,
+    academic_year: str = None,
+    semester: int = None,
+):
+    """
+    Get analytics for every group at once (admin overview).
+    """
+    return await analytics_cache.get_or_compute(
+        ("groups", academic_year, semester),
+        GROUP_ANALYTICS_TABLES,
+        lambda: _compute_groups_analytics(session, None, academic_year, semester),
     )
 
 
@@ -108,164 +163,280 @@ async def get_group_analytics(
     """
     Get comprehensive analytics for a group.
     """
-    # Get group
-    group_result = await session.execute(select(Group).where(Group.id == group_id))
-    group = group_result.scalar_one_or_none()
-    if not group:
+    return await analytics_cache.get_or_compute(
+        ("group", group_id, academic_year, semester),
+        GROUP_ANALYTICS_TABLES,
+        lambda: _compute_group_analytics(session, group_id, academic_year, semester),
+    )
+
+
+async def _compute_group_analytics(
+    session: AsyncSession,
+    group_id: int,
+    academic_year: str = None,
+    semester: int = None,
+) -> GroupAnalytics:
+    analytics = await _compute_groups_analytics(session, group_id, academic_year, semester)
+    if not analytics:
         raise HTTPException(status_code=404, detail="Group not found")
+    return analytics[0]
 
-    # Get student count
-    student_count_result = await session.execute(
-        select(func.count(Student.id)).where(Student.group_id == group_id)
-    )
-    student_count = student_count_result.scalar() or 0
 
-    # Get students for this group
-    students_result = await session.execute(
-        select(Student).where(Student.group_id == group_id)
+async def _compute_groups_analytics(
+    session: AsyncSession,
+    group_id: Optional[int] = None,
+    academic_year: str = None,
+    semester: int = None,
+) -> List[GroupAnalytics]:
+    """
+    Compute GroupAnalytics for one group (group_id) or for all groups.
+    Every query joins through Student.group_id and aggregates per group,
+    so the roster is never loaded into Python.
+    """
+    def for_groups(query, column=Student.group_id):
+        return query.where(column == group_id) if group_id is not None else query
+
+    # Groups with their student counts
+    groups_query = for_groups(
+        select(Group.id, Group.name, func.count(Student.id).label("student_count"))
+        .outerjoin(Student, Student.group_id == Group.id)
+        .group_by(Group.id, Group.name)
+        .order_by(Group.name),
+        Group.id,
     )
-    students = students_result.scalars().all()
-    student_ids = [s.id for s in students]
-
-    if not student_ids:
-        return GroupAnalytics(
-            group_id=group.id,
-            group_name=group.name,
-            student_count=0,
-            average_attendance_rate=0,
-            average_grade=0,
-            top_students=[],
-            attendance_by_subject={},
-            grades_by_subject={},
-        )
-
-    # Calculate average attendance
-    attendance_query = select(
-        Attendance.status,
-        func.count(Attendance.id).label("count")
-    ).where(Attendance.student_id.in_(student_ids))
+    groups = (await session.execute(groups_query)).all()
+    if not groups:
+        return []
+
+    # Attendance rate per group
+    attendance_query = for_groups(
+        select(
+            Student.group_id,
+            func.count(Attendance.id).filter(
+                Attendance.status.in_([AttendanceStatus.PRESENT, AttendanceStatus.LATE])
+            ).label("present"),
+            func.count(Attendance.id).label("total"),
+        ).join(Student, Attendance.student_id == Student.id).group_by(Student.group_id)
+    )
+    attendance_rates = {
+        r.group_id: (r.present / r.total * 100) if r.total > 0 else 0
+        for r in (await session.execute(attendance_query)).all()
+    }
 
-    attendance_result = await session.execute(attendance_query)
-    att_stats = {r.status.value: r.count for r in attendance_result.all()}
+    stats = StudentSubjectGradeStats
 
-    att_total = sum(att_stats.values())
-    att_present = att_stats.get("present", 0) + att_stats.get("late", 0)
-    avg_attendance = (att_present / att_total * 100) if att_total > 0 else 0
+    # Average grade per group (score is 0-100)
+    avg_grade_query = for_groups(
+        select(Student.group_id, _stats_average().label("average"))
+        .join(Student, stats.student_id == Student.id)
+        .group_by(Student.group_id)
+    )
+    average_grades = {
+        r.group_id: float(r.average or 0)
+        for r in (await session.execute(avg_grade_query)).all()
+    }
 
-    # Calculate average grade (score is 0-100)
-    avg_grade_result = await session.execute(
-        select(func.avg(Grade.score)).where(
-            and_(Grade.student_id.in_(student_ids), Grade.score.isnot(None))
+    # Top 5 students by average grade in each group
+    student_averages = for_groups(
+        select(
+            Student.group_id,
+            Student.first_name,
+            Student.last_name,
+            _stats_average().label("average"),
+            func.row_number().over(
+                partition_by=Student.group_id,
+                order_by=(_stats_average().desc(), Student.id),
+            ).label("position"),
+        ).join(stats, stats.student_id == Student.id)
+        .where(stats.count > 0)
+        .group_by(Student.group_id, Student.id, Student.first_name, Student.last_name)
+    ).subquery()
+    top_query = select(student_averages).where(
+        student_averages.c.position <= 5
+    ).order_by(student_averages.c.group_id, student_averages.c.position)
+
+    top_students: Dict[int, List[Dict[str, Any]]] = {}
+    for r in (await session.execute(top_query)).all():
+        top_students.setdefault(r.group_id, []).append(
+            {"name": f"{r.last_name} {r.first_name}", "average": round(float(r.average), 2)}
         )
-    )
-    avg_grade = avg_grade_result.scalar() or 0
-
-    # Get top students by average grade
-    top_students_query = select(
-        Student.id,
-        Student.first_name,
-        Student.last_name,
-        func.avg(Grade.score).label("average")
-    ).join(Grade).where(
-        and_(Student.group_id == group_id, Grade.score.isnot(None))
-    ).group_by(Student.id, Student.first_name, Student.last_name).order_by(
-        func.avg(Grade.score).desc()
-    ).limit(5)
-
-    top_result = await session.execute(top_students_query)
-    top_students = [
-        {"name": f"{r.last_name} {r.first_name}", "average": round(float(r.average), 2)}
-        for r in top_result.all()
-    ]
 
     # Attendance by subject
-    att_by_subject_query = select(
-        Subject.name,
-        func.count(Attendance.id).filter(
-            Attendance.status.in_([AttendanceStatus.PRESENT, AttendanceStatus.LATE])
-        ).label("present"),
-        func.count(Attendance.id).label("total")
-    ).join(Schedule, Attendance.schedule_id == Schedule.id).join(
-        Subject, Schedule.subject_id == Subject.id
-    ).where(
-        Attendance.student_id.in_(student_ids)
-    ).group_by(Subject.name)
-
-    att_subj_result = await session.execute(att_by_subject_query)
-    attendance_by_subject = {
-        r.name: round((r.present / r.total * 100) if r.total > 0 else 0, 2)
-        for r in att_subj_result.all()
-    }
+    att_by_subject_query = for_groups(
+        select(
+            Student.group_id,
+            Subject.name,
+            func.count(Attendance.id).filter(
+                Attendance.status.in_([AttendanceStatus.PRESENT, AttendanceStatus.LATE])
+            ).label("present"),
+            func.count(Attendance.id).label("total"),
+        ).join(Student, Attendance.student_id == Student.id).join(
+            Schedule, Attendance.schedule_id == Schedule.id
+        ).join(
+            Subject, Schedule.subject_id == Subject.id
+        ).group_by(Student.group_id, Subject.name)
+    )
+    attendance_by_subject: Dict[int, Dict[str, float]] = {}
+    for r in (await session.execute(att_by_subject_query)).all():
+        attendance_by_subject.setdefault(r.group_id, {})[r.name] = round(
+            (r.present / r.total * 100) if r.total > 0 else 0, 2
+        )
 
-    # Grades by subject (through assessment_events)
-    grades_by_subject_query = select(
-        Subject.name,
-        func.avg(Grade.score).label("average")
-    ).join(AssessmentEvent, Grade.assessment_event_id == AssessmentEvent.id).join(
-        Subject, AssessmentEvent.subject_id == Subject.id
-    ).where(
-        and_(Grade.student_id.in_(student_ids), Grade.score.isnot(None))
-    ).group_by(Subject.name)
+    # Grades by subject
+    grades_by_subject_query = for_groups(
+        select(
+            Student.group_id,
+            Subject.name,
+            _stats_average().label("average"),
+        ).join(Student, stats.student_id == Student.id).join(
+            Subject, stats.subject_id == Subject.id
+        ).where(stats.count > 0).group_by(Student.group_id, Subject.name)
+    )
 
     # Apply filters if provided
     if academic_year:
-        grades_by_subject_query = grades_by_subject_query.where(AssessmentEvent.academic_year == academic_year)
+        grades_by_subject_query = grades_by_subject_query.where(stats.academic_year == academic_year)
     if semester:
-        grades_by_subject_query = grades_by_subject_query.where(AssessmentEvent.semester == semester)
+        grades_by_subject_query = grades_by_subject_query.where(stats.semester == semester)
 
-    grades_subj_result = await session.execute(grades_by_subject_query)
-    grades_by_subject = {
-        r.name: round(float(r.average), 2)
-        for r in grades_subj_result.all()
-    }
+    grades_by_subject: Dict[int, Dict[str, float]] = {}
+    for r in (await session.execute(grades_by_subject_query)).all():
+        grades_by_subject.setdefault(r.group_id, {})[r.name] = round(float(r.average), 2)
 
-    return GroupAnalytics(
-        group_id=group.id,
-        group_name=group.name,
-        student_count=student_count,
-        average_attendance_rate=round(avg_attendance, 2),
-        average_grade=round(float(avg_grade), 2),
-        top_students=top_students,
-        attendance_by_subject=attendance_by_subject,
-        grades_by_subject=grades_by_subject,
-    )
+    return [
+        GroupAnalytics(
+            group_id=g.id,
+            group_name=g.name,
+            student_count=g.student_count,
+            average_attendance_rate=round(attendance_rates.get(g.id, 0), 2),
+            average_grade=round(average_grades.get(g.id, 0), 2),
+            top_students=top_students.get(g.id, []),
+            attendance_by_subject=attendance_by_subject.get(g.id, {}),
+            grades_by_subject=grades_by_subject.get(g.id, {}),
+        )
+        for g in groups
+    ]
+
+
+def _check_student_access(identity: Identity, student_id: int) -> None:
+    """Students can only view their own analytics."""
+    if identity.role == UserRole.STUDENT and identity.student_id != student_id:
+        raise HTTPException(status_code=403, detail="Access denied")
 
 
 @router.get("/students/{student_id}")
 async def get_student_analytics(
     student_id: int,
     session: SessionDep,
-    current_user: CurrentUser,
+    identity: CurrentIdentity,
     academic_year: str = None,
     semester: int = None,
 ):
     """
     Get comprehensive analytics for a student.
     """
-    # Verify access - students can only view their own analytics
-    if current_user.role == UserRole.STUDENT:
-        student_result = await session.execute(
-            select(Student).where(Student.user_id == current_user.id)
-        )
-        current_student = student_result.scalar_one_or_none()
-        if not current_student or current_student.id != student_id:
-            raise HTTPException(status_code=403, detail="Access denied")
-
-    # Get student with group
-    student_result = await session.execute(
-        select(Student)
-        .where(Student.id == student_id)
-        .options(selectinload(Student.group))
+    _check_student_access(identity, student_id)
+
+    return await analytics_cache.get_or_compute(
+        ("student", student_id, academic_year, semester),
+        STUDENT_ANALYTICS_TABLES,
+        lambda: _compute_student_analytics(session, student_id, academic_year, semester),
     )
-    student = student_result.scalar_one_or_none()
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
+
+
+@router.post("/students/batch")
+async def get_students_analytics_batch(
+    request: StudentAnalyticsBatchRequest,
+    session: SessionDep,
+    current_user: TeacherUser,
+):
+    """
+    Get analytics for a whole group or a list of students in one call.
+    Returns the same structure as /students/{student_id} for each student.
+    """
+    student_ids = tuple(dict.fromkeys(request.student_ids)) if request.student_ids else None
+    return await analytics_cache.get_or_compute(
+        ("students", request.group_id, student_ids, request.academic_year, request.semester),
+        STUDENT_ANALYTICS_TABLES,
+        lambda: _compute_students_analytics(
+            session,
+            group_id=request.group_id,
+            student_ids=student_ids,
+            academic_year=request.academic_year,
+            semester=request.semester,
+        ),
+    )
+
+
+async def _compute_student_analytics(
+    session: AsyncSession,
+    student_id: int,
+    academic_year: str = None,
+    semester: int = None,
+) -> Dict[str, Any]:
+    analytics = await _compute_students_analytics(
+        session, student_ids=[student_id], academic_year=academic_year, semester=semester
+    )
+    return analytics[0]
+
+
+LETTER_GRADE_THRESHOLDS = [60, 70, 80, 90]
+LETTER_GRADES = "FDCBA"
+
+
+def letter_grades(averages: List[float]) -> List[str]:
+    """Band average scores (0-100) into letter grades in one vectorized pass."""
+    try:
+        import numpy as np
+    except ImportError:
+        return [LETTER_GRADES[bisect_right(LETTER_GRADE_THRESHOLDS, avg)] for avg in averages]
+
+    bands = np.searchsorted(LETTER_GRADE_THRESHOLDS, np.asarray(averages, dtype=float), side="right")
+    return np.asarray(list(LETTER_GRADES))[bands].tolist()
+
+
+async def _compute_students_analytics(
+    session: AsyncSession,
+    group_id: Optional[int] = None,
+    student_ids: Optional[List[int]] = None,
+    academic_year: str = None,
+    semester: int = None,
+) -> List[Dict[str, Any]]:
+    """
+    Compute student analytics for a group or a list of students.
+    Uses a fixed number of grouped queries regardless of the number of students.
+    """
+    if group_id is not None:
+        def for_students(column):
+            return column.in_(select(Student.id).where(Student.group_id == group_id))
+    else:
+        def for_students(column):
+            return column.in_(student_ids)
+
+    # Students with their group names
+    students_query = select(
+        Student.id, Student.first_name, Student.last_name, Group.name.label("group_name")
+    ).outerjoin(Group, Student.group_id == Group.id).where(for_students(Student.id))
+    if group_id is not None:
+        students_query = students_query.order_by(Student.last_name, Student.first_name)
+    students = (await session.execute(students_query)).all()
+
+    if group_id is None:
+        found = {s.id: s for s in students}
+        missing = [sid for sid in student_ids if sid not in found]
+        if missing:
+            detail = "Student not found" if len(student_ids) == 1 else (
+                f"Students not found: {', '.join(map(str, missing))}"
+            )
+            raise HTTPException(status_code=404, detail=detail)
+        students = [found[sid] for sid in student_ids]
 
     # Attendance statistics
     att_query = select(
+        Attendance.student_id,
         Attendance.status,
         func.count(Attendance.id).label("count")
-    ).where(Attendance.student_id == student_id)
+    ).where(for_students(Attendance.student_id))
 
     if academic_year or semester:
         att_query = att_query.join(Schedule)
@@ -274,53 +445,39 @@ async def get_student_analytics(
         if semester:
             att_query = att_query.where(Schedule.semester == semester)
 
-    att_query = att_query.group_by(Attendance.status)
-    att_result = await session.execute(att_query)
-    att_stats = {r.status.value: r.count for r in att_result.all()}
+    att_query = att_query.group_by(Attendance.student_id, Attendance.status)
+    att_stats: Dict[int, Dict[str, int]] = {}
+    for r in (await session.execute(att_query)).all():
+        att_stats.setdefault(r.student_id, {})[r.status.value] = r.count
 
-    total_classes = sum(att_stats.values())
-    present = att_stats.get("present", 0)
-    absent = att_stats.get("absent", 0)
-    late = att_stats.get("late", 0)
-    excused = att_stats.get("excused", 0)
-    attendance_rate = ((present + late) / total_classes * 100) if total_classes > 0 else 0
-
-    # Grade statistics by subject (through assessment_events)
+    # Grade statistics by subject, from the per-student grade stats
+    stats = StudentSubjectGradeStats
     grade_query = select(
+        stats.student_id,
         Subject.id,
         Subject.name,
-        func.avg(Grade.score).label("avg"),
-        func.min(Grade.score).label("min"),
-        func.max(Grade.score).label("max"),
-        func.count(Grade.id).label("count")
-    ).join(AssessmentEvent, Grade.assessment_event_id == AssessmentEvent.id).join(
-        Subject, AssessmentEvent.subject_id == Subject.id
-    ).where(and_(Grade.student_id == student_id, Grade.score.isnot(None)))
+        _stats_average().label("avg"),
+        func.min(stats.min_score).label("min"),
+        func.max(stats.max_score).label("max"),
+        func.sum(stats.count).label("count")
+    ).join(
+        Subject, stats.subject_id == Subject.id
+    ).where(and_(for_students(stats.student_id), stats.count > 0))
 
     if academic_year:
-        grade_query = grade_query.where(AssessmentEvent.academic_year == academic_year)
+        grade_query = grade_query.where(stats.academic_year == academic_year)
     if semester:
-        grade_query = grade_query.where(AssessmentEvent.semester == semester)
-
-    grade_query = grade_query.group_by(Subject.id, Subject.name)
-    grade_result = await session.execute(grade_query)
-
-    grades = []
-    total_avg = 0
-    for r in grade_result.all():
-        avg_pct = float(r.avg) if r.avg else 0
-        if avg_pct >= 90:
-            letter = "A"
-        elif avg_pct >= 80:
-            letter = "B"
-        elif avg_pct >= 70:
-            letter = "C"
-        elif avg_pct >= 60:
-            letter = "D"
-        else:
-            letter = "F"
-
-        grades.append({
+        grade_query = grade_query.where(stats.semester == semester)
+
+    grade_query = grade_query.group_by(stats.student_id, Subject.id, Subject.name)
+    grade_rows = (await session.execute(grade_query)).all()
+
+    averages = [float(r.avg) if r.avg else 0 for r in grade_rows]
+    grades_by_student: Dict[int, List[Dict[str, Any]]] = {}
+    total_avg_by_student: Dict[int, float] = {}
+    for r, avg_pct, letter in zip(grade_rows, averages, letter_grades(averages)):
+        total_avg_by_student[r.student_id] = total_avg_by_student.get(r.student_id, 0) + avg_pct
+        grades_by_student.setdefault(r.student_id, []).append({
             "subject_id": r.id,
             "subject_name": r.name,
             "average_score": round(avg_pct, 2),
@@ -329,36 +486,84 @@ async def get_student_analytics(
             "grades_count": r.count,
             "letter_grade": letter,
         })
-        total_avg += avg_pct
-
-    overall_average = total_avg / len(grades) if grades else 0
 
     # Disciplinary count
     disc_result = await session.execute(
-        select(func.count(DisciplinaryRecord.id)).where(
-            DisciplinaryRecord.student_id == student_id
-        )
+        select(
+            DisciplinaryRecord.student_id, func.count(DisciplinaryRecord.id).label("count")
+        ).where(for_students(DisciplinaryRecord.student_id)).group_by(DisciplinaryRecord.student_id)
     )
-    disciplinary_count = disc_result.scalar() or 0
+    disciplinary_counts = dict(disc_result.all())
+
+    analytics = []
+    for student in students:
+        stats = att_stats.get(student.id, {})
+        total_classes = sum(stats.values())
+        present = stats.get("present", 0)
+        absent = stats.get("absent", 0)
+        late = stats.get("late", 0)
+        excused = stats.get("excused", 0)
+        attendance_rate = ((present + late) / total_classes * 100) if total_classes > 0 else 0
+
+        grades = grades_by_student.get(student.id, [])
+        overall_average = total_avg_by_student.get(student.id, 0) / len(grades) if grades else 0
+
+        analytics.append({
+            "student_id": student.id,
+            "student_name": f"{student.last_name} {student.first_name}",
+            "group_name": student.group_name or "",
+            "attendance": {
+                "total_classes": total_classes,
+                "present_count": present,
+                "absent_count": absent,
+                "late_count": late,
+                "excused_count": excused,
+                "attendance_rate": round(attendance_rate, 2),
+            },
+            "grades": grades,
+            "overall_average": round(overall_average, 2),
+            "disciplinary_count": disciplinary_counts.get(student.id, 0),
+            "semester": semester or 0,
+            "academic_year": academic_year or "",
+        })
+    return analytics
+
+
+BUCKETS = ("day", "week", "month", "semester")  # finest to coarsest
+
+
+def _bucket_start(session: AsyncSession, bucket: str, column):
+    """SQL expression truncating a date column to the start of its bucket."""
+    if bucket == "day":
+        return column
+    if session.get_bind().dialect.name == "postgresql":
+        return cast(func.date_trunc(bucket, column), Date)
+    if bucket == "week":
+        return func.date(column, "weekday 0", "-6 days", type_=Date)  # Monday
+    return func.date(column, "start of month", type_=Date)
 
-    return {
-        "student_id": student.id,
-        "student_name": f"{student.last_name} {student.first_name}",
-        "group_name": student.group.name if student.group else "",
-        "attendance": {
-            "total_classes": total_classes,
-            "present_count": present,
-            "absent_count": absent,
-            "late_count": late,
-            "excused_count": excused,
-            "attendance_rate": round(attendance_rate, 2),
-        },
-        "grades": grades,
-        "overall_average": round(overall_average, 2),
-        "disciplinary_count": disciplinary_count,
-        "semester": semester or 0,
-        "academic_year": academic_year or "",
-    }
+
+def _semester_start(day: date) -> date:
+    """First day of the academic semester (Sep-Jan, Feb-Aug) containing day."""
+    if day.month >= 9:
+        return date(day.year, 9, 1)
+    if day.month == 1:
+        return date(day.year - 1, 9, 1)
+    return date(day.year, 2, 1)
+
+
+def _bucket_count(bucket: str, date_from: date, date_to: date) -> int:
+    """Number of buckets overlapping [date_from, date_to]."""
+    def index(day: date) -> int:
+        if bucket == "day":
+            return day.toordinal()
+        if bucket == "week":
+            return (day.toordinal() - day.weekday()) // 7
+        if bucket == "month":
+            return day.year * 12 + day.month
+        start = _semester_start(day)
+        return start.year * 2 + (1 if start.month == 9 else 0)
+    return max(index(date_to) - index(date_from) + 1, 0)
 
 
 @router.get("/attendance/by-date")
@@ -368,55 +573,95 @@ async def get_attendance_by_date(
     group_id: int = None,
     date_from: date = None,
     date_to: date = None,
+    bucket: Literal["day", "week", "month", "semester"] = "day",
+    max_points: int = Query(400, ge=1, le=5000),
+    breakdown: Optional[Literal["subject", "group"]] = None,
 ):
     """
     Get attendance statistics grouped by date.
-    """
-    from datetime import timedelta
+    Reads the daily attendance rollup rather than raw attendance rows.
 
+    Rows are aggregated into day/week/month/semester buckets in SQL. If the
+    requested bucket would produce more than max_points points per series, the
+    next coarser bucket is used; each row reports the bucket it belongs to.
+    A range with more than max_points semesters is rejected.
+    With breakdown=subject|group there is one series per subject or group.
+    """
     if not date_from:
         date_from = date.today() - timedelta(days=30)
     if not date_to:
         date_to = date.today()
 
+    for bucket in BUCKETS[BUCKETS.index(bucket):]:
+        if _bucket_count(bucket, date_from, date_to) <= max_points:
+            break
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Date range spans more than max_points={max_points} semesters; narrow it or raise max_points",
+        )
+
+    rollup = AttendanceDailyRollup
+    # Semesters are folded from monthly buckets below
+    period = _bucket_start(session, "month" if bucket == "semester" else bucket, rollup.date).label("period")
+    series_columns = []
+    if breakdown == "subject":
+        series_columns = [rollup.subject_id, Subject.name.label("series_name")]
+    elif breakdown == "group":
+        series_columns = [rollup.group_id, Group.name.label("series_name")]
+
     query = select(
-        Attendance.date,
-        func.count(Attendance.id).filter(
-            Attendance.status == AttendanceStatus.PRESENT
-        ).label("present"),
-        func.count(Attendance.id).filter(
-            Attendance.status == AttendanceStatus.ABSENT
-        ).label("absent"),
-        func.count(Attendance.id).filter(
-            Attendance.status == AttendanceStatus.LATE
-        ).label("late"),
-        func.count(Attendance.id).filter(
-            Attendance.status == AttendanceStatus.EXCUSED
-        ).label("excused"),
-        func.count(Attendance.id).label("total"),
+        period,
+        *series_columns,
+        func.coalesce(func.sum(rollup.count).filter(
+            rollup.status == AttendanceStatus.PRESENT
+        ), 0).label("present"),
+        func.coalesce(func.sum(rollup.count).filter(
+            rollup.status == AttendanceStatus.ABSENT
+        ), 0).label("absent"),
+        func.coalesce(func.sum(rollup.count).filter(
+            rollup.status == AttendanceStatus.LATE
+        ), 0).label("late"),
+        func.coalesce(func.sum(rollup.count).filter(
+            rollup.status == AttendanceStatus.EXCUSED
+        ), 0).label("excused"),
+        func.sum(rollup.count).label("total"),
     ).where(
-        and_(Attendance.date >= date_from, Attendance.date <= date_to)
+        and_(rollup.date >= date_from, rollup.date <= date_to)
     )
 
     if group_id:
-        query = query.join(Student).where(Student.group_id == group_id)
+        query = query.where(rollup.group_id == group_id)
+    if breakdown == "subject":
+        query = query.join(Subject, rollup.subject_id == Subject.id)
+    elif breakdown == "group":
+        query = query.join(Group, rollup.group_id == Group.id)
 
-    query = query.group_by(Attendance.date).order_by(Attendance.date)
+    query = query.group_by(period, *series_columns).order_by(period)
 
     result = await session.execute(query)
 
-    return [
-        {
-            "date": r.date.isoformat(),
-            "present": r.present,
-            "absent": r.absent,
-            "late": r.late,
-            "excused": r.excused,
-            "total": r.total,
-            "rate": round((r.present + r.late) / r.total * 100 if r.total > 0 else 0, 2),
-        }
-        for r in result.all()
-    ]
+    points: Dict[tuple, Dict[str, Any]] = {}
+    for r in result.all():
+        start = _semester_start(r.period) if bucket == "semester" else r.period
+        series = tuple(r[1:1 + len(series_columns)])
+        point = points.get((start, series))
+        if point is None:
+            point = points[(start, series)] = {
+                "date": start.isoformat(),
+                "bucket": bucket,
+                "present": 0, "absent": 0, "late": 0, "excused": 0, "total": 0,
+            }
+            if breakdown:
+                point[f"{breakdown}_id"], point[f"{breakdown}_name"] = series
+        for key in ("present", "absent", "late", "excused", "total"):
+            point[key] += r._mapping[key]
+
+    rows = list(points.values())
+    for point in rows:
+        total = point["total"]
+        point["rate"] = round((point["present"] + point["late"]) / total * 100 if total > 0 else 0, 2)
+    return rows
 
 
 @router.get("/grades/distribution")
@@ -431,6 +676,26 @@ async def get_grades_distribution(
     """
     Get grade distribution statistics.
     """
+    if columnar_engine_enabled():
+        engine = await get_analytics_engine(session)
+        return engine.grades_distribution(
+            subject_id=subject_id, group_id=group_id, academic_year=academic_year, semester=semester
+        )
+
+    return await analytics_cache.get_or_compute(
+        ("grades_distribution", subject_id, group_id, academic_year, semester),
+        GRADES_DISTRIBUTION_TABLES,
+        lambda: _compute_grades_distribution(session, subject_id, group_id, academic_year, semester),
+    )
+
+
+async def _compute_grades_distribution(
+    session: AsyncSession,
+    subject_id: int = None,
+    group_id: int = None,
+    academic_year: str = None,
+    semester: int = None,
+) -> Dict[str, Any]:
     # Define grade ranges (score is 0-100)
     query = select(
         func.count(Grade.id).filter(Grade.score >= 90).label("a_count"),
@@ -478,3 +743,149 @@ async def get_grades_distribution(
             "F": round(r.f_count / r.total * 100 if r.total > 0 else 0, 2),
         }
     }
+
+
+@router.get("/rankings/students/{student_id}", response_model=StudentStanding)
+async def get_student_standing(
+    student_id: int,
+    session: SessionDep,
+    identity: CurrentIdentity,
+    academic_year: str = None,
+    semester: int = None,
+):
+    """
+    Get a student's rank and percentile within the group, course and department
+    for attendance rate and average score.
+    """
+    _check_student_access(identity, student_id)
+
+    rankings = await get_rankings(session, academic_year, semester)
+    standing = rankings.standing(student_id)
+    if standing is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+    return standing
+
+
+@router.get("/rankings/leaderboard", response_model=Leaderboard)
+async def get_leaderboard(
+    session: SessionDep,
+    current_user: TeacherUser,
+    scope: Literal["group", "course", "department"] = "department",
+    scope_id: int = Query(None, description="Group id or course number; ignored for department"),
+    metric: Literal["attendance", "score"] = "score",
+    academic_year: str = None,
+    semester: int = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """
+    Get a page of a leaderboard, ordered by rank.
+    """
+    if scope != "department" and scope_id is None:
+        raise HTTPException(status_code=400, detail="scope_id is required for group and course leaderboards")
+
+    rankings = await get_rankings(session, academic_year, semester)
+    total, entries = rankings.leaderboard(scope, scope_id, metric, offset, limit)
+    return Leaderboard(
+        scope=scope,
+        scope_id=None if scope == "department" else scope_id,
+        metric=metric,
+        total=total,
+        offset=offset,
+        entries=entries,
+    )
+
+
+@router.get("/at-risk", response_model=List[AtRiskStudent])
+async def get_at_risk_students(
+    session: SessionDep,
+    current_user: TeacherUser,
+    group_id: int = None,
+    flag: RiskFlagType = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Get cadets flagged as at risk by the background risk job.
+    """
+    flagged = select(StudentRiskFlag.student_id)
+    if flag:
+        flagged = flagged.where(StudentRiskFlag.flag == flag)
+
+    students_query = select(
+        Student.id, Student.first_name, Student.last_name, Student.group_id, Group.name.label("group_name")
+    ).join(Group, Student.group_id == Group.id).where(Student.id.in_(flagged))
+    if group_id:
+        students_query = students_query.where(Student.group_id == group_id)
+    students_query = students_query.order_by(Group.name, Student.last_name, Student.first_name, Student.id)
+    students = (await session.execute(students_query.offset(skip).limit(limit))).all()
+    if not students:
+        return []
+
+    flags_result = await session.execute(
+        select(StudentRiskFlag).where(
+            StudentRiskFlag.student_id.in_([s.id for s in students])
+        ).order_by(StudentRiskFlag.flag)
+    )
+    flags: Dict[int, List[RiskFlagRead]] = {}
+    for f in flags_result.scalars().all():
+        flags.setdefault(f.student_id, []).append(RiskFlagRead(
+            flag=f.flag.value,
+            value=f.value,
+            threshold=f.threshold,
+            details=f.details,
+            detected_at=f.detected_at,
+        ))
+
+    return [
+        AtRiskStudent(
+            student_id=s.id,
+            student_name=f"{s.last_name} {s.first_name}",
+            group_id=s.group_id,
+            group_name=s.group_name,
+            flags=flags.get(s.id, []),
+        )
+        for s in students
+    ]
+
+
+@router.post("/at-risk/refresh")
+async def refresh_at_risk_students(
+    current_user: AdminUser,
+    full: bool = False,
+):
+    """
+    Run the risk job now instead of waiting for its next scheduled run.
+    """
+    return await risk_job.run_once(full=full)
+
+
+@router.get("/reports/semester")
+async def get_semester_report(
+    session: SessionDep,
+    current_user: TeacherUser,
+    group_id: int = None,
+    subject_id: int = None,
+    academic_year: str = None,
+    semester: int = None,
+):
+    """
+    Cross-tab statistics for semester reports, computed by the columnar engine:
+    attendance per student x subject, grade statistics per subject x group and
+    the correlation between attendance and grades.
+    """
+    engine = await get_analytics_engine(session)
+    filters = dict(group_id=group_id, subject_id=subject_id, academic_year=academic_year, semester=semester)
+    return {
+        "attendance_by_student_subject": engine.attendance_by_student_subject(**filters),
+        "grades_by_subject_group": engine.grade_stats_by_subject_group(**filters),
+        "attendance_grade_correlation": engine.attendance_grade_correlation(**filters),
+    }
+
+
+@router.get("/cache", response_model=CacheStats)
+async def get_analytics_cache_stats(current_user: AdminUser):
+    """
+    Hit/miss counters of the analytics cache, for tuning its size and TTL.
+    """
+    return CacheStats(**analytics_cache.stats())
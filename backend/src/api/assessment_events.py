@@ -1,9 +1,12 @@
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, status, Query
-from sqlalchemy import select, and_
+from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
 from src.api.dependencies import SessionDep, TeacherUser, CurrentUser
+from src.final_grades import recompute_final_grades
+from src.grade_stats import GradeFact, event_period, record_grade_changes
+from src.grading import upsert_grades
 from src.models.assessment_events import AssessmentEvent, AssessmentEventType
 from src.models.grades import Grade
 from src.models.groups import Group
@@ -174,45 +177,17 @@ async def bulk_update_grades(
     if not event:
         raise HTTPException(status_code=404, detail="Assessment event not found")
     
-    created_count = 0
-    updated_count = 0
-    
-    for grade_input in grades_data:
-        # Check if grade already exists
-        grade_result = await session.execute(
-            select(Grade).where(
-                and_(
-                    Grade.student_id == grade_input.student_id,
-                    Grade.assessment_event_id == event_id
-                )
-            )
-        )
-        existing_grade = grade_result.scalar_one_or_none()
-        
-        if existing_grade:
-            # Update existing grade
-            if grade_input.score is not None:
-                existing_grade.score = grade_input.score
-            if grade_input.comment is not None:
-                existing_grade.comment = grade_input.comment
-            updated_count += 1
-        else:
-            # Create new grade
-            new_grade = Grade(
-                student_id=grade_input.student_id,
-                assessment_event_id=event_id,
-                score=grade_input.score,
-                comment=grade_input.comment
-            )
-            session.add(new_grade)
-            created_count += 1
-    
+    result = await upsert_grades(session, event_id, grades_data)
     await session.commit()
-    
+
     return {
-        "message": f"Оценки сохранены! (создано: {created_count}, обновлено: {updated_count})",
-        "created": created_count,
-        "updated": updated_count
+        "message": (
+            f"Оценки сохранены! (создано: {result.created}, обновлено: {result.updated}, "
+            f"пропущено: {result.skipped})"
+        ),
+        "created": result.created,
+        "updated": result.updated,
+        "skipped": result.skipped,
     }
 
 
@@ -234,10 +209,24 @@ async def update_assessment_event(
     if not event:
         raise HTTPException(status_code=404, detail="Assessment event not found")
 
+    old_event_type = event.event_type
     update_data = event_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(event, field, value)
 
+    if event.event_type != old_event_type:
+        # The event now counts with another weight in its students' final grades
+        students_result = await session.execute(
+            select(Grade.student_id).where(
+                Grade.assessment_event_id == event_id,
+                Grade.score.isnot(None),
+            )
+        )
+        await recompute_final_grades(
+            session,
+            [(student_id, *event_period(event)) for student_id in students_result.scalars().all()],
+        )
+
     await session.commit()
     await session.refresh(event)
 
@@ -262,5 +251,12 @@ async def delete_assessment_event(
     if not event:
         raise HTTPException(status_code=404, detail="Assessment event not found")
 
+    grades_result = await session.execute(
+        select(Grade.student_id, Grade.score).where(Grade.assessment_event_id == event_id)
+    )
+    removed = [(GradeFact(r.student_id, event_id, r.score), None) for r in grades_result.all()]
+
     await session.delete(event)
+    await session.flush()
+    await record_grade_changes(session, removed, period_by_event={event.id: event_period(event)})
     await session.commit()
@@ -2,15 +2,14 @@ from typing import List
 from datetime import date
 from fastapi import APIRouter, HTTPException, status
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 
-from src.api.dependencies import SessionDep, TeacherUser, CurrentUser
+from src.api.dependencies import SessionDep, TeacherUser, CurrentUser, CurrentIdentity
 from src.models.assignments import Assignment
 from src.models.subjects import Subject
 from src.models.teachers import Teacher
-from src.models.students import Student
 from src.models.groups import Group
 from src.models.users import UserRole
+from src.reference_data import load_reference_data, read_with_references
 from src.schemas.assignments import AssignmentCreate, AssignmentRead, AssignmentUpdate
 
 router = APIRouter(prefix="/assignments", tags=["Assignments"])
@@ -21,6 +20,7 @@ async def create_assignment(
     assignment_data: AssignmentCreate,
     session: SessionDep,
     current_user: TeacherUser,
+    identity: CurrentIdentity,
 ):
     """
     Create a new assignment (teachers and admins only).
@@ -35,12 +35,7 @@ async def create_assignment(
     # Get teacher_id from current user if not provided
     teacher_id = assignment_data.teacher_id
     if not teacher_id and current_user.role == UserRole.TEACHER:
-        teacher_result = await session.execute(
-            select(Teacher).where(Teacher.user_id == current_user.id)
-        )
-        teacher = teacher_result.scalar_one_or_none()
-        if teacher:
-            teacher_id = teacher.id
+        teacher_id = identity.teacher_id
     
     if not teacher_id:
         raise HTTPException(status_code=400, detail="Teacher ID is required")
@@ -60,19 +55,8 @@ async def create_assignment(
     await session.commit()
     await session.refresh(new_assignment)
 
-    # Load relationships
-    result = await session.execute(
-        select(Assignment)
-        .where(Assignment.id == new_assignment.id)
-        .options(
-            selectinload(Assignment.subject),
-            selectinload(Assignment.teacher),
-            selectinload(Assignment.group),
-        )
-    )
-    new_assignment = result.scalar_one()
-
-    return AssignmentRead.model_validate(new_assignment)
+    refs = await load_reference_data(session)
+    return read_with_references(AssignmentRead, new_assignment, refs)
 
 
 @router.get("/", response_model=List[AssignmentRead])
@@ -90,11 +74,7 @@ async def list_assignments(
     List assignments with optional filters.
     Students only see published assignments.
     """
-    query = select(Assignment).options(
-        selectinload(Assignment.subject),
-        selectinload(Assignment.teacher),
-        selectinload(Assignment.group),
-    )
+    query = select(Assignment)
 
     if subject_id:
         query = query.where(Assignment.subject_id == subject_id)
@@ -111,52 +91,43 @@ async def list_assignments(
 
     result = await session.execute(query)
     assignments = result.scalars().all()
-    return [AssignmentRead.model_validate(a) for a in assignments]
+    refs = await load_reference_data(session)
+    return [read_with_references(AssignmentRead, a, refs) for a in assignments]
 
 
 @router.get("/my", response_model=List[AssignmentRead])
 async def get_my_assignments(
     session: SessionDep,
     current_user: CurrentUser,
+    identity: CurrentIdentity,
     limit: int = 100,
 ):
     """
     Get assignments for current user's group (students only).
     Teachers get all their assignments.
     """
-    query = select(Assignment).options(
-        selectinload(Assignment.subject),
-        selectinload(Assignment.teacher),
-        selectinload(Assignment.group),
-    ).where(Assignment.is_published == True)
+    query = select(Assignment).where(Assignment.is_published == True)
 
     if current_user.role == UserRole.STUDENT:
         # Get student's group
-        student_result = await session.execute(
-            select(Student).where(Student.user_id == current_user.id)
-        )
-        student = student_result.scalar_one_or_none()
-        if not student:
+        if identity.student_id is None:
             return []
         
-        query = query.where(Assignment.group_id == student.group_id)
+        query = query.where(Assignment.group_id == identity.group_id)
 
     elif current_user.role == UserRole.TEACHER:
         # Get teacher's assignments
-        teacher_result = await session.execute(
-            select(Teacher).where(Teacher.user_id == current_user.id)
-        )
-        teacher = teacher_result.scalar_one_or_none()
-        if not teacher:
+        if identity.teacher_id is None:
             return []
         
-        query = query.where(Assignment.teacher_id == teacher.id)
+        query = query.where(Assignment.teacher_id == identity.teacher_id)
 
     query = query.order_by(Assignment.due_date.desc()).limit(limit)
 
     result = await session.execute(query)
     assignments = result.scalars().all()
-    return [AssignmentRead.model_validate(a) for a in assignments]
+    refs = await load_reference_data(session)
+    return [read_with_references(AssignmentRead, a, refs) for a in assignments]
 
 
 @router.get("/upcoming", response_model=List[AssignmentRead])
@@ -170,18 +141,15 @@ async def get_upcoming_assignments(
     """
     today = date.today()
 
-    query = select(Assignment).options(
-        selectinload(Assignment.subject),
-        selectinload(Assignment.teacher),
-        selectinload(Assignment.group),
-    ).where(
+    query = select(Assignment).where(
         Assignment.is_published == True,
         Assignment.due_date >= today,
     ).order_by(Assignment.due_date).limit(limit)
 
     result = await session.execute(query)
     assignments = result.scalars().all()
-    return [AssignmentRead.model_validate(a) for a in assignments]
+    refs = await load_reference_data(session)
+    return [read_with_references(AssignmentRead, a, refs) for a in assignments]
 
 
 @router.get("/{assignment_id}", response_model=AssignmentRead)
@@ -194,13 +162,7 @@ async def get_assignment(
     Get assignment by ID.
     """
     result = await session.execute(
-        select(Assignment)
-        .where(Assignment.id == assignment_id)
-        .options(
-            selectinload(Assignment.subject),
-            selectinload(Assignment.teacher),
-            selectinload(Assignment.group),
-        )
+        select(Assignment).where(Assignment.id == assignment_id)
     )
     assignment = result.scalar_one_or_none()
 
@@ -211,7 +173,8 @@ async def get_assignment(
     if current_user.role == UserRole.STUDENT and not assignment.is_published:
         raise HTTPException(status_code=404, detail="Assignment not found")
 
-    return AssignmentRead.model_validate(assignment)
+    refs = await load_reference_data(session)
+    return read_with_references(AssignmentRead, assignment, refs)
 
 
 @router.patch("/{assignment_id}", response_model=AssignmentRead)
@@ -225,13 +188,7 @@ async def update_assignment(
     Update assignment (teachers and admins only).
     """
     result = await session.execute(
-        select(Assignment)
-        .where(Assignment.id == assignment_id)
-        .options(
-            selectinload(Assignment.subject),
-            selectinload(Assignment.teacher),
-            selectinload(Assignment.group),
-        )
+        select(Assignment).where(Assignment.id == assignment_id)
     )
     assignment = result.scalar_one_or_none()
 
@@ -243,20 +200,10 @@ async def update_assignment(
         setattr(assignment, field, value)
 
     await session.commit()
-    
-    # Reload with all relationships after update
-    result = await session.execute(
-        select(Assignment)
-        .where(Assignment.id == assignment_id)
-        .options(
-            selectinload(Assignment.subject),
-            selectinload(Assignment.teacher),
-            selectinload(Assignment.group),
-        )
-    )
-    assignment = result.scalar_one()
+    await session.refresh(assignment)
 
-    return AssignmentRead.model_validate(assignment)
+    refs = await load_reference_data(session)
+    return read_with_references(AssignmentRead, assignment, refs)
 
 
 @router.post("/{assignment_id}/publish", response_model=AssignmentRead)
@@ -269,13 +216,7 @@ async def publish_assignment(
     Publish an assignment (teachers and admins only).
     """
     result = await session.execute(
-        select(Assignment)
-        .where(Assignment.id == assignment_id)
-        .options(
-            selectinload(Assignment.subject),
-            selectinload(Assignment.teacher),
-            selectinload(Assignment.group),
-        )
+        select(Assignment).where(Assignment.id == assignment_id)
     )
     assignment = result.scalar_one_or_none()
 
@@ -284,20 +225,10 @@ async def publish_assignment(
 
     assignment.is_published = True
     await session.commit()
-    
-    # Reload with relationships
-    result = await session.execute(
-        select(Assignment)
-        .where(Assignment.id == assignment_id)
-        .options(
-            selectinload(Assignment.subject),
-            selectinload(Assignment.teacher),
-            selectinload(Assignment.group),
-        )
-    )
-    assignment = result.scalar_one()
+    await session.refresh(assignment)
 
-    return AssignmentRead.model_validate(assignment)
+    refs = await load_reference_data(session)
+    return read_with_references(AssignmentRead, assignment, refs)
 
 
 @router.delete("/{assignment_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -2,9 +2,8 @@
 API endpoints for file attachments.
 Supports uploading, downloading, and managing file attachments for lessons and assignments.
 """
-from typing import List, Annotated
-from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form, Depends
-from fastapi.responses import StreamingResponse
+from typing import List, Annotated, Optional
+from fastapi import APIRouter, HTTPException, Request, status, UploadFile, File, Form, Depends
 from sqlalchemy import select, and_
 from sqlalchemy.orm import selectinload
 from datetime import datetime
@@ -20,8 +19,11 @@ from src.schemas.attachments import (
     AttachmentListResponse,
     StorageInfoResponse,
 )
-from src.storage import Storage, get_storage, StoredFile
-from src.exceptions import NotFoundError, InsufficientPermissionsError, ValidationError
+from src.blobs import store_upload, delete_attachment_file, delete_stored_files
+from src.file_responses import file_response
+from src.storage import Storage, get_storage
+from src.thumbnails import thumbnail_pipeline
+from src.exceptions import NotFoundError, InsufficientPermissionsError, ValidationError, BusinessLogicError
 
 router = APIRouter(prefix="/attachments", tags=["Attachments"])
 
@@ -83,7 +85,6 @@ async def upload_attachment(
         entity = result.scalar_one_or_none()
         if not entity:
             raise NotFoundError("Занятие", entity_id)
-        folder = "schedules"
     elif entity_type == AttachmentEntity.ASSIGNMENT:
         result = await session.execute(
             select(Assignment).where(Assignment.id == entity_id)
@@ -91,25 +92,22 @@ async def upload_attachment(
         entity = result.scalar_one_or_none()
         if not entity:
             raise NotFoundError("Задание", entity_id)
-        folder = "assignments"
     elif entity_type == AttachmentEntity.SYMBOL:
-         # No specific entity verification for now as symbols are independent or attached to boards differently?
-         # User's code said "SYMBOL = 'symbol'". 
-         # Assuming logic exists or we just allow it. The previous code didn't handle SYMBOL in if/elif.
-         # But the enum has SYMBOL. I should probably add a check or just assume folder "symbols".
-         folder = "symbols"
+        # No specific entity verification for now as symbols are independent
+        pass
     else:
         raise ValidationError(
             message="Неподдерживаемый тип сущности",
             errors=[{"field": "entity_type", "message": f"Unsupported: {entity_type}", "type": "value_error"}]
         )
     
-    # Save file to storage
-    stored: StoredFile = await storage.save(
+    # Save file to storage (identical content is stored once)
+    stored, blob_id = await store_upload(
+        session,
+        storage,
         file=file.file,
         filename=file.filename,
         content_type=file.content_type,
-        folder=folder,
     )
     
     # Determine attachment type
@@ -124,6 +122,7 @@ async def upload_attachment(
         entity_id=entity_id,
         original_filename=stored.original_filename,
         storage_key=stored.key,
+        blob_id=blob_id,
         content_type=stored.content_type,
         file_size=stored.size,
         checksum=stored.checksum,
@@ -139,6 +138,8 @@ async def upload_attachment(
     await session.commit()
     await session.refresh(attachment)
     
+    thumbnail_pipeline.enqueue(attachment)
+    
     return AttachmentUploadResponse(
         attachment=add_download_url(attachment, storage),
         message="Файл успешно загружен",
@@ -163,6 +164,7 @@ async def list_entity_attachments(
                 Attachment.entity_type == entity_type,
                 Attachment.entity_id == entity_id,
                 Attachment.deleted_at.is_(None),
+                Attachment.variant.is_(None),
             )
         )
         .order_by(Attachment.created_at.desc())
@@ -204,13 +206,15 @@ async def get_attachment(
 @router.get("/{attachment_id}/download")
 async def download_attachment(
     attachment_id: int,
+    request: Request,
     session: SessionDep,
     storage: StorageDep,
     current_user: CurrentUser,
 ):
     """
     Download an attachment file.
-    Returns the file as a streaming response.
+    Returns the file as a streaming response. Supports Range requests
+    (for seeking in videos) and conditional requests via ETag/Last-Modified.
     """
     result = await session.execute(
         select(Attachment).where(
@@ -225,17 +229,22 @@ async def download_attachment(
     if not attachment:
         raise NotFoundError("Вложение", attachment_id)
     
-    # Get file from storage
-    file_obj, content_type = await storage.get(attachment.storage_key)
+    async def open_range(offset: int, length: Optional[int]):
+        chunks, _ = await storage.stream(attachment.storage_key, offset, length)
+        return chunks
     
-    # Return as streaming response
-    return StreamingResponse(
-        file_obj,
-        media_type=content_type,
+    # Stored files never change, so the checksum identifies the content
+    return await file_response(
+        request,
+        size=attachment.file_size,
+        etag=f'"{attachment.checksum}"',
+        last_modified=attachment.created_at,
+        content_type=attachment.content_type,
+        open_range=open_range,
+        private=True,
         headers={
             "Content-Disposition": f'attachment; filename="{attachment.original_filename}"',
-            "Content-Length": str(attachment.file_size),
-        }
+        },
     )
 
 
@@ -286,8 +295,12 @@ async def delete_attachment(
     """
     Delete an attachment.
     
-    - **permanent**: If true, permanently delete file from storage.
+    - **permanent**: If true, permanently delete the record and release its file
+                    (removed from storage once no other attachment shares it).
                     If false (default), soft delete (keep file, mark as deleted).
+    
+    Generated thumbnails and WebP versions go with their source image and
+    cannot be deleted on their own.
     """
     result = await session.execute(
         select(Attachment).where(Attachment.id == attachment_id)
@@ -297,16 +310,23 @@ async def delete_attachment(
     if not attachment:
         raise NotFoundError("Вложение", attachment_id)
     
+    if attachment.variant is not None:
+        # Generated variants are deleted with their source image
+        raise BusinessLogicError(
+            code="ATTACHMENT_IS_VARIANT",
+            message="Сгенерированную версию изображения нельзя удалить отдельно от оригинала",
+            details={"attachment_id": attachment_id, "variant": attachment.variant},
+        )
+    
+    released_keys = []
     if permanent:
-        # Delete from storage
-        await storage.delete(attachment.storage_key)
-        # Delete record
-        await session.delete(attachment)
+        released_keys = await delete_attachment_file(session, attachment)
     else:
         # Soft delete
         attachment.deleted_at = datetime.utcnow()
     
     await session.commit()
+    await delete_stored_files(storage, released_keys)
 
 
 @router.get("/", response_model=AttachmentListResponse)
@@ -323,7 +343,7 @@ async def list_attachments(
     List all attachments with optional filtering.
     Only teachers and admins can list all attachments.
     """
-    query = select(Attachment).where(Attachment.deleted_at.is_(None))
+    query = select(Attachment).where(Attachment.deleted_at.is_(None), Attachment.variant.is_(None))
     
     if entity_type:
         query = query.where(Attachment.entity_type == entity_type)
@@ -336,7 +356,7 @@ async def list_attachments(
     attachments = result.scalars().all()
     
     # Get total count
-    count_query = select(Attachment).where(Attachment.deleted_at.is_(None))
+    count_query = select(Attachment).where(Attachment.deleted_at.is_(None), Attachment.variant.is_(None))
     if entity_type:
         count_query = count_query.where(Attachment.entity_type == entity_type)
     if attachment_type:
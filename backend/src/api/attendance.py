@@ -1,14 +1,18 @@
-from typing import List
+from typing import Dict, List
 from datetime import date
 from fastapi import APIRouter, HTTPException, status
 from sqlalchemy import select, and_, func
 from sqlalchemy.orm import selectinload
 
-from src.api.dependencies import SessionDep, TeacherUser, CurrentUser
+from src.api.dependencies import SessionDep, TeacherUser, CurrentUser, CurrentIdentity
+from src.database import dialect_insert
 from src.models.attendance import Attendance, AttendanceStatus
 from src.models.schedule import Schedule
 from src.models.students import Student
 from src.models.users import UserRole
+from src.reference_data import ReferenceData, load_reference_data, read_with_references
+from src.rollups import AttendanceFact, record_attendance_changes
+from src.scheduling import load_occurrences, materialize_occurrence
 from src.schemas.attendance import (
     AttendanceCreate,
     AttendanceRead,
@@ -16,6 +20,7 @@ from src.schemas.attendance import (
     AttendanceBulkCreate,
     AttendanceSimpleBulkCreate,
 )
+from src.schemas.students import StudentRead
 
 router = APIRouter(prefix="/attendance", tags=["Attendance"])
 
@@ -33,15 +38,20 @@ async def create_attendance(
     student_result = await session.execute(
         select(Student).where(Student.id == attendance_data.student_id)
     )
-    if not student_result.scalar_one_or_none():
+    student = student_result.scalar_one_or_none()
+    if not student:
         raise HTTPException(status_code=404, detail="Student not found")
 
-    # Verify schedule exists
-    schedule_result = await session.execute(
-        select(Schedule).where(Schedule.id == attendance_data.schedule_id)
-    )
-    if not schedule_result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Schedule not found")
+    if attendance_data.recurrence_id is not None:
+        schedule = await materialize_occurrence(session, attendance_data.recurrence_id, attendance_data.date)
+        attendance_data.schedule_id = schedule.id
+    else:
+        # Verify schedule exists
+        schedule_result = await session.execute(
+            select(Schedule).where(Schedule.id == attendance_data.schedule_id)
+        )
+        if not schedule_result.scalar_one_or_none():
+            raise HTTPException(status_code=404, detail="Schedule not found")
 
     # Check if attendance already marked
     existing = await session.execute(
@@ -59,12 +69,39 @@ async def create_attendance(
             detail="Attendance already marked for this student on this date"
         )
 
-    new_attendance = Attendance(**attendance_data.model_dump())
+    new_attendance = Attendance(**attendance_data.model_dump(exclude={"recurrence_id"}))
     session.add(new_attendance)
+    await record_attendance_changes(session, [(None, AttendanceFact.of(new_attendance))])
     await session.commit()
     await session.refresh(new_attendance)
 
-    return AttendanceRead.model_validate(new_attendance)
+    refs = await load_reference_data(session)
+    return _attendance_read(new_attendance, student, refs)
+
+
+def _attendance_read(attendance: Attendance, student: Student, refs: ReferenceData) -> AttendanceRead:
+    """Attendance with its student, whose group comes from the reference data cache."""
+    return read_with_references(
+        AttendanceRead, attendance, refs, student=read_with_references(StudentRead, student, refs)
+    )
+
+
+async def _student_groups(session, student_ids) -> Dict[int, int]:
+    """Map student ids to their group ids, failing if any student does not exist."""
+    result = await session.execute(
+        select(Student.id, Student.group_id).where(Student.id.in_(student_ids))
+    )
+    group_by_student = dict(result.all())
+    missing = [sid for sid in student_ids if sid not in group_by_student]
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Students not found: {', '.join(map(str, missing))}"
+        )
+    return group_by_student
+
+
+ATTENDANCE_KEY = ["student_id", "schedule_id", "date"]
 
 
 @router.post("/bulk", response_model=List[AttendanceRead], status_code=status.HTTP_201_CREATED)
@@ -75,48 +112,52 @@ async def create_bulk_attendance(
 ):
     """
     Mark attendance for multiple students at once (teachers and admins only).
+    Students already marked for this lesson are skipped.
     """
-    # Verify schedule exists
-    schedule_result = await session.execute(
-        select(Schedule).where(Schedule.id == bulk_data.schedule_id)
-    )
-    schedule = schedule_result.scalar_one_or_none()
-    if not schedule:
-        raise HTTPException(status_code=404, detail="Schedule not found")
-
-    created_records = []
+    if bulk_data.recurrence_id is not None:
+        schedule = await materialize_occurrence(session, bulk_data.recurrence_id, bulk_data.date)
+    else:
+        # Verify schedule exists
+        schedule_result = await session.execute(
+            select(Schedule).where(Schedule.id == bulk_data.schedule_id)
+        )
+        schedule = schedule_result.scalar_one_or_none()
+        if not schedule:
+            raise HTTPException(status_code=404, detail="Schedule not found")
 
+    # The first record for a student wins, like the existing mark does
+    records = {}
     for record in bulk_data.records:
-        # Check if already exists
-        existing = await session.execute(
-            select(Attendance).where(
-                and_(
-                    Attendance.student_id == record.student_id,
-                    Attendance.schedule_id == bulk_data.schedule_id,
-                    Attendance.date == bulk_data.date,
-                )
-            )
-        )
-        if existing.scalar_one_or_none():
-            continue  # Skip if already marked
-
-        new_attendance = Attendance(
-            student_id=record.student_id,
-            schedule_id=bulk_data.schedule_id,
-            date=bulk_data.date,
-            status=record.status,
-            reason=record.reason,
-        )
-        session.add(new_attendance)
-        created_records.append(new_attendance)
+        records.setdefault(record.student_id, record)
+    if not records:
+        return []
+
+    group_by_student = await _student_groups(session, list(records))
+
+    stmt = dialect_insert(session, Attendance).values([
+        {
+            "student_id": record.student_id,
+            "schedule_id": schedule.id,
+            "date": bulk_data.date,
+            "status": record.status,
+            "reason": record.reason,
+        }
+        for record in records.values()
+    ])
+    stmt = stmt.on_conflict_do_nothing(index_elements=ATTENDANCE_KEY).returning(
+        *Attendance.__table__.c
+    )
+    created_rows = (await session.execute(stmt)).mappings().all()
 
+    await record_attendance_changes(
+        session,
+        [(None, AttendanceFact(r["student_id"], r["schedule_id"], r["date"], r["status"])) for r in created_rows],
+        group_by_student=group_by_student,
+        subject_by_schedule={schedule.id: schedule.subject_id},
+    )
     await session.commit()
 
-    # Refresh all records
-    for record in created_records:
-        await session.refresh(record)
-
-    return [AttendanceRead.model_validate(r) for r in created_records]
+    return [AttendanceRead.model_validate(dict(r)) for r in created_rows]
 
 
 @router.post("/bulk-simple", status_code=status.HTTP_201_CREATED)
@@ -124,6 +165,7 @@ async def create_bulk_attendance_simple(
     bulk_data: AttendanceSimpleBulkCreate,
     session: SessionDep,
     current_user: TeacherUser,
+    identity: CurrentIdentity,
 ):
     """
     Simplified bulk attendance marking by group (teachers and admins only).
@@ -152,6 +194,14 @@ async def create_bulk_attendance_simple(
         ).limit(1)
     )
     schedule = schedule_result.scalar_one_or_none()
+
+    # Otherwise use a recurring lesson of the group taking place that day
+    if not schedule:
+        occurrences = await load_occurrences(
+            session, bulk_data.date, bulk_data.date, group_id=bulk_data.group_id
+        )
+        if occurrences:
+            schedule = await materialize_occurrence(session, occurrences[0].recurrence.id, bulk_data.date)
     
     # If no schedule exists, create a default one
     if not schedule:
@@ -160,16 +210,13 @@ async def create_bulk_attendance_simple(
         subject = subject_result.scalar_one_or_none()
         
         # Get first available teacher (or current user's teacher profile)
-        teacher_result = await session.execute(
-            select(Teacher).where(Teacher.user_id == current_user.id)
-        )
-        teacher = teacher_result.scalar_one_or_none()
+        teacher_id = identity.teacher_id
         
-        if not teacher:
-            teacher_result = await session.execute(select(Teacher).limit(1))
-            teacher = teacher_result.scalar_one_or_none()
+        if teacher_id is None:
+            teacher_result = await session.execute(select(Teacher.id).limit(1))
+            teacher_id = teacher_result.scalar_one_or_none()
         
-        if not subject or not teacher:
+        if not subject or teacher_id is None:
             raise HTTPException(
                 status_code=400, 
                 detail="Cannot create attendance: no subjects or teachers in the system"
@@ -179,7 +226,7 @@ async def create_bulk_attendance_simple(
         schedule = Schedule(
             group_id=bulk_data.group_id,
             subject_id=subject.id,
-            teacher_id=teacher.id,
+            teacher_id=teacher_id,
             specific_date=bulk_data.date,
             start_time=time(8, 0),
             end_time=time(9, 30),
@@ -191,46 +238,73 @@ async def create_bulk_attendance_simple(
         session.add(schedule)
         await session.flush()  # Get the ID
     
-    created_count = 0
-    updated_count = 0
-    unchanged_count = 0
-
-    for record in bulk_data.records:
-        # Check if already exists - update if so
-        existing_result = await session.execute(
-            select(Attendance).where(
-                and_(
-                    Attendance.student_id == record.student_id,
-                    Attendance.schedule_id == schedule.id,
-                    Attendance.date == bulk_data.date,
-                )
+    # A later record for the same student overrides an earlier one
+    records = {record.student_id: record for record in bulk_data.records}
+    group_by_student = await _student_groups(session, list(records)) if records else {}
+
+    # Prefetch existing marks for this lesson in one query
+    existing_result = await session.execute(
+        select(
+            Attendance.student_id, Attendance.schedule_id, Attendance.date,
+            Attendance.status, Attendance.reason,
+        ).where(
+            and_(
+                Attendance.schedule_id == schedule.id,
+                Attendance.date == bulk_data.date,
+                Attendance.student_id.in_(list(records)),
             )
         )
-        existing = existing_result.scalar_one_or_none()
-        
-        if existing:
+    )
+    existing = {r.student_id: r for r in existing_result.all()}
+
+    unchanged_count = 0
+    rows = []
+    changes = []
+    for student_id, record in records.items():
+        current = existing.get(student_id)
+        if current is not None:
             # Check if values actually changed
-            status_changed = existing.status != record.status
-            notes_changed = (existing.reason or '') != (record.notes or '')
-            
-            if status_changed or notes_changed:
-                existing.status = record.status
-                existing.reason = record.notes
-                updated_count += 1
-            else:
+            status_changed = current.status != record.status
+            notes_changed = (current.reason or '') != (record.notes or '')
+            if not (status_changed or notes_changed):
                 unchanged_count += 1
-        else:
-            # Create new record
-            new_attendance = Attendance(
-                student_id=record.student_id,
-                schedule_id=schedule.id,
-                date=bulk_data.date,
-                status=record.status,
-                reason=record.notes,
-            )
-            session.add(new_attendance)
-            created_count += 1
-
+                continue
+
+        rows.append({
+            "student_id": student_id,
+            "schedule_id": schedule.id,
+            "date": bulk_data.date,
+            "status": record.status,
+            "reason": record.notes,
+        })
+        before = (
+            AttendanceFact(current.student_id, current.schedule_id, current.date, current.status)
+            if current is not None else None
+        )
+        changes.append((before, AttendanceFact(student_id, schedule.id, bulk_data.date, record.status)))
+
+    written = []
+    if rows:
+        stmt = dialect_insert(session, Attendance).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=ATTENDANCE_KEY,
+            set_={
+                "status": stmt.excluded.status,
+                "reason": stmt.excluded.reason,
+                "updated_at": func.now(),
+            },
+        ).returning(Attendance.student_id)
+        written = (await session.execute(stmt)).scalars().all()
+
+    created_count = sum(1 for student_id in written if student_id not in existing)
+    updated_count = len(written) - created_count
+
+    await record_attendance_changes(
+        session,
+        changes,
+        group_by_student=group_by_student,
+        subject_by_schedule={schedule.id: schedule.subject_id},
+    )
     await session.commit()
 
     return {
@@ -258,9 +332,7 @@ async def list_attendance(
     """
     List attendance records with optional filters.
     """
-    query = select(Attendance).options(
-        selectinload(Attendance.student).selectinload(Student.group)
-    )
+    query = select(Attendance).options(selectinload(Attendance.student))
 
     if student_id:
         query = query.where(Attendance.student_id == student_id)
@@ -279,13 +351,15 @@ async def list_attendance(
 
     result = await session.execute(query)
     attendances = result.scalars().all()
-    return [AttendanceRead.model_validate(a) for a in attendances]
+    refs = await load_reference_data(session)
+    return [_attendance_read(a, a.student, refs) for a in attendances]
 
 
 @router.get("/my", response_model=List[AttendanceRead])
 async def get_my_attendance(
     session: SessionDep,
     current_user: CurrentUser,
+    identity: CurrentIdentity,
     date_from: date = None,
     date_to: date = None,
 ):
@@ -299,16 +373,11 @@ async def get_my_attendance(
         )
 
     # Get student profile
-    student_result = await session.execute(
-        select(Student).where(Student.user_id == current_user.id)
-    )
-    student = student_result.scalar_one_or_none()
+    student = await session.get(Student, identity.student_id) if identity.student_id is not None else None
     if not student:
         raise HTTPException(status_code=404, detail="Student profile not found")
 
-    query = select(Attendance).options(
-        selectinload(Attendance.student).selectinload(Student.group)
-    ).where(Attendance.student_id == student.id)
+    query = select(Attendance).where(Attendance.student_id == student.id)
 
     if date_from:
         query = query.where(Attendance.date >= date_from)
@@ -319,7 +388,8 @@ async def get_my_attendance(
 
     result = await session.execute(query)
     attendances = result.scalars().all()
-    return [AttendanceRead.model_validate(a) for a in attendances]
+    refs = await load_reference_data(session)
+    return [_attendance_read(a, student, refs) for a in attendances]
 
 
 @router.get("/stats/student/{student_id}")
@@ -383,14 +453,15 @@ async def get_attendance(
     result = await session.execute(
         select(Attendance)
         .where(Attendance.id == attendance_id)
-        .options(selectinload(Attendance.student).selectinload(Student.group))
+        .options(selectinload(Attendance.student))
     )
     attendance = result.scalar_one_or_none()
 
     if not attendance:
         raise HTTPException(status_code=404, detail="Attendance record not found")
 
-    return AttendanceRead.model_validate(attendance)
+    refs = await load_reference_data(session)
+    return _attendance_read(attendance, attendance.student, refs)
 
 
 @router.patch("/{attendance_id}", response_model=AttendanceRead)
@@ -406,21 +477,25 @@ async def update_attendance(
     result = await session.execute(
         select(Attendance)
         .where(Attendance.id == attendance_id)
-        .options(selectinload(Attendance.student).selectinload(Student.group))
+        .options(selectinload(Attendance.student))
     )
     attendance = result.scalar_one_or_none()
 
     if not attendance:
         raise HTTPException(status_code=404, detail="Attendance record not found")
 
+    before = AttendanceFact.of(attendance)
     update_data = attendance_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(attendance, field, value)
 
+    await record_attendance_changes(session, [(before, AttendanceFact.of(attendance))])
+    student = attendance.student
     await session.commit()
     await session.refresh(attendance)
 
-    return AttendanceRead.model_validate(attendance)
+    refs = await load_reference_data(session)
+    return _attendance_read(attendance, student, refs)
 
 
 @router.delete("/{attendance_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -440,6 +515,7 @@ async def delete_attendance(
     if not attendance:
         raise HTTPException(status_code=404, detail="Attendance record not found")
 
+    await record_attendance_changes(session, [(AttendanceFact.of(attendance), None)])
     await session.delete(attendance)
     await session.commit()
 
@@ -17,7 +17,7 @@ from src.models.students import Student
 from src.models.teachers import Teacher
 from src.models.groups import Group
 from src.schemas.users import UserCreate, UserRead, UserLogin, TokenResponse
-from src.security import hash_password, verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from src.security import hash_password_async, verify_password_async, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -39,7 +39,7 @@ async def register(user_data: UserCreate, session: SessionDep):
     try:
         new_user = User(
             email=user_data.email.lower(),
-            password_hash=hash_password(user_data.password),
+            password_hash=await hash_password_async(user_data.password),
             role=user_data.role,
         )
         session.add(new_user)
@@ -117,7 +117,7 @@ async def login(credentials: UserLogin, session: SessionDep):
     )
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(credentials.password, user.password_hash):
+    if not user or not await verify_password_async(credentials.password, user.password_hash):
         raise InvalidCredentialsError()
 
     if not user.is_active:
@@ -174,7 +174,7 @@ async def change_password(
     """
     Change user password.
     """
-    if not verify_password(old_password, current_user.password_hash):
+    if not await verify_password_async(old_password, current_user.password_hash):
         raise InvalidCredentialsError()
 
     if len(new_password) < 8:
@@ -183,7 +183,7 @@ async def change_password(
             message="Пароль должен содержать минимум 8 символов"
         )
 
-    current_user.password_hash = hash_password(new_password)
+    current_user.password_hash = await hash_password_async(new_password)
     await session.commit()
 
     return {"message": "Password changed successfully"}
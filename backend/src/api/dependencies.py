@@ -3,9 +3,9 @@ from typing import Annotated, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
 from src.database import get_db
+from src.identity import Identity, resolve_identity
 from src.security import decode_access_token
 from src.models.users import User, UserRole
 
@@ -16,11 +16,11 @@ SessionDep = Annotated[AsyncSession, Depends(get_db)]
 security = HTTPBearer()
 
 
-async def get_current_user(
+async def get_current_identity(
     credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
     session: SessionDep,
-) -> User:
-    """Get the current authenticated user from JWT token."""
+) -> Identity:
+    """Get the current authenticated user and their profile ids from JWT token."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -43,19 +43,27 @@ async def get_current_user(
     except (ValueError, TypeError):
         raise credentials_exception
 
-    result = await session.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    identity = await resolve_identity(session, user_id)
 
-    if user is None:
+    if identity is None:
         raise credentials_exception
 
-    if not user.is_active:
+    if not identity.user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User account is deactivated"
         )
 
-    return user
+    return identity
+
+
+# Current identity dependency (resolved once per request)
+CurrentIdentity = Annotated[Identity, Depends(get_current_identity)]
+
+
+async def get_current_user(identity: CurrentIdentity) -> User:
+    """Get the current authenticated user from JWT token."""
+    return identity.user
 
 
 # Current user dependency
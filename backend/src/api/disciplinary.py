@@ -4,7 +4,7 @@ from fastapi import APIRouter, HTTPException, status
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 
-from src.api.dependencies import SessionDep, TeacherUser, CurrentUser
+from src.api.dependencies import SessionDep, TeacherUser, CurrentUser, CurrentIdentity
 from src.models.disciplinary import DisciplinaryRecord, ViolationType, SeverityLevel
 from src.models.students import Student
 from src.models.groups import Group
@@ -71,6 +71,7 @@ async def create_disciplinary_record(
 async def list_disciplinary_records(
     session: SessionDep,
     current_user: CurrentUser,
+    identity: CurrentIdentity,
     student_id: int = None,
     group_id: int = None,
     violation_type: ViolationType = None,
@@ -92,12 +93,8 @@ async def list_disciplinary_records(
 
     # Students can only see their own records
     if current_user.role == UserRole.STUDENT:
-        student_result = await session.execute(
-            select(Student).where(Student.user_id == current_user.id)
-        )
-        student = student_result.scalar_one_or_none()
-        if student:
-            query = query.where(DisciplinaryRecord.student_id == student.id)
+        if identity.student_id is not None:
+            query = query.where(DisciplinaryRecord.student_id == identity.student_id)
         else:
             return []
 
@@ -127,6 +124,7 @@ async def list_disciplinary_records(
 async def get_my_disciplinary_records(
     session: SessionDep,
     current_user: CurrentUser,
+    identity: CurrentIdentity,
 ):
     """
     Get current user's disciplinary records (for students).
@@ -138,15 +136,11 @@ async def get_my_disciplinary_records(
         )
 
     # Get student profile
-    student_result = await session.execute(
-        select(Student).where(Student.user_id == current_user.id)
-    )
-    student = student_result.scalar_one_or_none()
-    if not student:
+    if identity.student_id is None:
         raise HTTPException(status_code=404, detail="Student profile not found")
 
     query = select(DisciplinaryRecord).where(
-        DisciplinaryRecord.student_id == student.id
+        DisciplinaryRecord.student_id == identity.student_id
     ).options(
         selectinload(DisciplinaryRecord.reported_by),
     ).order_by(DisciplinaryRecord.date.desc())
@@ -224,6 +218,7 @@ async def get_disciplinary_record(
     record_id: int,
     session: SessionDep,
     current_user: CurrentUser,
+    identity: CurrentIdentity,
 ):
     """
     Get disciplinary record by ID.
@@ -243,11 +238,7 @@ async def get_disciplinary_record(
 
     # Students can only see their own records
     if current_user.role == UserRole.STUDENT:
-        student_result = await session.execute(
-            select(Student).where(Student.user_id == current_user.id)
-        )
-        student = student_result.scalar_one_or_none()
-        if not student or record.student_id != student.id:
+        if identity.student_id is None or record.student_id != identity.student_id:
             raise HTTPException(status_code=403, detail="Access denied")
 
     return DisciplinaryRead.model_validate(record)
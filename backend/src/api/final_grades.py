@@ -0,0 +1,172 @@
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, status, Query
+from sqlalchemy import select
+
+from src.api.dependencies import SessionDep, CurrentUser, CurrentIdentity, AdminUser
+from src.final_grades import recompute_subject_final_grades, rebuild_final_grades
+from src.models.final_grades import GradeWeight, FinalGrade
+from src.models.students import Student
+from src.models.subjects import Subject
+from src.models.users import UserRole
+from src.schemas.final_grades import GradeWeightSet, GradeWeightRead, FinalGradeRead
+
+router = APIRouter(prefix="/final-grades", tags=["Final Grades"])
+
+
+@router.get("/", response_model=List[FinalGradeRead])
+async def list_final_grades(
+    session: SessionDep,
+    current_user: CurrentUser,
+    identity: CurrentIdentity,
+    group_id: Optional[int] = Query(None),
+    student_id: Optional[int] = Query(None),
+    subject_id: Optional[int] = Query(None),
+    academic_year: Optional[str] = Query(None),
+    semester: Optional[int] = Query(None),
+):
+    """
+    Get precomputed weighted final grades for a whole group or one student.
+    Students can only view their own final grades.
+    """
+    if group_id is None and student_id is None:
+        raise HTTPException(status_code=400, detail="group_id or student_id is required")
+
+    if current_user.role == UserRole.STUDENT:
+        own_id = identity.student_id
+        if own_id is None or group_id is not None or student_id != own_id:
+            raise HTTPException(status_code=403, detail="Access denied")
+
+    query = select(
+        FinalGrade, Student.first_name, Student.last_name, Student.group_id, Subject.name.label("subject_name")
+    ).join(
+        Student, FinalGrade.student_id == Student.id
+    ).join(
+        Subject, FinalGrade.subject_id == Subject.id
+    )
+
+    if group_id is not None:
+        query = query.where(Student.group_id == group_id)
+    if student_id is not None:
+        query = query.where(FinalGrade.student_id == student_id)
+    if subject_id is not None:
+        query = query.where(FinalGrade.subject_id == subject_id)
+    if academic_year is not None:
+        query = query.where(FinalGrade.academic_year == academic_year)
+    if semester is not None:
+        query = query.where(FinalGrade.semester == semester)
+
+    query = query.order_by(
+        Student.last_name, Student.first_name, FinalGrade.student_id,
+        FinalGrade.academic_year, FinalGrade.semester, Subject.name,
+    )
+
+    result = await session.execute(query)
+    return [
+        FinalGradeRead(
+            student_id=r.FinalGrade.student_id,
+            student_name=f"{r.last_name} {r.first_name}",
+            group_id=r.group_id,
+            subject_id=r.FinalGrade.subject_id,
+            subject_name=r.subject_name,
+            academic_year=r.FinalGrade.academic_year,
+            semester=r.FinalGrade.semester,
+            score=round(r.FinalGrade.score, 2),
+            letter_grade=r.FinalGrade.letter_grade,
+            grades_count=r.FinalGrade.grades_count,
+            weight_total=r.FinalGrade.weight_total,
+            computed_at=r.FinalGrade.computed_at,
+        )
+        for r in result.all()
+    ]
+
+
+@router.get("/weights", response_model=List[GradeWeightRead])
+async def list_grade_weights(
+    session: SessionDep,
+    current_user: CurrentUser,
+    subject_id: Optional[int] = Query(None),
+):
+    """
+    List configured event type weights (optionally only those of one subject).
+    """
+    query = select(GradeWeight)
+    if subject_id is not None:
+        query = query.where(GradeWeight.subject_id == subject_id)
+
+    result = await session.execute(query.order_by(GradeWeight.subject_id, GradeWeight.event_type))
+    return [GradeWeightRead.model_validate(w) for w in result.scalars().all()]
+
+
+@router.put("/weights", response_model=GradeWeightRead)
+async def set_grade_weight(
+    weight_data: GradeWeightSet,
+    session: SessionDep,
+    current_user: AdminUser,
+):
+    """
+    Set the weight of an event type, for one subject or as the default
+    for all subjects (admin only). Affected final grades are recomputed.
+    """
+    if weight_data.subject_id is not None:
+        subject_result = await session.execute(
+            select(Subject).where(Subject.id == weight_data.subject_id)
+        )
+        if not subject_result.scalar_one_or_none():
+            raise HTTPException(status_code=404, detail="Subject not found")
+
+    subject_filter = (
+        GradeWeight.subject_id.is_(None) if weight_data.subject_id is None
+        else GradeWeight.subject_id == weight_data.subject_id
+    )
+    result = await session.execute(
+        select(GradeWeight).where(GradeWeight.event_type == weight_data.event_type, subject_filter)
+    )
+    weight = result.scalar_one_or_none()
+
+    if weight:
+        weight.weight = weight_data.weight
+    else:
+        weight = GradeWeight(**weight_data.model_dump())
+        session.add(weight)
+
+    await session.flush()
+    await recompute_subject_final_grades(session, weight_data.subject_id)
+    await session.commit()
+    await session.refresh(weight)
+
+    return GradeWeightRead.model_validate(weight)
+
+
+@router.delete("/weights/{weight_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_grade_weight(
+    weight_id: int,
+    session: SessionDep,
+    current_user: AdminUser,
+):
+    """
+    Delete a weight (admin only). Affected final grades are recomputed.
+    """
+    result = await session.execute(select(GradeWeight).where(GradeWeight.id == weight_id))
+    weight = result.scalar_one_or_none()
+
+    if not weight:
+        raise HTTPException(status_code=404, detail="Grade weight not found")
+
+    subject_id = weight.subject_id
+    await session.delete(weight)
+    await session.flush()
+    await recompute_subject_final_grades(session, subject_id)
+    await session.commit()
+
+
+@router.post("/recompute")
+async def recompute_final_grades(
+    session: SessionDep,
+    current_user: AdminUser,
+):
+    """
+    Recompute all final grades from raw grades (admin only).
+    """
+    rows = await rebuild_final_grades(session)
+    await session.commit()
+    return {"recomputed": rows}
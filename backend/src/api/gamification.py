@@ -11,7 +11,9 @@ from src.schemas.gamification import (
     TopographicSymbolCreate, TopographicSymbolUpdate, TopographicSymbolRead
 )
 from src.models.canvas import Canvas
-from src.storage import Storage, get_storage, StoredFile
+from src.blobs import store_upload, delete_attachment_file, delete_stored_files
+from src.storage import Storage, get_storage
+from src.thumbnails import thumbnail_pipeline
 
 router = APIRouter(prefix="/gamification", tags=["Gamification"])
 StorageDep = Annotated[Storage, Depends(get_storage)]
@@ -256,12 +258,13 @@ async def upload_symbol(
     description: str | None = None,
 ):
     """Upload a symbol image with linked attachment."""
-    # Save file to storage
-    stored: StoredFile = await storage.save(
+    # Save file to storage (identical content is stored once)
+    stored, blob_id = await store_upload(
+        session,
+        storage,
         file=file.file,
         filename=file.filename,
         content_type=file.content_type,
-        folder="symbols",
     )
     
     # Create symbol
@@ -279,6 +282,7 @@ async def upload_symbol(
         entity_id=new_symbol.id,
         original_filename=stored.original_filename,
         storage_key=stored.key,
+        blob_id=blob_id,
         content_type=stored.content_type,
         file_size=stored.size,
         checksum=stored.checksum,
@@ -296,6 +300,9 @@ async def upload_symbol(
     await session.commit()
     await session.refresh(new_symbol, attribute_names=["attachment", "thumbnail_attachment"])
     
+    # The palette thumbnail is linked to the symbol once it is generated
+    thumbnail_pipeline.enqueue(attachment)
+    
     return TopographicSymbolRead.model_validate(new_symbol)
 
 
@@ -382,22 +389,20 @@ async def delete_symbol(
     if not symbol:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Symbol not found")
     
-    # Collect attachments to clean up
-    attachments = [a for a in [symbol.attachment, symbol.thumbnail_attachment] if a]
+    # Collect attachments to clean up (generated variants go with their source)
+    attachments = [a for a in [symbol.attachment, symbol.thumbnail_attachment] if a and a.variant is None]
     
     # Unlink before deleting
     symbol.attachment_id = None
     symbol.thumbnail_attachment_id = None
     await session.flush()
     
-    # Delete storage files and attachment records
+    # Delete attachment records and release their storage files
+    released_keys = []
     for attachment in attachments:
-        try:
-            await storage.delete(attachment.storage_key)
-        except Exception:
-            pass  # File may already be gone
-        await session.delete(attachment)
+        released_keys.extend(await delete_attachment_file(session, attachment))
     
     await session.delete(symbol)
     await session.commit()
+    await delete_stored_files(storage, released_keys)
 
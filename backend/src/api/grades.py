@@ -1,13 +1,22 @@
-from typing import List
-from fastapi import APIRouter, HTTPException, status
-from sqlalchemy import select
+import base64
+import math
+import sys
+from array import array
+from typing import List, Literal, Optional
+from fastapi import APIRouter, HTTPException, Query, status
+from sqlalchemy import select, and_
 from sqlalchemy.orm import selectinload
 
 from src.api.dependencies import SessionDep, TeacherUser, CurrentUser
+from src.grade_stats import GradeFact, record_grade_changes
+from src.grading import upsert_grades
 from src.models.grades import Grade
 from src.models.assessment_events import AssessmentEvent
 from src.models.students import Student
-from src.schemas.grades import GradeCreate, GradeRead, GradeUpdate, BulkGradesCreate
+from src.schemas.grades import (
+    GradeCreate, GradeRead, GradeUpdate, BulkGradesCreate,
+    GradeMatrix, GradeMatrixStudent, GradeMatrixEvent,
+)
 
 router = APIRouter(prefix="/grades", tags=["Grades"])
 
@@ -29,67 +38,14 @@ async def create_bulk_grades(
     if not event:
         raise HTTPException(status_code=404, detail="Assessment event not found")
 
-    created = 0
-    updated = 0
-    skipped = 0
-
-    for grade_input in bulk_data.grades:
-        # Check if student exists
-        student_result = await session.execute(
-            select(Student).where(Student.id == grade_input.student_id)
-        )
-        if not student_result.scalar_one_or_none():
-            continue  # Skip invalid students
-
-        # Check if grade already exists
-        existing_grade_result = await session.execute(
-            select(Grade).where(
-                Grade.student_id == grade_input.student_id,
-                Grade.assessment_event_id == bulk_data.assessment_event_id
-            )
-        )
-        existing_grade = existing_grade_result.scalar_one_or_none()
-
-        if existing_grade:
-            # Update if there are changes
-            if grade_input.score is None and grade_input.comment is None:
-                skipped += 1
-                continue
-            
-            changed = False
-            if grade_input.score is not None and existing_grade.score != grade_input.score:
-                existing_grade.score = grade_input.score
-                changed = True
-            if grade_input.comment is not None and existing_grade.comment != grade_input.comment:
-                existing_grade.comment = grade_input.comment
-                changed = True
-            
-            if changed:
-                updated += 1
-            else:
-                skipped += 1
-        else:
-            # Create new grade only if score or comment is provided
-            if grade_input.score is None and not grade_input.comment:
-                skipped += 1
-                continue
-                
-            new_grade = Grade(
-                student_id=grade_input.student_id,
-                assessment_event_id=bulk_data.assessment_event_id,
-                score=grade_input.score,
-                comment=grade_input.comment
-            )
-            session.add(new_grade)
-            created += 1
-
+    result = await upsert_grades(session, bulk_data.assessment_event_id, bulk_data.grades)
     await session.commit()
 
     return {
         "message": "Grades saved",
-        "created": created,
-        "updated": updated,
-        "skipped": skipped
+        "created": result.created,
+        "updated": result.updated,
+        "skipped": result.skipped
     }
 
 
@@ -128,6 +84,8 @@ async def create_grade(
 
     new_grade = Grade(**grade_data.model_dump())
     session.add(new_grade)
+    await session.flush()
+    await record_grade_changes(session, [(None, GradeFact.of(new_grade))])
     await session.commit()
     await session.refresh(new_grade)
 
@@ -168,6 +126,84 @@ async def list_grades(
     return [GradeRead.model_validate(g) for g in grades]
 
 
+def _encode_f32(values: List[Optional[float]]) -> str:
+    """Pack scores as base64 little-endian float32, NaN for missing values."""
+    packed = array("f", (math.nan if v is None else v for v in values))
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+
+@router.get("/matrix", response_model=GradeMatrix)
+async def get_grade_matrix(
+    session: SessionDep,
+    current_user: TeacherUser,
+    group_id: int = Query(...),
+    subject_id: Optional[int] = Query(None),
+    academic_year: Optional[str] = Query(None),
+    semester: Optional[int] = Query(None),
+    encoding: Literal["json", "f32"] = Query("json"),
+):
+    """
+    Get a group's gradebook as a student x assessment-event matrix.
+    Events are ordered by date, students by name.
+    """
+    events_query = select(AssessmentEvent).where(AssessmentEvent.group_id == group_id)
+    if subject_id is not None:
+        events_query = events_query.where(AssessmentEvent.subject_id == subject_id)
+    if academic_year is not None:
+        events_query = events_query.where(AssessmentEvent.academic_year == academic_year)
+    if semester is not None:
+        events_query = events_query.where(AssessmentEvent.semester == semester)
+    events_result = await session.execute(
+        events_query.order_by(AssessmentEvent.date, AssessmentEvent.id)
+    )
+    events = events_result.scalars().all()
+    columns = {event.id: i for i, event in enumerate(events)}
+
+    # Roster with its grades for the selected events, one row per (student, grade)
+    roster_result = await session.execute(
+        select(
+            Student.id, Student.last_name, Student.first_name, Student.middle_name,
+            Grade.assessment_event_id, Grade.score,
+        ).outerjoin(
+            Grade,
+            and_(
+                Grade.student_id == Student.id,
+                Grade.assessment_event_id.in_(list(columns)),
+            ),
+        ).where(
+            Student.group_id == group_id
+        ).order_by(Student.last_name, Student.first_name, Student.id)
+    )
+
+    students = []
+    scores: List[Optional[float]] = []
+    for row in roster_result.all():
+        if not students or students[-1].id != row.id:
+            students.append(GradeMatrixStudent(
+                id=row.id,
+                last_name=row.last_name,
+                first_name=row.first_name,
+                middle_name=row.middle_name,
+            ))
+            scores.extend([None] * len(events))
+        if row.assessment_event_id is not None:
+            scores[(len(students) - 1) * len(events) + columns[row.assessment_event_id]] = row.score
+
+    matrix = GradeMatrix(
+        group_id=group_id,
+        encoding=encoding,
+        students=students,
+        events=[GradeMatrixEvent.model_validate(event, from_attributes=True) for event in events],
+    )
+    if encoding == "f32":
+        matrix.scores_f32 = _encode_f32(scores)
+    else:
+        matrix.scores = scores
+    return matrix
+
+
 @router.get("/{grade_id}", response_model=GradeRead)
 async def get_grade(
     grade_id: int,
@@ -210,10 +246,13 @@ async def update_grade(
     if not grade:
         raise HTTPException(status_code=404, detail="Grade not found")
 
+    before = GradeFact.of(grade)
     update_data = grade_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(grade, field, value)
 
+    await session.flush()
+    await record_grade_changes(session, [(before, GradeFact.of(grade))])
     await session.commit()
     await session.refresh(grade)
 
@@ -235,5 +274,8 @@ async def delete_grade(
     if not grade:
         raise HTTPException(status_code=404, detail="Grade not found")
 
+    before = GradeFact.of(grade)
     await session.delete(grade)
+    await session.flush()
+    await record_grade_changes(session, [(before, None)])
     await session.commit()
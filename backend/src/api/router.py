@@ -9,6 +9,7 @@ from src.api.teachers import router as teachers_router
 from src.api.schedule import router as schedule_router
 from src.api.attendance import router as attendance_router
 from src.api.grades import router as grades_router
+from src.api.final_grades import router as final_grades_router
 from src.api.assignments import router as assignments_router
 from src.api.disciplinary import router as disciplinary_router
 from src.api.analytics import router as analytics_router
@@ -29,6 +30,7 @@ main_router.include_router(teachers_router, prefix="/api")
 main_router.include_router(schedule_router, prefix="/api")
 main_router.include_router(attendance_router, prefix="/api")
 main_router.include_router(grades_router, prefix="/api")
+main_router.include_router(final_grades_router, prefix="/api")
 main_router.include_router(assignments_router, prefix="/api")
 main_router.include_router(disciplinary_router, prefix="/api")
 main_router.include_router(analytics_router, prefix="/api")
@@ -1,24 +1,88 @@
-from typing import List
+from calendar import monthrange
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import date, timedelta
 from fastapi import APIRouter, status, Query
-from sqlalchemy import select, and_, or_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import (
+    select, insert, delete, and_, func, literal, literal_column, cast, true, union_all, Integer, String,
+)
+from sqlalchemy.orm import aliased, selectinload
 
-from src.api.dependencies import SessionDep, TeacherUser, CurrentUser
+from src.api.dependencies import SessionDep, TeacherUser, CurrentUser, CurrentIdentity
 from src.exceptions import (
     NotFoundError,
     BusinessLogicError,
 )
-from src.models.schedule import Schedule
+from src.models.schedule import Schedule, ScheduleRecurrence, ScheduleRecurrenceException
 from src.models.groups import Group
 from src.models.subjects import Subject
 from src.models.teachers import Teacher
 from src.models.users import UserRole
-from src.schemas.schedule import ScheduleCreate, ScheduleRead, ScheduleUpdate, MonthlyScheduleCreate
+from src.database import dialect_insert
+from src.reference_data import ReferenceData, load_reference_data, read_with_references
+from src.rollups import move_schedule_rollups
+from src.scheduling import (
+    Lesson,
+    Occurrence,
+    is_occurrence,
+    occurrence_dates,
+    occurrence_lesson,
+    load_occurrences,
+    load_lesson_index,
+    find_conflicts,
+)
+from src.schemas.schedule import (
+    ScheduleCreate,
+    ScheduleRead,
+    ScheduleUpdate,
+    MonthlyScheduleCreate,
+    CopyWeeksRequest,
+    ScheduleRecurrenceCreate,
+    ScheduleRecurrenceRead,
+    ScheduleRecurrenceUpdate,
+    ScheduleRecurrenceExceptionCreate,
+)
 
 router = APIRouter(prefix="/schedule", tags=["Schedule"])
 
 
+def _raise_on_conflict(conflicts: List[Tuple[Lesson, str, Lesson]]) -> None:
+    """Reject a write that double-books a group, teacher or room."""
+    if not conflicts:
+        return
+    lesson, resource, other = conflicts[0]
+    raise BusinessLogicError(
+        code="SCHEDULE_CONFLICT",
+        message="Конфликт расписания: это время уже занято",
+        details={
+            "date": lesson.date.isoformat(),
+            "resource": resource,
+            "schedule_id": other.schedule_id,
+            "recurrence_id": other.recurrence_id,
+        },
+    )
+
+
+def _conflict_report(lesson: Lesson, resource: str, other: Lesson) -> Dict[str, Any]:
+    """Describe a lesson left out because it double-books ``resource`` with ``other``."""
+    return {
+        "date": lesson.date.isoformat(),
+        "start_time": lesson.start_time.isoformat(),
+        "end_time": lesson.end_time.isoformat(),
+        "resource": resource,
+        "conflicts_with": {
+            "schedule_id": other.schedule_id,
+            "recurrence_id": other.recurrence_id,
+            "item_index": other.item_index,
+            "group_id": other.group_id,
+            "teacher_id": other.teacher_id,
+            "room": other.room,
+            "start_time": other.start_time.isoformat(),
+            "end_time": other.end_time.isoformat(),
+        },
+    }
+
+
 @router.post("/", response_model=ScheduleRead, status_code=status.HTTP_201_CREATED)
 async def create_schedule(
     schedule_data: ScheduleCreate,
@@ -49,43 +113,24 @@ async def create_schedule(
     if not teacher_result.scalar_one_or_none():
         raise NotFoundError(resource="Teacher", resource_id=schedule_data.teacher_id)
 
-    # Check for time conflicts on the same date
-    conflict_result = await session.execute(
-        select(Schedule).where(
-            and_(
-                Schedule.group_id == schedule_data.group_id,
-                Schedule.specific_date == schedule_data.specific_date,
-                Schedule.is_active == True,
-                # Time overlap check
-                Schedule.start_time < schedule_data.end_time,
-                Schedule.end_time > schedule_data.start_time,
-            )
-        )
+    # Check for time conflicts with lessons and recurring lessons on the same date
+    lesson = Lesson(
+        group_id=schedule_data.group_id,
+        teacher_id=schedule_data.teacher_id,
+        room=schedule_data.room,
+        date=schedule_data.specific_date,
+        start_time=schedule_data.start_time,
+        end_time=schedule_data.end_time,
     )
-    if conflict_result.scalar_one_or_none():
-        raise BusinessLogicError(
-            code="SCHEDULE_CONFLICT",
-            message="Конфликт расписания: это время уже занято"
-        )
+    _raise_on_conflict(await find_conflicts(session, [lesson]))
 
     new_schedule = Schedule(**schedule_data.model_dump())
     session.add(new_schedule)
     await session.commit()
     await session.refresh(new_schedule)
 
-    # Load relationships
-    result = await session.execute(
-        select(Schedule)
-        .where(Schedule.id == new_schedule.id)
-        .options(
-            selectinload(Schedule.group),
-            selectinload(Schedule.subject),
-            selectinload(Schedule.teacher),
-        )
-    )
-    new_schedule = result.scalar_one()
-
-    return ScheduleRead.model_validate(new_schedule)
+    refs = await load_reference_data(session)
+    return read_with_references(ScheduleRead, new_schedule, refs)
 
 
 @router.get("/", response_model=List[ScheduleRead])
@@ -102,11 +147,7 @@ async def list_schedules(
     """
     List schedules with optional filters.
     """
-    query = select(Schedule).options(
-        selectinload(Schedule.group),
-        selectinload(Schedule.subject),
-        selectinload(Schedule.teacher),
-    )
+    query = select(Schedule)
 
     if group_id:
         query = query.where(Schedule.group_id == group_id)
@@ -125,7 +166,32 @@ async def list_schedules(
 
     result = await session.execute(query)
     schedules = result.scalars().all()
-    return [ScheduleRead.model_validate(s) for s in schedules]
+    refs = await load_reference_data(session)
+    return [read_with_references(ScheduleRead, s, refs) for s in schedules]
+
+
+def _date_window(query, date_from: Optional[date], date_to: Optional[date]):
+    if date_from:
+        query = query.where(Schedule.specific_date >= date_from)
+    if date_to:
+        query = query.where(Schedule.specific_date <= date_to)
+    return query
+
+
+def _occurrence_read(occurrence: Occurrence, refs: ReferenceData) -> ScheduleRead:
+    rule = occurrence.recurrence
+    return read_with_references(
+        ScheduleRead, rule, refs,
+        id=None, recurrence_id=rule.id, specific_date=occurrence.date, is_active=True,
+    )
+
+
+def _merge_occurrences(schedules, occurrences: List[Occurrence], refs: ReferenceData) -> List[ScheduleRead]:
+    """Concrete rows and recurrence occurrences in one calendar order."""
+    items = [read_with_references(ScheduleRead, s, refs) for s in schedules]
+    items.extend(_occurrence_read(o, refs) for o in occurrences)
+    items.sort(key=lambda item: (item.specific_date, item.start_time))
+    return items
 
 
 @router.get("/group/{group_id}", response_model=List[ScheduleRead])
@@ -135,15 +201,13 @@ async def get_schedule_by_group(
     current_user: CurrentUser,
     academic_year: str = None,
     semester: int = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
 ):
     """
-    Get schedule for a specific group.
+    Get schedule for a specific group, recurring lessons included.
     """
-    query = select(Schedule).options(
-        selectinload(Schedule.group),
-        selectinload(Schedule.subject),
-        selectinload(Schedule.teacher),
-    ).where(
+    query = select(Schedule).where(
         Schedule.group_id == group_id,
         Schedule.is_active == True
     )
@@ -152,61 +216,58 @@ async def get_schedule_by_group(
         query = query.where(Schedule.academic_year == academic_year)
     if semester:
         query = query.where(Schedule.semester == semester)
-
-    query = query.order_by(Schedule.specific_date, Schedule.start_time)
+    query = _date_window(query, date_from, date_to)
 
     result = await session.execute(query)
-    schedules = result.scalars().all()
-    return [ScheduleRead.model_validate(s) for s in schedules]
+    occurrences = await load_occurrences(
+        session, date_from, date_to, group_id=group_id, academic_year=academic_year, semester=semester,
+    )
+    refs = await load_reference_data(session)
+    return _merge_occurrences(result.scalars().all(), occurrences, refs)
 
 
 @router.get("/my", response_model=List[ScheduleRead])
 async def get_my_schedule(
     session: SessionDep,
     current_user: CurrentUser,
+    identity: CurrentIdentity,
     academic_year: str = None,
     semester: int = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
 ):
     """
-    Get schedule for current user (student or teacher).
+    Get schedule for current user (student or teacher), recurring lessons included.
     """
-    query = select(Schedule).options(
-        selectinload(Schedule.group),
-        selectinload(Schedule.subject),
-        selectinload(Schedule.teacher),
-    ).where(Schedule.is_active == True)
+    owner = {}
+    query = select(Schedule).where(Schedule.is_active == True)
 
     if current_user.role == UserRole.STUDENT:
         # Get student's group schedule
-        from src.models.students import Student
-        student_result = await session.execute(
-            select(Student).where(Student.user_id == current_user.id)
-        )
-        student = student_result.scalar_one_or_none()
-        if not student:
+        if identity.student_id is None:
             raise NotFoundError(resource="Student profile")
-        query = query.where(Schedule.group_id == student.group_id)
+        query = query.where(Schedule.group_id == identity.group_id)
+        owner = {"group_id": identity.group_id}
 
     elif current_user.role == UserRole.TEACHER:
         # Get teacher's schedule
-        teacher_result = await session.execute(
-            select(Teacher).where(Teacher.user_id == current_user.id)
-        )
-        teacher = teacher_result.scalar_one_or_none()
-        if not teacher:
+        if identity.teacher_id is None:
             raise NotFoundError(resource="Teacher profile")
-        query = query.where(Schedule.teacher_id == teacher.id)
+        query = query.where(Schedule.teacher_id == identity.teacher_id)
+        owner = {"teacher_id": identity.teacher_id}
 
     if academic_year:
         query = query.where(Schedule.academic_year == academic_year)
     if semester:
         query = query.where(Schedule.semester == semester)
-
-    query = query.order_by(Schedule.specific_date, Schedule.start_time)
+    query = _date_window(query, date_from, date_to)
 
     result = await session.execute(query)
-    schedules = result.scalars().all()
-    return [ScheduleRead.model_validate(s) for s in schedules]
+    occurrences = await load_occurrences(
+        session, date_from, date_to, academic_year=academic_year, semester=semester, **owner,
+    )
+    refs = await load_reference_data(session)
+    return _merge_occurrences(result.scalars().all(), occurrences, refs)
 
 
 @router.get("/by-date-range", response_model=List[ScheduleRead])
@@ -219,7 +280,7 @@ async def get_schedule_by_date_range(
 ):
     """
     Get schedule for a specific date range (for calendar view).
-    Returns only specific date schedules (no templates).
+    Recurring lessons are expanded for the requested range only.
     """
     # Parse date strings
     from datetime import datetime
@@ -229,20 +290,206 @@ async def get_schedule_by_date_range(
     except ValueError:
         raise BusinessLogicError(code="INVALID_DATE", message="Неверный формат даты. Используйте ГГГГ-ММ-ДД")
     
-    query = select(Schedule).options(
-        selectinload(Schedule.group),
-        selectinload(Schedule.subject),
-        selectinload(Schedule.teacher),
-    ).where(
+    query = select(Schedule).where(
         Schedule.group_id == group_id,
         Schedule.is_active == True,
         Schedule.specific_date >= date_from_parsed,
         Schedule.specific_date <= date_to_parsed
-    ).order_by(Schedule.specific_date, Schedule.start_time)
+    )
 
     result = await session.execute(query)
-    schedules = result.scalars().all()
-    return [ScheduleRead.model_validate(s) for s in schedules]
+    occurrences = await load_occurrences(session, date_from_parsed, date_to_parsed, group_id=group_id)
+    refs = await load_reference_data(session)
+    return _merge_occurrences(result.scalars().all(), occurrences, refs)
+
+
+def _recurrence_query():
+    return select(ScheduleRecurrence).options(selectinload(ScheduleRecurrence.exceptions))
+
+
+async def _get_recurrence(session, recurrence_id: int) -> ScheduleRecurrence:
+    result = await session.execute(_recurrence_query().where(ScheduleRecurrence.id == recurrence_id))
+    rule = result.scalar_one_or_none()
+    if not rule:
+        raise NotFoundError(resource="Schedule recurrence", resource_id=recurrence_id)
+    return rule
+
+
+async def _check_recurrence_references(session, values: dict) -> None:
+    for model, resource, field in (
+        (Group, "Group", "group_id"),
+        (Subject, "Subject", "subject_id"),
+        (Teacher, "Teacher", "teacher_id"),
+    ):
+        if field in values and not await session.get(model, values[field]):
+            raise NotFoundError(resource=resource, resource_id=values[field])
+
+
+async def _recurrence_read(session, recurrence_id: int) -> ScheduleRecurrenceRead:
+    rule = await _get_recurrence(session, recurrence_id)
+    refs = await load_reference_data(session)
+    return read_with_references(ScheduleRecurrenceRead, rule, refs, exceptions=rule.exceptions)
+
+
+@router.post("/recurrences", response_model=ScheduleRecurrenceRead, status_code=status.HTTP_201_CREATED)
+async def create_recurrence(
+    recurrence_data: ScheduleRecurrenceCreate,
+    session: SessionDep,
+    current_user: TeacherUser,
+):
+    """
+    Create a weekly recurring lesson (teachers and admins only).
+    Its occurrences show up in schedule queries without being stored one by one.
+    """
+    await _check_recurrence_references(session, recurrence_data.model_dump())
+
+    # Every occurrence against lessons and other recurring lessons holding the group, teacher or room
+    rule = ScheduleRecurrence(**recurrence_data.model_dump())
+    lessons = [occurrence_lesson(rule, day) for day in occurrence_dates(rule, rule.start_date, rule.end_date)]
+    _raise_on_conflict(await find_conflicts(session, lessons))
+
+    session.add(rule)
+    await session.commit()
+
+    return await _recurrence_read(session, rule.id)
+
+
+@router.get("/recurrences", response_model=List[ScheduleRecurrenceRead])
+async def list_recurrences(
+    session: SessionDep,
+    current_user: CurrentUser,
+    group_id: int = None,
+    teacher_id: int = None,
+    academic_year: str = None,
+    semester: int = None,
+    active_only: bool = True,
+):
+    """
+    List recurring lessons with optional filters.
+    """
+    query = _recurrence_query()
+
+    if group_id:
+        query = query.where(ScheduleRecurrence.group_id == group_id)
+    if teacher_id:
+        query = query.where(ScheduleRecurrence.teacher_id == teacher_id)
+    if academic_year:
+        query = query.where(ScheduleRecurrence.academic_year == academic_year)
+    if semester:
+        query = query.where(ScheduleRecurrence.semester == semester)
+    if active_only:
+        query = query.where(ScheduleRecurrence.is_active == True)
+
+    query = query.order_by(ScheduleRecurrence.start_date, ScheduleRecurrence.start_time)
+
+    result = await session.execute(query)
+    refs = await load_reference_data(session)
+    return [
+        read_with_references(ScheduleRecurrenceRead, r, refs, exceptions=r.exceptions)
+        for r in result.scalars().all()
+    ]
+
+
+@router.patch("/recurrences/{recurrence_id}", response_model=ScheduleRecurrenceRead)
+async def update_recurrence(
+    recurrence_id: int,
+    recurrence_update: ScheduleRecurrenceUpdate,
+    session: SessionDep,
+    current_user: TeacherUser,
+):
+    """
+    Update a recurring lesson (teachers and admins only).
+    Lessons already materialized for attendance keep their own values.
+    """
+    rule = await _get_recurrence(session, recurrence_id)
+
+    update_data = recurrence_update.model_dump(exclude_unset=True)
+    await _check_recurrence_references(session, update_data)
+    for field, value in update_data.items():
+        setattr(rule, field, value)
+
+    if rule.end_time <= rule.start_time or rule.end_date < rule.start_date:
+        raise BusinessLogicError(code="INVALID_RANGE", message="Неверный интервал времени или дат")
+
+    if rule.is_active:
+        # Occurrences not cancelled or materialized yet, with the new values
+        await session.flush()
+        occurrences = await load_occurrences(session, rule.start_date, rule.end_date, group_id=rule.group_id)
+        lessons = [occurrence_lesson(rule, o.date) for o in occurrences if o.recurrence.id == rule.id]
+        _raise_on_conflict(await find_conflicts(session, lessons, exclude_recurrence_id=rule.id))
+
+    await session.commit()
+
+    return await _recurrence_read(session, recurrence_id)
+
+
+@router.delete("/recurrences/{recurrence_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_recurrence(
+    recurrence_id: int,
+    session: SessionDep,
+    current_user: TeacherUser,
+):
+    """
+    Delete a recurring lesson (teachers and admins only).
+    Materialized lessons and their attendance are kept.
+    """
+    rule = await session.get(ScheduleRecurrence, recurrence_id)
+    if not rule:
+        raise NotFoundError(resource="Schedule recurrence", resource_id=recurrence_id)
+
+    await session.delete(rule)
+    await session.commit()
+
+
+@router.post("/recurrences/{recurrence_id}/exceptions", response_model=ScheduleRecurrenceRead)
+async def add_recurrence_exception(
+    recurrence_id: int,
+    exception_data: ScheduleRecurrenceExceptionCreate,
+    session: SessionDep,
+    current_user: TeacherUser,
+):
+    """
+    Cancel one occurrence of a recurring lesson (teachers and admins only).
+    """
+    rule = await _get_recurrence(session, recurrence_id)
+    if not is_occurrence(rule, exception_data.date):
+        raise BusinessLogicError(
+            code="NOT_AN_OCCURRENCE",
+            message="В этот день занятие по данному расписанию не проводится",
+        )
+
+    stmt = dialect_insert(session, ScheduleRecurrenceException).values(
+        recurrence_id=recurrence_id,
+        date=exception_data.date,
+        reason=exception_data.reason,
+    ).on_conflict_do_nothing(index_elements=["recurrence_id", "date"])
+    await session.execute(stmt)
+    await session.commit()
+
+    session.expire(rule)
+    return await _recurrence_read(session, recurrence_id)
+
+
+@router.delete("/recurrences/{recurrence_id}/exceptions/{exception_date}", response_model=ScheduleRecurrenceRead)
+async def delete_recurrence_exception(
+    recurrence_id: int,
+    exception_date: date,
+    session: SessionDep,
+    current_user: TeacherUser,
+):
+    """
+    Restore a cancelled occurrence of a recurring lesson (teachers and admins only).
+    """
+    rule = await _get_recurrence(session, recurrence_id)
+    removed = [e for e in rule.exceptions if e.date == exception_date]
+    if not removed:
+        raise NotFoundError(resource="Schedule recurrence exception", resource_id=exception_date.isoformat())
+
+    for exception in removed:
+        rule.exceptions.remove(exception)
+    await session.commit()
+
+    return await _recurrence_read(session, recurrence_id)
 
 
 @router.get("/{schedule_id}", response_model=ScheduleRead)
@@ -255,20 +502,15 @@ async def get_schedule(
     Get schedule by ID.
     """
     result = await session.execute(
-        select(Schedule)
-        .where(Schedule.id == schedule_id)
-        .options(
-            selectinload(Schedule.group),
-            selectinload(Schedule.subject),
-            selectinload(Schedule.teacher),
-        )
+        select(Schedule).where(Schedule.id == schedule_id)
     )
     schedule = result.scalar_one_or_none()
 
     if not schedule:
         raise NotFoundError(resource="Schedule", resource_id=schedule_id)
 
-    return ScheduleRead.model_validate(schedule)
+    refs = await load_reference_data(session)
+    return read_with_references(ScheduleRead, schedule, refs)
 
 
 @router.patch("/{schedule_id}", response_model=ScheduleRead)
@@ -282,13 +524,7 @@ async def update_schedule(
     Update schedule (teachers and admins only).
     """
     result = await session.execute(
-        select(Schedule)
-        .where(Schedule.id == schedule_id)
-        .options(
-            selectinload(Schedule.group),
-            selectinload(Schedule.subject),
-            selectinload(Schedule.teacher),
-        )
+        select(Schedule).where(Schedule.id == schedule_id)
     )
     schedule = result.scalar_one_or_none()
 
@@ -296,13 +532,16 @@ async def update_schedule(
         raise NotFoundError(resource="Schedule", resource_id=schedule_id)
 
     update_data = schedule_update.model_dump(exclude_unset=True)
+    if "subject_id" in update_data:
+        await move_schedule_rollups(session, schedule.id, schedule.subject_id, update_data["subject_id"])
     for field, value in update_data.items():
         setattr(schedule, field, value)
 
     await session.commit()
     await session.refresh(schedule)
 
-    return ScheduleRead.model_validate(schedule)
+    refs = await load_reference_data(session)
+    return read_with_references(ScheduleRead, schedule, refs)
 
 
 @router.delete("/{schedule_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -324,6 +563,122 @@ async def delete_schedule(
     await session.commit()
 
 
+def _week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _add_days(session, day_column, days_column):
+    """Dialect-specific ``date + integer days`` expression."""
+    if session.get_bind().dialect.name == "postgresql":
+        return day_column + days_column
+    return func.date(day_column, cast(days_column, String) + " days")
+
+
+async def _copy_weeks(
+    session,
+    group_ids: List[int],
+    source_week_start: date,
+    target_week_starts: List[date],
+) -> Tuple[Counter, Counter, List[Dict[str, Any]]]:
+    """
+    Copy the groups' active lessons of the source week into every target week
+    with a single INSERT ... SELECT. Lessons whose (group, date, start_time)
+    slot is already taken by an active lesson are left out by an anti-join;
+    copies that still double-book a group, teacher or room (overlapping
+    lessons, occurrences of recurring lessons, earlier copies) are deleted
+    right after.
+    Occurrences materialized from a recurrence are not copied: the
+    recurrence already covers the target weeks.
+    Returns (source lessons, created lessons) counted per group and one
+    conflict report per deleted copy. Does not commit.
+    """
+    in_source_week = and_(
+        Schedule.group_id.in_(group_ids),
+        Schedule.specific_date >= source_week_start,
+        Schedule.specific_date <= source_week_start + timedelta(days=6),
+        Schedule.is_active == True,
+        Schedule.recurrence_id.is_(None),
+    )
+    source_result = await session.execute(
+        select(Schedule.group_id, Schedule.teacher_id, Schedule.room).where(in_source_week)
+    )
+    source_rows = source_result.all()
+    source_counts = Counter(r.group_id for r in source_rows)
+    if not source_counts:
+        return source_counts, Counter(), []
+
+    index = await load_lesson_index(
+        session,
+        min(target_week_starts),
+        max(target_week_starts) + timedelta(days=6),
+        group_ids=source_counts.keys(),
+        teacher_ids={r.teacher_id for r in source_rows},
+        rooms={r.room for r in source_rows},
+    )
+
+    offsets = union_all(*[
+        select(literal_column(str((week_start - source_week_start).days), Integer).label("days"))
+        for week_start in target_week_starts
+    ]).subquery("offsets")
+    new_date = _add_days(session, Schedule.specific_date, offsets.c.days)
+
+    existing = aliased(Schedule)
+    slot_taken = select(existing.id).where(
+        and_(
+            existing.group_id == Schedule.group_id,
+            existing.specific_date == new_date,
+            existing.start_time == Schedule.start_time,
+            existing.is_active == True,
+        )
+    ).exists()
+
+    copies = select(
+        Schedule.group_id, Schedule.subject_id, Schedule.teacher_id, new_date,
+        Schedule.start_time, Schedule.end_time, Schedule.room,
+        Schedule.semester, Schedule.academic_year, literal(True),
+    ).join(offsets, true()).where(and_(in_source_week, ~slot_taken))
+
+    result = await session.execute(
+        insert(Schedule).from_select(
+            [
+                "group_id", "subject_id", "teacher_id", "specific_date",
+                "start_time", "end_time", "room", "semester", "academic_year", "is_active",
+            ],
+            copies,
+        ).returning(
+            Schedule.id, Schedule.group_id, Schedule.teacher_id, Schedule.room,
+            Schedule.specific_date, Schedule.start_time, Schedule.end_time,
+        )
+    )
+
+    created = Counter()
+    conflicting_ids = []
+    conflicts = []
+    for r in sorted(result.all(), key=lambda r: (r.specific_date, r.start_time, r.group_id)):
+        lesson = Lesson(
+            group_id=r.group_id,
+            teacher_id=r.teacher_id,
+            room=r.room,
+            date=r.specific_date,
+            start_time=r.start_time,
+            end_time=r.end_time,
+            schedule_id=r.id,
+        )
+        lesson_conflicts = index.conflicts(lesson)
+        if lesson_conflicts:
+            conflicting_ids.append(r.id)
+            conflicts.extend(
+                {"group_id": r.group_id, **_conflict_report(lesson, resource, other)}
+                for resource, other in lesson_conflicts
+            )
+        else:
+            index.add(lesson)
+            created[r.group_id] += 1
+    if conflicting_ids:
+        await session.execute(delete(Schedule).where(Schedule.id.in_(conflicting_ids)))
+    return source_counts, created, conflicts
+
+
 @router.post("/copy-week")
 async def copy_week_schedule(
     session: SessionDep,
@@ -335,74 +690,71 @@ async def copy_week_schedule(
     """
     Copy schedule from one week to another.
     """
-    # Get source week schedules
-    source_week_start = source_date - timedelta(days=source_date.weekday())
-    source_week_end = source_week_start + timedelta(days=6)
-    
-    source_schedules_result = await session.execute(
-        select(Schedule).where(
-            and_(
-                Schedule.group_id == group_id,
-                Schedule.specific_date >= source_week_start,
-                Schedule.specific_date <= source_week_end,
-                Schedule.is_active == True
-            )
-        )
+    source_week_start = _week_start(source_date)
+    target_week_start = _week_start(target_date)
+
+    source_counts, created, conflicts = await _copy_weeks(
+        session, [group_id], source_week_start, [target_week_start]
     )
-    source_schedules = source_schedules_result.scalars().all()
-    
-    if not source_schedules:
+    if not source_counts:
         raise NotFoundError(resource="Source schedules")
-    
-    # Calculate day offset
-    target_week_start = target_date - timedelta(days=target_date.weekday())
-    day_offset = (target_week_start - source_week_start).days
-    
-    created_count = 0
-    for source in source_schedules:
-        new_date = source.specific_date + timedelta(days=day_offset)
-        
-        # Check if schedule already exists
-        existing_result = await session.execute(
-            select(Schedule).where(
-                and_(
-                    Schedule.group_id == group_id,
-                    Schedule.specific_date == new_date,
-                    Schedule.start_time == source.start_time,
-                    Schedule.is_active == True
-                )
-            )
-        )
-        
-        if existing_result.scalar_one_or_none():
-            continue
-        
-        # Create new schedule
-        new_schedule = Schedule(
-            group_id=source.group_id,
-            subject_id=source.subject_id,
-            teacher_id=source.teacher_id,
-            specific_date=new_date,
-            start_time=source.start_time,
-            end_time=source.end_time,
-            room=source.room,
-            semester=source.semester,
-            academic_year=source.academic_year,
-            is_active=True
-        )
-        session.add(new_schedule)
-        created_count += 1
-    
+
     await session.commit()
-    
+
     return {
         "message": "Week schedule copied successfully",
-        "created": created_count,
+        "created": created[group_id],
+        "conflicts": conflicts,
         "source_week": source_week_start.isoformat(),
         "target_week": target_week_start.isoformat()
     }
 
 
+@router.post("/copy-weeks")
+async def copy_weeks_schedule(
+    copy_data: CopyWeeksRequest,
+    session: SessionDep,
+    current_user: TeacherUser,
+):
+    """
+    Copy one week of lessons of many groups into a range of consecutive weeks.
+    Runs as a single INSERT ... SELECT in one transaction; lessons that would
+    double-book a group, teacher or room, including occurrences of recurring
+    lessons, are skipped and reported in ``conflicts``.
+    """
+    groups_result = await session.execute(select(Group.id).where(Group.id.in_(copy_data.group_ids)))
+    found = set(groups_result.scalars().all())
+    missing = [group_id for group_id in copy_data.group_ids if group_id not in found]
+    if missing:
+        raise NotFoundError(resource="Group", resource_id=", ".join(map(str, missing)))
+
+    source_week_start = _week_start(copy_data.source_date)
+    first_target = _week_start(copy_data.target_date)
+    target_week_starts = [first_target + timedelta(weeks=n) for n in range(copy_data.weeks)]
+
+    source_counts, created, conflicts = await _copy_weeks(
+        session, copy_data.group_ids, source_week_start, target_week_starts
+    )
+    await session.commit()
+
+    return {
+        "message": "Week schedule copied successfully",
+        "created": sum(created.values()),
+        "skipped": sum(source_counts.values()) * len(target_week_starts) - sum(created.values()),
+        "conflicts": conflicts,
+        "source_week": source_week_start.isoformat(),
+        "target_weeks": [week_start.isoformat() for week_start in target_week_starts],
+        "groups": [
+            {
+                "group_id": group_id,
+                "source_lessons": source_counts[group_id],
+                "created": created[group_id],
+            }
+            for group_id in copy_data.group_ids
+        ],
+    }
+
+
 @router.post("/create-monthly")
 async def create_monthly_schedule(
     session: SessionDep,
@@ -412,75 +764,112 @@ async def create_monthly_schedule(
     """
     Create schedule for a specific month.
     Allows specifying all lessons for the entire month at once.
+
+    Lessons that double-book the group, the teacher or the room (against
+    existing lessons or earlier items of the same request) are not created
+    and are reported in ``conflicts``. An item identical in group, date and
+    start time to an existing lesson is skipped.
     """
     # Verify group exists
     group_result = await session.execute(select(Group).where(Group.id == monthly_data.group_id))
     if not group_result.scalar_one_or_none():
         raise NotFoundError(resource="Group", resource_id=monthly_data.group_id)
-    
-    created_count = 0
+
+    items = monthly_data.schedule_items
+    month_start = date(monthly_data.year, monthly_data.month, 1)
+    month_end = date(monthly_data.year, monthly_data.month, monthrange(monthly_data.year, monthly_data.month)[1])
+
+    # All referenced subjects and teachers in one query
+    subject_ids = {item.subject_id for item in items}
+    teacher_ids = {item.teacher_id for item in items}
+    known_result = await session.execute(
+        select(literal("subject").label("kind"), Subject.id).where(Subject.id.in_(subject_ids)).union_all(
+            select(literal("teacher").label("kind"), Teacher.id).where(Teacher.id.in_(teacher_ids))
+        )
+    )
+    known = {(r.kind, r.id) for r in known_result.all()}
+
+    # Every active lesson and recurring lesson occurrence of the month that
+    # shares the group, a teacher or a room
+    index = await load_lesson_index(
+        session,
+        month_start,
+        month_end,
+        group_ids=[monthly_data.group_id],
+        teacher_ids=teacher_ids,
+        rooms={item.room for item in items},
+    )
+    group_slots = {
+        (lesson.date, lesson.start_time) for lesson in index if lesson.group_id == monthly_data.group_id
+    }
+
+    rows = []
     skipped_count = 0
     errors = []
-    
-    for item in monthly_data.schedule_items:
+    conflicts = []
+
+    for position, item in enumerate(items):
         # Verify date is in the specified month
         if item.specific_date.year != monthly_data.year or item.specific_date.month != monthly_data.month:
             errors.append(f"Date {item.specific_date} is not in {monthly_data.year}-{monthly_data.month:02d}")
             continue
-        
-        # Check if schedule already exists for this date/time
-        existing_result = await session.execute(
-            select(Schedule).where(
-                and_(
-                    Schedule.group_id == monthly_data.group_id,
-                    Schedule.specific_date == item.specific_date,
-                    Schedule.start_time == item.start_time,
-                    Schedule.is_active == True
-                )
-            )
-        )
-        
-        if existing_result.scalar_one_or_none():
+        if item.end_time <= item.start_time:
+            errors.append(f"Item {position}: end time {item.end_time} is not after start time {item.start_time}")
+            continue
+
+        # Already scheduled for this date/time
+        if (item.specific_date, item.start_time) in group_slots:
             skipped_count += 1
             continue
-        
-        # Verify subject and teacher exist
-        subject_result = await session.execute(select(Subject).where(Subject.id == item.subject_id))
-        teacher_result = await session.execute(select(Teacher).where(Teacher.id == item.teacher_id))
-        
-        if not subject_result.scalar_one_or_none():
+
+        if ("subject", item.subject_id) not in known:
             errors.append(f"Subject {item.subject_id} not found")
             continue
-        if not teacher_result.scalar_one_or_none():
+        if ("teacher", item.teacher_id) not in known:
             errors.append(f"Teacher {item.teacher_id} not found")
             continue
-        
-        # Create schedule entry
-        new_schedule = Schedule(
+
+        lesson = Lesson(
             group_id=monthly_data.group_id,
-            subject_id=item.subject_id,
             teacher_id=item.teacher_id,
-            specific_date=item.specific_date,
+            room=item.room,
+            date=item.specific_date,
             start_time=item.start_time,
             end_time=item.end_time,
-            room=item.room,
-            semester=monthly_data.semester,
-            academic_year=monthly_data.academic_year,
-            is_active=True
+            item_index=position,
         )
-        session.add(new_schedule)
-        created_count += 1
-    
+        lesson_conflicts = index.conflicts(lesson)
+        if lesson_conflicts:
+            conflicts.extend(
+                {"item_index": position, **_conflict_report(lesson, resource, other)}
+                for resource, other in lesson_conflicts
+            )
+            continue
+
+        index.add(lesson)
+        group_slots.add((item.specific_date, item.start_time))
+        rows.append({
+            "group_id": monthly_data.group_id,
+            "subject_id": item.subject_id,
+            "teacher_id": item.teacher_id,
+            "specific_date": item.specific_date,
+            "start_time": item.start_time,
+            "end_time": item.end_time,
+            "room": item.room,
+            "semester": monthly_data.semester,
+            "academic_year": monthly_data.academic_year,
+            "is_active": True,
+        })
+
+    if rows:
+        await session.execute(insert(Schedule), rows)
     await session.commit()
-    
+
     return {
         "message": "Monthly schedule created successfully",
-        "created": created_count,
+        "created": len(rows),
         "skipped": skipped_count,
         "errors": errors if errors else None,
+        "conflicts": conflicts,
         "month": f"{monthly_data.year}-{monthly_data.month:02d}",
     }
-
-
-
-
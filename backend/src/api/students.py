@@ -1,6 +1,6 @@
 from typing import List
 from fastapi import APIRouter, HTTPException, status
-from sqlalchemy import select
+from sqlalchemy import select, delete
 from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import IntegrityError
 
@@ -8,8 +8,12 @@ from src.api.dependencies import SessionDep, TeacherUser, CurrentUser
 from src.models.users import User, UserRole
 from src.models.students import Student
 from src.models.groups import Group
+from src.models.grades import StudentSubjectGradeStats
+from src.models.final_grades import FinalGrade
+from src.models.risk import StudentRiskFlag
+from src.rollups import move_student_rollups
 from src.schemas.students import StudentCreate, StudentRead, StudentUpdate
-from src.security import hash_password
+from src.security import hash_password_async
 
 router = APIRouter(prefix="/students", tags=["Students"])
 
@@ -47,7 +51,7 @@ async def create_student(
         # Create user account
         new_user = User(
             email=student_data.email.lower(),
-            password_hash=hash_password(student_data.password),
+            password_hash=await hash_password_async(student_data.password),
             role=UserRole.STUDENT,
         )
         session.add(new_user)
@@ -181,6 +185,8 @@ async def update_student(
         )
 
     update_data = student_update.model_dump(exclude_unset=True)
+    if "group_id" in update_data:
+        await move_student_rollups(session, student.id, student.group_id, update_data["group_id"])
     for field, value in update_data.items():
         setattr(student, field, value)
 
@@ -214,6 +220,9 @@ async def delete_student(
     if user:
         user.is_active = False
 
+    await session.execute(delete(StudentRiskFlag).where(StudentRiskFlag.student_id == student_id))
+    await session.execute(delete(StudentSubjectGradeStats).where(StudentSubjectGradeStats.student_id == student_id))
+    await session.execute(delete(FinalGrade).where(FinalGrade.student_id == student_id))
     await session.delete(student)
     await session.commit()
 
@@ -7,7 +7,7 @@ from src.api.dependencies import SessionDep, AdminUser, CurrentUser
 from src.models.users import User, UserRole
 from src.models.teachers import Teacher
 from src.schemas.teachers import TeacherCreate, TeacherRead, TeacherUpdate
-from src.security import hash_password
+from src.security import hash_password_async
 
 router = APIRouter(prefix="/teachers", tags=["Teachers"])
 
@@ -35,7 +35,7 @@ async def create_teacher(
         # Create user account
         new_user = User(
             email=teacher_data.email.lower(),
-            password_hash=hash_password(teacher_data.password),
+            password_hash=await hash_password_async(teacher_data.password),
             role=UserRole.TEACHER,
         )
         session.add(new_user)
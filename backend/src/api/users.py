@@ -7,7 +7,7 @@ from src.api.dependencies import SessionDep, AdminUser, CurrentUser
 from src.exceptions import NotFoundError, AuthorizationError
 from src.models.users import User, UserRole
 from src.schemas.users import UserRead, UserUpdate
-from src.security import hash_password
+from src.security import hash_password_async
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -77,7 +77,7 @@ async def update_user(
     update_data = user_update.model_dump(exclude_unset=True)
 
     if "password" in update_data:
-        update_data["password_hash"] = hash_password(update_data.pop("password"))
+        update_data["password_hash"] = await hash_password_async(update_data.pop("password"))
 
     for field, value in update_data.items():
         setattr(user, field, value)
@@ -0,0 +1,152 @@
+"""
+Content-addressed storage of uploaded files.
+
+Uploads are stored under a key derived from their SHA-256
+(``blobs/ab/cd/<sha256>-<token><ext>``) and tracked in ``storage_blobs`` with
+a reference count. Uploading content that is already stored only bumps the
+count, so attaching the same manual to dozens of lessons keeps one copy.
+Attachments reference their blob through ``blob_id``; deleting one releases
+the reference and the file goes away with the last one.
+
+Files are deleted only after the releasing transaction commits: the release
+functions return the keys, and the caller passes them to
+``delete_stored_files`` after ``commit()``. A failed commit then leaves the
+rows pointing at files that still exist; a failed delete only leaves an
+orphaned file. An upload of the same content racing with the release inserts
+a fresh row under a fresh key, so the late delete never touches its file.
+"""
+import logging
+from typing import BinaryIO, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import dialect_insert
+from src.models.attachments import Attachment, StorageBlob
+from src.models.gamification import TopographicSymbol
+from src.exceptions import StorageError
+from src.storage import Storage, StoredFile
+
+logger = logging.getLogger("uvicorn.error")
+
+
+async def store_upload(
+    session: AsyncSession,
+    storage: Storage,
+    file: BinaryIO,
+    filename: str,
+    content_type: Optional[str] = None,
+) -> Tuple[StoredFile, int]:
+    """
+    Store an upload by content and take a reference to its blob.
+    Returns the storage information and the blob id. Caller commits.
+    """
+    staged = await storage.stage(file, filename, content_type)
+    try:
+        stmt = dialect_insert(session, StorageBlob).values(
+            sha256=staged.sha256,
+            storage_backend=storage.backend_type,
+            storage_key=storage.blob_key(staged.sha256, filename),
+            size=staged.size,
+            ref_count=1,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["sha256", "storage_backend"],
+            set_={"ref_count": StorageBlob.ref_count + 1},
+        ).returning(StorageBlob.id, StorageBlob.storage_key, StorageBlob.ref_count)
+        blob_id, key, ref_count = (await session.execute(stmt)).one()
+
+        if ref_count == 1:
+            await storage.store(staged, key)
+        else:
+            # Known content: metadata only
+            await storage.discard(staged)
+    except BaseException:
+        await storage.discard(staged)
+        raise
+
+    return storage.stored_file(staged, key), blob_id
+
+
+async def retain_blob(session: AsyncSession, blob_id: int) -> bool:
+    """Take another reference to a stored blob. False if it is gone. Caller commits."""
+    result = await session.execute(
+        update(StorageBlob)
+        .where(StorageBlob.id == blob_id)
+        .values(ref_count=StorageBlob.ref_count + 1)
+        .returning(StorageBlob.id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.first() is not None
+
+
+async def release_blob(session: AsyncSession, blob_id: int) -> Optional[str]:
+    """
+    Drop one reference to a blob, deleting the row with the last one. Rows
+    referencing the blob must be gone already. Returns the storage key to
+    delete once the transaction has committed, if any. Caller commits.
+    """
+    result = await session.execute(
+        update(StorageBlob)
+        .where(StorageBlob.id == blob_id)
+        .values(ref_count=StorageBlob.ref_count - 1)
+        .returning(StorageBlob.ref_count, StorageBlob.storage_key)
+        .execution_options(synchronize_session=False)
+    )
+    row = result.one_or_none()
+    if row is None or row.ref_count > 0:
+        return None
+
+    await session.execute(delete(StorageBlob).where(StorageBlob.id == blob_id))
+    return row.storage_key
+
+
+async def delete_attachment_file(session: AsyncSession, attachment: Attachment) -> List[str]:
+    """
+    Delete an attachment row, together with its generated variants, and
+    release their stored files. Returns the storage keys to pass to
+    ``delete_stored_files`` after the commit. Caller commits.
+    """
+    blob_id, key = attachment.blob_id, attachment.storage_key
+    variant_ids = [i for i in (attachment.thumbnail_attachment_id, attachment.webp_attachment_id) if i]
+
+    # Symbols showing the image (or this thumbnail of it) lose it
+    await session.execute(
+        update(TopographicSymbol)
+        .where(TopographicSymbol.attachment_id == attachment.id)
+        .values(attachment_id=None)
+    )
+    await session.execute(
+        update(TopographicSymbol)
+        .where(TopographicSymbol.thumbnail_attachment_id == attachment.id)
+        .values(thumbnail_attachment_id=None)
+    )
+    await session.delete(attachment)
+    await session.flush()
+
+    keys = []
+    if blob_id is not None:
+        released = await release_blob(session, blob_id)
+        if released:
+            keys.append(released)
+    else:
+        # Stored before deduplication: the file belongs to this attachment alone
+        keys.append(key)
+
+    for variant_id in variant_ids:
+        variant = await session.get(Attachment, variant_id)
+        if variant is not None:
+            keys.extend(await delete_attachment_file(session, variant))
+    return keys
+
+
+async def delete_stored_files(storage: Storage, keys: Iterable[str]) -> None:
+    """
+    Delete released files. Call only after the transaction that released
+    them has committed; a file that cannot be deleted is logged and left.
+    """
+    for key in keys:
+        try:
+            await storage.delete(key)
+        except StorageError as exc:
+            logger.warning(f"Could not delete stored file {key}: {exc}")
@@ -0,0 +1,161 @@
+"""
+In-process caches with write-triggered invalidation.
+
+Every committed write bumps a per-table version counter: the session listeners
+below collect the tables touched by flushes and by ORM-enabled INSERT/UPDATE/
+DELETE statements, and bump them once the transaction commits. A cache entry
+remembers the versions of the tables it was computed from and is treated as a
+miss as soon as any of them moves, so readers never wait for the TTL after a
+write.
+
+Versions are process-local: with several workers, a write made in one worker
+invalidates the others only when their TTL expires.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+_table_versions: Dict[str, int] = {}
+
+_CHANGED_TABLES_KEY = "changed_tables"
+
+
+def bump_table_versions(tables: Iterable[str]) -> None:
+    """Mark the given tables as changed."""
+    for table in tables:
+        _table_versions[table] = _table_versions.get(table, 0) + 1
+
+
+def table_versions(tables: Iterable[str]) -> Tuple[int, ...]:
+    """Current version of each table, in order."""
+    return tuple(_table_versions.get(table, 0) for table in tables)
+
+
+def _changed_tables(session: Session) -> set:
+    return session.info.setdefault(_CHANGED_TABLES_KEY, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session: Session, flush_context) -> None:
+    changed = _changed_tables(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            changed.add(table)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_statement_tables(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _changed_tables(orm_execute_state.session).add(table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed_tables(session: Session) -> None:
+    changed = session.info.pop(_CHANGED_TABLES_KEY, None)
+    if changed:
+        bump_table_versions(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_tables(session: Session) -> None:
+    session.info.pop(_CHANGED_TABLES_KEY, None)
+
+
+class VersionedCache:
+    """
+    LRU cache with a per-entry TTL whose entries also expire when any of
+    the tables they depend on is written to.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Tuple[str, ...], Tuple[int, ...], Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (found, value) for a fresh entry."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, tables, versions, value = entry
+            if expires_at > time.monotonic() and table_versions(tables) == versions:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, value
+            del self._entries[key]
+        self.misses += 1
+        return False, None
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        tables: Tuple[str, ...],
+        versions: Optional[Tuple[int, ...]] = None,
+    ) -> None:
+        """
+        Store a value computed from ``tables``. Pass the ``versions`` read before
+        computing so a write that lands mid-computation leaves the entry stale.
+        """
+        if not self.enabled:
+            return
+        if versions is None:
+            versions = table_versions(tables)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, tables, versions, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        tables: Iterable[str],
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Return the cached value for ``key`` or compute and store it."""
+        if not self.enabled:
+            return await compute()
+        found, value = self.get(key)
+        if found:
+            return value
+        tables = tuple(tables)
+        versions = table_versions(tables)
+        value = await compute()
+        self.set(key, value, tables, versions)
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+analytics_cache = VersionedCache(
+    max_entries=int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "512")),
+    ttl_seconds=float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "60")),
+)
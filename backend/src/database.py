@@ -36,4 +36,16 @@ async def get_db():
 
 class Base(DeclarativeBase):
     """Base class for all database models."""
-    pass
\ No newline at end of file
+    pass
+
+
+def dialect_insert(session: AsyncSession, model):
+    """
+    Return an INSERT construct for the session's dialect.
+    Both PostgreSQL and SQLite variants support ON CONFLICT clauses.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
@@ -0,0 +1,207 @@
+"""
+Conditional and byte-range responses for stored files.
+
+Uploaded files never change under their key, so their ETag and
+Last-Modified are fixed at upload time and clients may cache them for a
+year. ``file_response`` answers ``If-None-Match``/``If-Modified-Since``
+with 304, ``Range`` with 206 (``multipart/byteranges`` for several ranges)
+and everything else with the whole file, reading only the requested bytes
+from storage through ``open_range``.
+"""
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+
+# Keys are never reused, so a cached copy can be kept as long as browsers allow
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# More ranges than this are answered with the whole file
+MAX_RANGES = 16
+
+# (offset, length) -> chunks of that byte range
+OpenRange = Callable[[int, Optional[int]], Awaitable[AsyncIterator[bytes]]]
+
+
+def cache_control(private: bool) -> str:
+    scope = "private" if private else "public"
+    return f"{scope}, max-age={IMMUTABLE_MAX_AGE}, immutable"
+
+
+def _http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)  # Timestamps are stored in UTC
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of ``etag`` against an If-None-Match list."""
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    modified = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
+    # HTTP dates have one-second resolution
+    return modified.replace(microsecond=0) <= since
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Whether the client's cached copy is current (If-None-Match takes precedence)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        return _not_modified_since(if_modified_since, last_modified)
+    return False
+
+
+def parse_range(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Satisfiable (start, end) byte ranges of a Range header, inclusive, sorted
+    and with overlapping or adjacent ranges merged. Returns None when the
+    header should be ignored (malformed, not bytes, too many ranges) and an
+    empty list when no range is satisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+    parts = spec.split(",")
+    if len(parts) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for part in parts:
+        first, dash, last = part.strip().partition("-")
+        if not dash or not (first or last) or not all(v.isdigit() for v in (first, last) if v):
+            return None
+        if not first:
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix and size:
+                ranges.append((max(0, size - suffix), size - 1))
+            continue
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+        if start < size:
+            ranges.append((start, end))
+
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _if_range_matches(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Whether a Range request may be served partially (If-Range absent or current)."""
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # Strong comparison only
+        return not if_range.startswith("W/") and if_range == etag
+    return last_modified is not None and _not_modified_since(if_range, last_modified)
+
+
+async def file_response(
+    request: Request,
+    *,
+    size: int,
+    etag: str,
+    last_modified: Optional[datetime],
+    content_type: str,
+    open_range: OpenRange,
+    private: bool,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Serve an immutable stored file of ``size`` bytes, honouring conditional
+    and Range request headers. ``open_range(offset, length)`` streams the
+    requested bytes from storage.
+    """
+    common = {
+        "ETag": etag,
+        "Cache-Control": cache_control(private),
+        "Accept-Ranges": "bytes",
+    }
+    if last_modified is not None:
+        common["Last-Modified"] = _http_date(last_modified)
+
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=common)
+
+    common.update(headers or {})
+
+    range_header = request.headers.get("range")
+    ranges = None
+    if range_header and _if_range_matches(request, etag, last_modified):
+        ranges = parse_range(range_header, size)
+
+    if ranges is None:
+        return StreamingResponse(
+            await open_range(0, None),
+            media_type=content_type,
+            headers={**common, "Content-Length": str(size)},
+        )
+
+    if not ranges:
+        return Response(status_code=416, headers={**common, "Content-Range": f"bytes */{size}"})
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        return StreamingResponse(
+            await open_range(start, end - start + 1),
+            status_code=206,
+            media_type=content_type,
+            headers={
+                **common,
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(end - start + 1),
+            },
+        )
+
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        (
+            f"--{boundary}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode("latin-1")
+        for start, end in ranges
+    ]
+    closing = f"\r\n--{boundary}--\r\n".encode("latin-1")
+    # Every part after the first is preceded by the CRLF that ends the previous one
+    length = sum(len(h) for h in part_headers) + sum(end - start + 1 for start, end in ranges)
+    length += 2 * (len(ranges) - 1) + len(closing)
+
+    async def body() -> AsyncIterator[bytes]:
+        for index, ((start, end), part_header) in enumerate(zip(ranges, part_headers)):
+            yield (b"\r\n" if index else b"") + part_header
+            async for chunk in await open_range(start, end - start + 1):
+                yield chunk
+        yield closing
+
+    return StreamingResponse(
+        body(),
+        status_code=206,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers={**common, "Content-Length": str(length)},
+    )
@@ -0,0 +1,160 @@
+"""
+Weighted final semester grades.
+
+The final grade of a student in a subject and semester is the weighted mean
+of their average score per assessment event type, using the ``grade_weights``
+configured for the subject (falling back to the rows without subject, then
+to DEFAULT_GRADE_WEIGHT). Event types without grades yet do not count, so
+``weight_total`` tells how much of the scheme a grade already covers.
+
+Results are stored in ``final_grades``. ``record_grade_changes`` (see
+src/grade_stats.py) recomputes only the (student, subject, semester) keys a
+grade write touched; weight changes recompute the subject they apply to.
+"""
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, delete, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import dialect_insert
+from src.models.assessment_events import AssessmentEvent, AssessmentEventType
+from src.models.final_grades import GradeWeight, FinalGrade
+from src.models.grades import Grade
+from src.models.students import Student
+
+
+DEFAULT_GRADE_WEIGHT = float(os.getenv("DEFAULT_GRADE_WEIGHT", "1"))
+
+FinalGradeKey = Tuple[int, int, str, int]  # (student_id, subject_id, academic_year, semester)
+Weights = Dict[Tuple[AssessmentEventType, Optional[int]], float]
+
+FINAL_GRADE_KEY = ["student_id", "subject_id", "academic_year", "semester"]
+UPSERT_CHUNK_SIZE = 1000
+
+
+async def load_weights(session: AsyncSession) -> Weights:
+    """
+    All configured weights keyed by (event_type, subject_id or None).
+    Not cached: final grades are stored, so they must use the weights
+    committed in the database, whichever worker changed them.
+    """
+    result = await session.execute(
+        select(GradeWeight.event_type, GradeWeight.subject_id, GradeWeight.weight)
+    )
+    return {(r.event_type, r.subject_id): r.weight for r in result.all()}
+
+
+def weight_for(weights: Weights, event_type: AssessmentEventType, subject_id: int) -> float:
+    return weights.get((event_type, subject_id), weights.get((event_type, None), DEFAULT_GRADE_WEIGHT))
+
+
+def _type_averages_query():
+    """Average score per student, subject, semester and event type."""
+    return select(
+        Grade.student_id,
+        AssessmentEvent.subject_id,
+        AssessmentEvent.academic_year,
+        AssessmentEvent.semester,
+        AssessmentEvent.event_type,
+        func.avg(Grade.score).label("average"),
+        func.count(Grade.id).label("count"),
+    ).join(
+        AssessmentEvent, Grade.assessment_event_id == AssessmentEvent.id
+    ).join(
+        Student, Grade.student_id == Student.id
+    ).where(
+        Grade.score.isnot(None)
+    ).group_by(
+        Grade.student_id, AssessmentEvent.subject_id, AssessmentEvent.academic_year,
+        AssessmentEvent.semester, AssessmentEvent.event_type,
+    )
+
+
+def _final_grade_rows(type_averages, weights: Weights) -> List[dict]:
+    """Fold per-event-type averages into one weighted row per key."""
+    parts: Dict[FinalGradeKey, List[Tuple[float, float, int]]] = defaultdict(list)
+    for r in type_averages:
+        key = (r.student_id, r.subject_id, r.academic_year, r.semester)
+        parts[key].append((weight_for(weights, r.event_type, r.subject_id), float(r.average), r.count))
+
+    rows = []
+    for key, values in parts.items():
+        weight_total = sum(weight for weight, _, _ in values)
+        if weight_total <= 0:
+            continue
+        rows.append({
+            **dict(zip(FINAL_GRADE_KEY, key)),
+            "score": sum(weight * average for weight, average, _ in values) / weight_total,
+            "grades_count": sum(count for _, _, count in values),
+            "weight_total": weight_total,
+        })
+    return rows
+
+
+async def _upsert_final_grades(session: AsyncSession, rows: List[dict]) -> None:
+    # Chunked to stay under the bound parameter limit on full recomputes
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = dialect_insert(session, FinalGrade).values(rows[start:start + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=FINAL_GRADE_KEY,
+            set_={
+                "score": stmt.excluded.score,
+                "grades_count": stmt.excluded.grades_count,
+                "weight_total": stmt.excluded.weight_total,
+                "computed_at": func.now(),
+            },
+        )
+        await session.execute(stmt)
+
+
+async def recompute_final_grades(session: AsyncSession, keys: Iterable[FinalGradeKey]) -> int:
+    """
+    Recompute the final grades of the given keys from raw grades, dropping
+    keys left without graded entries. Returns the number of rows written.
+    Caller commits.
+    """
+    keys = list(set(keys))
+    if not keys:
+        return 0
+
+    key_filter = tuple_(
+        Grade.student_id, AssessmentEvent.subject_id, AssessmentEvent.academic_year, AssessmentEvent.semester
+    ).in_(keys)
+    type_averages = (await session.execute(_type_averages_query().where(key_filter))).all()
+    rows = _final_grade_rows(type_averages, await load_weights(session))
+    await _upsert_final_grades(session, rows)
+
+    written = {tuple(row[k] for k in FINAL_GRADE_KEY) for row in rows}
+    stale = [key for key in keys if key not in written]
+    if stale:
+        key_columns = [FinalGrade.__table__.c[k] for k in FINAL_GRADE_KEY]
+        await session.execute(delete(FinalGrade).where(tuple_(*key_columns).in_(stale)))
+    return len(rows)
+
+
+async def recompute_subject_final_grades(session: AsyncSession, subject_id: Optional[int]) -> int:
+    """
+    Recompute every final grade a weight of ``subject_id`` applies to
+    (all subjects for a subject-less weight). Caller commits.
+    """
+    type_averages_query = _type_averages_query()
+    stale_query = delete(FinalGrade)
+    if subject_id is not None:
+        type_averages_query = type_averages_query.where(AssessmentEvent.subject_id == subject_id)
+        stale_query = stale_query.where(FinalGrade.subject_id == subject_id)
+
+    type_averages = (await session.execute(type_averages_query)).all()
+    rows = _final_grade_rows(type_averages, await load_weights(session))
+    await session.execute(stale_query)
+    await _upsert_final_grades(session, rows)
+    return len(rows)
+
+
+async def rebuild_final_grades(session: AsyncSession) -> int:
+    """
+    Recompute the whole final grades table from raw grade rows.
+    Returns the number of rows written. Caller commits.
+    """
+    return await recompute_subject_final_grades(session, None)
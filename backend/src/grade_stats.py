@@ -0,0 +1,270 @@
+"""
+Incrementally maintained per-student grade aggregates.
+
+Every grade write reports its (old, new) state through ``record_grade_changes``
+in the same transaction. Count, sum and sum of squares are adjusted with
+signed deltas on ``student_subject_grade_stats``; min and max only ever widen
+on insert, and are recomputed from raw grades for the rows that lost their
+current minimum or maximum. Analytics then read one row per student, subject
+and semester instead of every grade. The weighted final grades of the touched
+keys are recomputed at the same time (see src/final_grades.py).
+
+``rebuild_grade_stats`` backfills the table from raw rows and
+``check_grade_stats`` reports any drift between the two.
+"""
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select, delete, insert, update, func, case, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import dialect_insert
+from src.final_grades import recompute_final_grades
+from src.models.assessment_events import AssessmentEvent
+from src.models.grades import Grade, StudentSubjectGradeStats
+from src.models.students import Student
+
+
+Period = Tuple[int, str, int]  # (subject_id, academic_year, semester) of an assessment event
+StatsKey = Tuple[int, int, str, int]  # (student_id, subject_id, academic_year, semester)
+
+STATS_KEY = ["student_id", "subject_id", "academic_year", "semester"]
+
+
+class GradeFact(NamedTuple):
+    """The part of a grade row that contributes to the aggregates."""
+    student_id: int
+    assessment_event_id: int
+    score: Optional[float]
+
+    @classmethod
+    def of(cls, grade: Grade) -> "GradeFact":
+        return cls(
+            student_id=grade.student_id,
+            assessment_event_id=grade.assessment_event_id,
+            score=grade.score,
+        )
+
+
+GradeChange = Tuple[Optional[GradeFact], Optional[GradeFact]]  # (before, after)
+
+
+def event_period(event: AssessmentEvent) -> Period:
+    return (event.subject_id, event.academic_year, event.semester)
+
+
+async def record_grade_changes(
+    session: AsyncSession,
+    changes: Iterable[GradeChange],
+    period_by_event: Optional[Dict[int, Period]] = None,
+) -> None:
+    """
+    Apply grade changes to the aggregates table.
+
+    Each change is a (before, after) pair: (None, fact) for a new grade,
+    (fact, None) for a deleted one and (old, new) for an update. Callers that
+    already loaded the assessment events can pass their periods to save the
+    lookup query.
+    Must be called after the grade rows themselves were written (or flushed)
+    and before the surrounding transaction is committed.
+    """
+    changes = [(old, new) for old, new in changes if old != new]
+    if not changes:
+        return
+
+    if period_by_event is None:
+        event_ids = {f.assessment_event_id for change in changes for f in change if f is not None}
+        events_result = await session.execute(
+            select(
+                AssessmentEvent.id, AssessmentEvent.subject_id,
+                AssessmentEvent.academic_year, AssessmentEvent.semester,
+            ).where(AssessmentEvent.id.in_(event_ids))
+        )
+        period_by_event = {r.id: (r.subject_id, r.academic_year, r.semester) for r in events_result.all()}
+
+    def key_of(fact: Optional[GradeFact]) -> Optional[StatsKey]:
+        if fact is None or fact.score is None:
+            return None
+        period = period_by_event.get(fact.assessment_event_id)
+        if period is None:
+            return None
+        return (fact.student_id, *period)
+
+    added: Dict[StatsKey, List[float]] = defaultdict(list)
+    removed: Dict[StatsKey, List[float]] = defaultdict(list)
+    for old, new in changes:
+        if (key := key_of(old)) is not None:
+            removed[key].append(old.score)
+        if (key := key_of(new)) is not None:
+            added[key].append(new.score)
+
+    keys = added.keys() | removed.keys()
+    if not keys:
+        return
+
+    # Rows losing their current min or max need those two recomputed
+    stale_extremes = set()
+    if removed:
+        key_columns = [StudentSubjectGradeStats.__table__.c[k] for k in STATS_KEY]
+        stored_result = await session.execute(
+            select(
+                *key_columns, StudentSubjectGradeStats.min_score, StudentSubjectGradeStats.max_score,
+            ).where(tuple_(*key_columns).in_(list(removed)))
+        )
+        for r in stored_result.all():
+            key = (r.student_id, r.subject_id, r.academic_year, r.semester)
+            values = removed[key]
+            if (r.min_score is not None and min(values) <= r.min_score) or (
+                r.max_score is not None and max(values) >= r.max_score
+            ):
+                stale_extremes.add(key)
+
+    rows = []
+    for key in keys:
+        plus, minus = added.get(key, []), removed.get(key, [])
+        rows.append({
+            **dict(zip(STATS_KEY, key)),
+            "count": len(plus) - len(minus),
+            "score_sum": math.fsum(plus) - math.fsum(minus),
+            "score_sum_sq": math.fsum(v * v for v in plus) - math.fsum(v * v for v in minus),
+            "min_score": min(plus) if plus else None,
+            "max_score": max(plus) if plus else None,
+        })
+
+    stats = StudentSubjectGradeStats
+    stmt = dialect_insert(session, stats).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=STATS_KEY,
+        set_={
+            "count": stats.count + stmt.excluded.count,
+            "score_sum": stats.score_sum + stmt.excluded.score_sum,
+            "score_sum_sq": stats.score_sum_sq + stmt.excluded.score_sum_sq,
+            "min_score": case(
+                (stats.min_score.is_(None), stmt.excluded.min_score),
+                (stmt.excluded.min_score < stats.min_score, stmt.excluded.min_score),
+                else_=stats.min_score,
+            ),
+            "max_score": case(
+                (stats.max_score.is_(None), stmt.excluded.max_score),
+                (stmt.excluded.max_score > stats.max_score, stmt.excluded.max_score),
+                else_=stats.max_score,
+            ),
+        },
+    )
+    await session.execute(stmt)
+
+    if any(row["count"] < 0 for row in rows):
+        await session.execute(
+            delete(stats).where(
+                stats.student_id.in_({key[0] for key in keys}),
+                stats.count <= 0,
+            )
+        )
+
+    if stale_extremes:
+        await _recompute_extremes(session, stale_extremes)
+
+    await recompute_final_grades(session, keys)
+
+
+async def _recompute_extremes(session: AsyncSession, keys: Iterable[StatsKey]) -> None:
+    """Reset min/max of the given rows from raw grades."""
+    keys = list(keys)
+    extremes_query = _raw_stats_query().where(
+        tuple_(Grade.student_id, AssessmentEvent.subject_id,
+               AssessmentEvent.academic_year, AssessmentEvent.semester).in_(keys)
+    )
+    extremes = {
+        (r.student_id, r.subject_id, r.academic_year, r.semester): (r.min_score, r.max_score)
+        for r in (await session.execute(extremes_query)).all()
+    }
+    params = [
+        {**dict(zip(STATS_KEY, key)), "min_score": extremes[key][0], "max_score": extremes[key][1]}
+        for key in keys
+        if key in extremes
+    ]
+    if params:
+        await session.execute(update(StudentSubjectGradeStats), params)
+
+
+def _raw_stats_query():
+    """Aggregate raw grade rows into the stats shape."""
+    return select(
+        Grade.student_id,
+        AssessmentEvent.subject_id,
+        AssessmentEvent.academic_year,
+        AssessmentEvent.semester,
+        func.count(Grade.id).label("count"),
+        func.sum(Grade.score).label("score_sum"),
+        func.sum(Grade.score * Grade.score).label("score_sum_sq"),
+        func.min(Grade.score).label("min_score"),
+        func.max(Grade.score).label("max_score"),
+    ).join(
+        AssessmentEvent, Grade.assessment_event_id == AssessmentEvent.id
+    ).join(
+        Student, Grade.student_id == Student.id
+    ).where(
+        Grade.score.isnot(None)
+    ).group_by(
+        Grade.student_id, AssessmentEvent.subject_id, AssessmentEvent.academic_year, AssessmentEvent.semester
+    )
+
+
+async def rebuild_grade_stats(session: AsyncSession) -> int:
+    """
+    Recompute the whole aggregates table from raw grade rows.
+    Returns the number of rows written. Caller commits.
+    """
+    await session.execute(delete(StudentSubjectGradeStats))
+    await session.execute(
+        insert(StudentSubjectGradeStats).from_select(
+            [*STATS_KEY, "count", "score_sum", "score_sum_sq", "min_score", "max_score"],
+            _raw_stats_query(),
+        )
+    )
+    result = await session.execute(select(func.count()).select_from(StudentSubjectGradeStats))
+    return result.scalar() or 0
+
+
+def _close(a: Optional[float], b: Optional[float]) -> bool:
+    if a is None or b is None:
+        return a is b
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+
+
+async def check_grade_stats(session: AsyncSession) -> List[dict]:
+    """
+    Compare the aggregates table against raw grade rows.
+    Returns one entry per mismatching key (empty list when consistent).
+    """
+    fields = ("count", "score_sum", "score_sum_sq", "min_score", "max_score")
+    empty = dict.fromkeys(fields)
+    raw_result = await session.execute(_raw_stats_query())
+    expected = {
+        (r.student_id, r.subject_id, r.academic_year, r.semester): {f: r._mapping[f] for f in fields}
+        for r in raw_result.all()
+    }
+
+    stats_result = await session.execute(
+        select(StudentSubjectGradeStats).where(StudentSubjectGradeStats.count != 0)
+    )
+    actual = {
+        (s.student_id, s.subject_id, s.academic_year, s.semester): {f: getattr(s, f) for f in fields}
+        for s in stats_result.scalars().all()
+    }
+
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys()):
+        want, got = expected.get(key, empty), actual.get(key, empty)
+        if not all(_close(want[f], got[f]) for f in fields):
+            student_id, subject_id, academic_year, semester = key
+            mismatches.append({
+                "student_id": student_id,
+                "subject_id": subject_id,
+                "academic_year": academic_year,
+                "semester": semester,
+                "expected": want,
+                "actual": got,
+            })
+    return mismatches
@@ -0,0 +1,107 @@
+"""
+Set-based grade writes.
+
+``upsert_grades`` saves a whole sheet of grades for one assessment event with
+a fixed number of statements regardless of its size: one query validates the
+students, one fetches the grades already entered for them, and a single
+INSERT ... ON CONFLICT (student_id, assessment_event_id) DO UPDATE writes
+every new or changed grade. The per-student aggregates are adjusted in the
+same transaction (see src/grade_stats.py).
+"""
+from typing import Dict, Iterable, NamedTuple
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import dialect_insert
+from src.grade_stats import GradeFact, record_grade_changes
+from src.models.grades import Grade
+from src.models.students import Student
+from src.schemas.grades import BulkGradeInput
+
+
+GRADE_KEY = ["student_id", "assessment_event_id"]
+
+
+class GradeUpsertResult(NamedTuple):
+    created: int
+    updated: int
+    skipped: int
+
+
+async def upsert_grades(
+    session: AsyncSession,
+    assessment_event_id: int,
+    grades: Iterable[BulkGradeInput],
+) -> GradeUpsertResult:
+    """
+    Create or update grades for one assessment event. Does not commit.
+
+    A later entry for the same student overrides an earlier one. Fields left
+    empty keep their stored value; entries for unknown students, empty
+    entries for students without a grade and entries that change nothing are
+    skipped.
+    """
+    inputs: Dict[int, BulkGradeInput] = {}
+    submitted = 0
+    for grade_input in grades:
+        inputs[grade_input.student_id] = grade_input
+        submitted += 1
+    if not inputs:
+        return GradeUpsertResult(0, 0, 0)
+
+    students_result = await session.execute(
+        select(Student.id).where(Student.id.in_(list(inputs)))
+    )
+    known_students = set(students_result.scalars().all())
+
+    existing_result = await session.execute(
+        select(Grade.student_id, Grade.score, Grade.comment).where(
+            Grade.assessment_event_id == assessment_event_id,
+            Grade.student_id.in_(known_students),
+        )
+    )
+    existing = {r.student_id: r for r in existing_result.all()}
+
+    rows = []
+    changes = []
+    for student_id, grade_input in inputs.items():
+        if student_id not in known_students:
+            continue
+        current = existing.get(student_id)
+        if current is None:
+            if grade_input.score is None and not grade_input.comment:
+                continue
+            score, comment = grade_input.score, grade_input.comment
+        else:
+            score = grade_input.score if grade_input.score is not None else current.score
+            comment = grade_input.comment if grade_input.comment is not None else current.comment
+            if score == current.score and comment == current.comment:
+                continue
+        rows.append({
+            "student_id": student_id,
+            "assessment_event_id": assessment_event_id,
+            "score": score,
+            "comment": comment,
+        })
+        changes.append((
+            GradeFact(student_id, assessment_event_id, current.score) if current is not None else None,
+            GradeFact(student_id, assessment_event_id, score),
+        ))
+
+    if rows:
+        stmt = dialect_insert(session, Grade).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=GRADE_KEY,
+            set_={
+                "score": stmt.excluded.score,
+                "comment": stmt.excluded.comment,
+                "updated_at": func.now(),
+            },
+        )
+        await session.execute(stmt)
+        await record_grade_changes(session, changes)
+
+    updated = sum(1 for row in rows if row["student_id"] in existing)
+    created = len(rows) - updated
+    return GradeUpsertResult(created, updated, submitted - len(rows))
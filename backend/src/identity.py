@@ -0,0 +1,75 @@
+"""
+Resolved identities of authenticated users.
+
+Every authenticated request needs the user row and, for most handlers, the
+student or teacher profile behind it. ``resolve_identity`` loads both in one
+query and keeps the result in a small LRU cache keyed by user id, so repeated
+requests with the same token skip the database entirely.
+
+Entries depend on the users, students and teachers tables: deactivating a
+user, changing their role or password, or editing a profile commits a write
+to one of them and drops the cached identities of this process at once.
+Other workers notice after IDENTITY_CACHE_TTL_SECONDS, which is kept short
+for that reason.
+"""
+import os
+from typing import NamedTuple, Optional
+
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from src.cache import VersionedCache, table_versions
+from src.models.students import Student
+from src.models.teachers import Teacher
+from src.models.users import User, UserRole
+
+
+IDENTITY_TABLES = (User.__tablename__, Student.__tablename__, Teacher.__tablename__)
+
+identity_cache = VersionedCache(
+    max_entries=int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES", "4096")),
+    ttl_seconds=float(os.getenv("IDENTITY_CACHE_TTL_SECONDS", "30")),
+)
+
+
+class Identity(NamedTuple):
+    """The current user with the ids of their profile, resolved once per request."""
+    user: User
+    student_id: Optional[int]
+    teacher_id: Optional[int]
+    group_id: Optional[int]  # Group of the student profile
+
+    @property
+    def role(self) -> UserRole:
+        return self.user.role
+
+
+def _detached_copy(user: User) -> User:
+    """A session-free copy of ``user`` that can be shared between requests."""
+    copy = User(**{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+async def resolve_identity(session: AsyncSession, user_id: int) -> Optional[Identity]:
+    """The identity of ``user_id`` with its user attached to ``session``, or None."""
+    found, cached = identity_cache.get(user_id)
+    if found:
+        # Attach a copy of the cached row without querying it again
+        return cached._replace(user=await session.merge(cached.user, load=False))
+
+    versions = table_versions(IDENTITY_TABLES)
+    result = await session.execute(
+        select(User, Student.id, Teacher.id, Student.group_id)
+        .outerjoin(Student, Student.user_id == User.id)
+        .outerjoin(Teacher, Teacher.user_id == User.id)
+        .where(User.id == user_id)
+    )
+    row = result.first()
+    if row is None:
+        return None
+
+    identity = Identity(*row)
+    identity_cache.set(user_id, identity._replace(user=_detached_copy(identity.user)), IDENTITY_TABLES, versions)
+    return identity
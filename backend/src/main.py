@@ -15,6 +15,8 @@ from pydantic import ValidationError as PydanticValidationError
 from fastapi import HTTPException
 from src.api.router import main_router
 from src.exceptions import APIError, RateLimitError
+from src.risk import risk_job
+from src.thumbnails import thumbnail_pipeline
 from src.schemas.errors import ErrorResponse
 
 logger = logging.getLogger("uvicorn.error")
@@ -105,6 +107,19 @@ app = FastAPI(
 app.state.limiter = limiter
 
 
+@app.on_event("startup")
+async def start_background_jobs():
+    """Start in-process background jobs."""
+    risk_job.start()
+    thumbnail_pipeline.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    await risk_job.stop()
+    await thumbnail_pipeline.stop()
+
+
 # ==================== Exception Handlers ====================
 
 @app.exception_handler(APIError)
@@ -294,26 +309,45 @@ app.include_router(main_router)
 
 # Serve uploaded files at /media (as a regular route so CORS middleware applies)
 import os as _os
+from datetime import datetime as _datetime, timezone as _timezone
 from pathlib import Path as _Path
-from fastapi.responses import FileResponse
+from fastapi import Request as _Request
+from src.file_responses import file_response
+from src.storage import read_file_chunks
 
 _uploads_dir = _Path(_os.getenv("LOCAL_STORAGE_PATH", "uploads")).resolve()
 _uploads_dir.mkdir(parents=True, exist_ok=True)
 
 
 @app.get("/media/{file_path:path}")
-async def serve_media(file_path: str):
-    """Serve uploaded media files with CORS support."""
+async def serve_media(file_path: str, request: _Request):
+    """Serve uploaded media files with CORS, Range and conditional request support."""
     full_path = (_uploads_dir / file_path).resolve()
     # Security: ensure the path is within uploads directory
     if not str(full_path).startswith(str(_uploads_dir)):
         raise HTTPException(status_code=403, detail="Access denied")
     if not full_path.exists() or not full_path.is_file():
         raise HTTPException(status_code=404, detail="File not found")
+    # Uploads in progress are spooled under .staging
+    if any(part.startswith(".") for part in full_path.relative_to(_uploads_dir).parts):
+        raise HTTPException(status_code=404, detail="File not found")
     
     import mimetypes
     content_type, _ = mimetypes.guess_type(str(full_path))
-    return FileResponse(full_path, media_type=content_type or "application/octet-stream")
+    stat = full_path.stat()
+    
+    async def open_range(offset: int, length):
+        return read_file_chunks(open(full_path, "rb"), offset, length)
+    
+    return await file_response(
+        request,
+        size=stat.st_size,
+        etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+        last_modified=_datetime.fromtimestamp(stat.st_mtime, _timezone.utc),
+        content_type=content_type or "application/octet-stream",
+        open_range=open_range,
+        private=False,
+    )
 
 
 @app.get("/")
@@ -5,15 +5,17 @@ from src.models.groups import Group
 from src.models.subjects import Subject
 from src.models.students import Student
 from src.models.teachers import Teacher
-from src.models.schedule import Schedule
-from src.models.attendance import Attendance
-from src.models.grades import Grade
+from src.models.schedule import Schedule, ScheduleRecurrence, ScheduleRecurrenceException
+from src.models.attendance import Attendance, AttendanceDailyRollup
+from src.models.grades import Grade, StudentSubjectGradeStats
 from src.models.assignments import Assignment
 from src.models.disciplinary import DisciplinaryRecord
-from src.models.attachments import Attachment, AttachmentType, AttachmentEntity
+from src.models.attachments import Attachment, AttachmentType, AttachmentEntity, StorageBlob
 from src.models.assessment_events import AssessmentEvent, AssessmentEventType
 from src.models.canvas import Canvas, CanvasEngineType
 from src.models.gamification import MapBoard, TopographicSymbol, SymbolRenderType
+from src.models.risk import StudentRiskFlag, RiskFlagType
+from src.models.final_grades import GradeWeight, FinalGrade
 
 __all__ = [
     "Base",
@@ -24,13 +26,18 @@ __all__ = [
     "Student",
     "Teacher",
     "Schedule",
+    "ScheduleRecurrence",
+    "ScheduleRecurrenceException",
     "Attendance",
+    "AttendanceDailyRollup",
     "Grade",
+    "StudentSubjectGradeStats",
     "Assignment",
     "DisciplinaryRecord",
     "Attachment",
     "AttachmentType",
     "AttachmentEntity",
+    "StorageBlob",
     "AssessmentEvent",
     "AssessmentEventType",
     "Canvas",
@@ -38,6 +45,10 @@ __all__ = [
     "MapBoard",
     "TopographicSymbol",
     "SymbolRenderType",
+    "StudentRiskFlag",
+    "RiskFlagType",
+    "GradeWeight",
+    "FinalGrade",
 ]
 
 
@@ -4,7 +4,7 @@ Supports attachments for schedules/lessons, assignments, and other entities.
 """
 from datetime import datetime
 from enum import Enum as PyEnum
-from sqlalchemy import String, Integer, DateTime, ForeignKey, Text, Enum, func, BigInteger
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Text, Enum, func, BigInteger, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import Optional, TYPE_CHECKING
 
@@ -40,6 +40,47 @@ class AttachmentEntity(str, PyEnum):
     # GROUP = "group"           # Group materials
 
 
+class StorageBlob(Base):
+    """
+    A stored file identified by its content.
+    
+    Identical uploads share one blob (and one copy in storage); attachments
+    point to it through blob_id and ref_count tracks how many do. The file
+    is deleted when the last reference is released.
+    """
+    __tablename__ = "storage_blobs"
+    __table_args__ = (
+        UniqueConstraint("sha256", "storage_backend", name="uq_storage_blobs_sha256_backend"),
+    )
+    
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    sha256: Mapped[str] = mapped_column(
+        String(64),
+        comment="SHA-256 of the content"
+    )
+    storage_backend: Mapped[str] = mapped_column(
+        String(20),
+        comment="Storage backend: 'local' or 's3'"
+    )
+    storage_key: Mapped[str] = mapped_column(
+        String(500),
+        comment="Content-addressed key in storage system"
+    )
+    size: Mapped[int] = mapped_column(
+        BigInteger,
+        comment="File size in bytes"
+    )
+    ref_count: Mapped[int] = mapped_column(
+        Integer,
+        default=1,
+        comment="Number of attachments referencing this blob"
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        server_default=func.now()
+    )
+
+
 class Attachment(Base):
     """
     File attachment model.
@@ -72,9 +113,14 @@ class Attachment(Base):
     )
     storage_key: Mapped[str] = mapped_column(
         String(500),
-        unique=True,
         index=True,
-        comment="Unique key/path in storage system"
+        comment="Key/path in storage system (shared by attachments of the same blob)"
+    )
+    blob_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("storage_blobs.id"),
+        nullable=True,
+        index=True,
+        comment="Content-addressed blob; NULL for files stored before deduplication"
     )
     content_type: Mapped[str] = mapped_column(
         String(100),
@@ -114,6 +160,23 @@ class Attachment(Base):
         nullable=True,
         comment="Public URL for the attachment"
     )
+    
+    # Generated image variants (see src/thumbnails.py)
+    variant: Mapped[Optional[str]] = mapped_column(
+        String(20),
+        nullable=True,
+        comment="'thumbnail' or 'webp' for generated variants, NULL for uploads"
+    )
+    thumbnail_attachment_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("attachments.id"),
+        nullable=True,
+        comment="Generated thumbnail of an image"
+    )
+    webp_attachment_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("attachments.id"),
+        nullable=True,
+        comment="Generated full-size WebP version of an image"
+    )
     description: Mapped[Optional[str]] = mapped_column(
         Text,
         nullable=True,
@@ -1,6 +1,6 @@
 from datetime import datetime, date
 from enum import Enum as PyEnum
-from sqlalchemy import String, DateTime, Date, ForeignKey, Enum, Text, func
+from sqlalchemy import String, Integer, DateTime, Date, ForeignKey, Enum, Text, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import Optional, TYPE_CHECKING
 
@@ -24,6 +24,10 @@ class Attendance(Base):
     Attendance record for tracking student presence at classes.
     """
     __tablename__ = "attendances"
+    __table_args__ = (
+        # One mark per student per lesson; target of the bulk upserts
+        Index("uq_attendances_student_schedule_date", "student_id", "schedule_id", "date", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     student_id: Mapped[int] = mapped_column(ForeignKey("students.id"))
@@ -44,9 +48,20 @@ class Attendance(Base):
         return f"<Attendance(student_id={self.student_id}, date={self.date}, status={self.status})>"
 
 
+class AttendanceDailyRollup(Base):
+    """
+    Daily attendance counts per group, subject and status.
+    Kept up to date by the attendance endpoints (see src/rollups.py),
+    so analytics can read pre-aggregated rows instead of scanning attendances.
+    """
+    __tablename__ = "attendance_daily_rollups"
 
+    date: Mapped[date] = mapped_column(Date, primary_key=True)
+    group_id: Mapped[int] = mapped_column(ForeignKey("groups.id"), primary_key=True)  # Student's current group
+    subject_id: Mapped[int] = mapped_column(ForeignKey("subjects.id"), primary_key=True)  # Schedule subject
+    status: Mapped[AttendanceStatus] = mapped_column(Enum(AttendanceStatus), primary_key=True)
 
+    count: Mapped[int] = mapped_column(Integer, default=0)
 
-
-
-
+    def __repr__(self):
+        return f"<AttendanceDailyRollup(date={self.date}, group_id={self.group_id}, subject_id={self.subject_id}, status={self.status}, count={self.count})>"
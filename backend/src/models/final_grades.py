@@ -0,0 +1,68 @@
+from datetime import datetime
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Float, Enum, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+from typing import Optional
+
+from src.database import Base
+from src.models.assessment_events import AssessmentEventType
+
+
+class GradeWeight(Base):
+    """
+    Weight of an assessment event type in the final semester grade.
+    A row without subject applies to every subject that has no row of its own.
+    """
+    __tablename__ = "grade_weights"
+    __table_args__ = (
+        UniqueConstraint("event_type", "subject_id", name="uq_grade_weights_event_type_subject"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    event_type: Mapped[AssessmentEventType] = mapped_column(Enum(AssessmentEventType))
+    subject_id: Mapped[Optional[int]] = mapped_column(ForeignKey("subjects.id", ondelete="CASCADE"), nullable=True)
+    weight: Mapped[float] = mapped_column(Float)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<GradeWeight(event_type={self.event_type}, subject_id={self.subject_id}, weight={self.weight})>"
+
+
+class FinalGrade(Base):
+    """
+    Weighted final grade per student, subject and semester.
+    Recomputed for the affected students on every grade write (see src/final_grades.py).
+    """
+    __tablename__ = "final_grades"
+
+    student_id: Mapped[int] = mapped_column(ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    subject_id: Mapped[int] = mapped_column(ForeignKey("subjects.id"), primary_key=True)
+    academic_year: Mapped[str] = mapped_column(String(9), primary_key=True)
+    semester: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    score: Mapped[float] = mapped_column(Float)  # 0-100 scale
+    grades_count: Mapped[int] = mapped_column(Integer)
+    weight_total: Mapped[float] = mapped_column(Float)  # Sum of the weights of the event types graded so far
+
+    computed_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    @property
+    def letter_grade(self) -> str:
+        """Convert to letter grade (Kazakh system)."""
+        if self.score >= 90:
+            return "A"
+        elif self.score >= 80:
+            return "B"
+        elif self.score >= 70:
+            return "C"
+        elif self.score >= 60:
+            return "D"
+        else:
+            return "F"
+
+    def __repr__(self):
+        return (
+            f"<FinalGrade(student_id={self.student_id}, subject_id={self.subject_id}, "
+            f"academic_year={self.academic_year}, semester={self.semester}, score={self.score})>"
+        )
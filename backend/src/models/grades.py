@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Integer, DateTime, ForeignKey, Float, Text, func
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Float, Text, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import Optional, TYPE_CHECKING
 
@@ -16,6 +16,9 @@ class Grade(Base):
     Uses 100-point scale (0-100).
     """
     __tablename__ = "grades"
+    __table_args__ = (
+        Index("uq_grades_student_event", "student_id", "assessment_event_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     student_id: Mapped[int] = mapped_column(ForeignKey("students.id"))
@@ -51,9 +54,28 @@ class Grade(Base):
         return f"<Grade(student_id={self.student_id}, event_id={self.assessment_event_id}, score={self.score})>"
 
 
+class StudentSubjectGradeStats(Base):
+    """
+    Running grade aggregates per student, subject and semester.
+    Kept up to date by every grade write (see src/grade_stats.py), so averages
+    are read from one row per student and subject instead of scanning grades.
+    Only graded entries (score is not null) are counted.
+    """
+    __tablename__ = "student_subject_grade_stats"
 
+    student_id: Mapped[int] = mapped_column(ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    subject_id: Mapped[int] = mapped_column(ForeignKey("subjects.id"), primary_key=True)
+    academic_year: Mapped[str] = mapped_column(String(9), primary_key=True)
+    semester: Mapped[int] = mapped_column(Integer, primary_key=True)
 
+    count: Mapped[int] = mapped_column(Integer, default=0)
+    score_sum: Mapped[float] = mapped_column(Float, default=0)
+    score_sum_sq: Mapped[float] = mapped_column(Float, default=0)
+    min_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    max_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
 
-
-
-
+    def __repr__(self):
+        return (
+            f"<StudentSubjectGradeStats(student_id={self.student_id}, subject_id={self.subject_id}, "
+            f"academic_year={self.academic_year}, semester={self.semester}, count={self.count})>"
+        )
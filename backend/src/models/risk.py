@@ -0,0 +1,38 @@
+from datetime import datetime
+from enum import Enum as PyEnum
+from sqlalchemy import DateTime, Enum, Float, ForeignKey, Text, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+from typing import Optional
+
+from src.database import Base
+
+
+class RiskFlagType(str, PyEnum):
+    """Reasons a cadet is considered at risk."""
+    LOW_ATTENDANCE = "low_attendance"  # Низкая посещаемость
+    FALLING_GRADES = "falling_grades"  # Снижение успеваемости
+    DISCIPLINARY = "disciplinary"  # Повторные дисциплинарные нарушения
+
+
+class StudentRiskFlag(Base):
+    """
+    At-risk flags computed by the background risk job (see src/risk.py).
+    One row per student and flag type; rows are replaced on re-evaluation.
+    """
+    __tablename__ = "student_risk_flags"
+    __table_args__ = (
+        UniqueConstraint("student_id", "flag", name="uq_student_risk_flags_student_flag"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    student_id: Mapped[int] = mapped_column(ForeignKey("students.id", ondelete="CASCADE"), index=True)
+    flag: Mapped[RiskFlagType] = mapped_column(Enum(RiskFlagType), index=True)
+
+    value: Mapped[float] = mapped_column(Float)  # Measured value (rate, drop, count)
+    threshold: Mapped[float] = mapped_column(Float)
+    details: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    detected_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<StudentRiskFlag(student_id={self.student_id}, flag={self.flag})>"
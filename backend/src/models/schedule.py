@@ -1,6 +1,6 @@
 from datetime import datetime, date, time
 from enum import Enum as PyEnum
-from sqlalchemy import String, Integer, DateTime, Date, Time, ForeignKey, Enum, func
+from sqlalchemy import String, Integer, DateTime, Date, Time, ForeignKey, Enum, Index, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import List, Optional, TYPE_CHECKING
 
@@ -22,20 +22,32 @@ class DayOfWeek(str, PyEnum):
     FRIDAY = "friday"
     SATURDAY = "saturday"
 
+    @property
+    def weekday(self) -> int:
+        """Day number as in ``date.weekday()`` (Monday is 0)."""
+        return list(DayOfWeek).index(self)
+
 
 class Schedule(Base):
     """
     Class schedule - links groups, subjects, teachers with time slots.
-    All schedules are date-specific (no recurring templates).
+    Rows are date-specific; weekly lessons are kept as ScheduleRecurrence rules
+    and get a row of their own (with ``recurrence_id`` set) only once
+    attendance is marked for one of their occurrences.
     """
     __tablename__ = "schedules"
+    __table_args__ = (
+        # One materialized row per occurrence of a recurrence
+        Index("uq_schedules_recurrence_date", "recurrence_id", "specific_date", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     group_id: Mapped[int] = mapped_column(ForeignKey("groups.id"))
     subject_id: Mapped[int] = mapped_column(ForeignKey("subjects.id"))
     teacher_id: Mapped[int] = mapped_column(ForeignKey("teachers.id"))
 
-    # Schedule details - specific date only (no templates)
+    # Schedule details - one specific date; occurrences of a ScheduleRecurrence
+    # get a row here only once materialized (see recurrence_id)
     specific_date: Mapped[date] = mapped_column(Date, index=True)
     
     start_time: Mapped[time] = mapped_column(Time)
@@ -46,6 +58,11 @@ class Schedule(Base):
     semester: Mapped[int] = mapped_column(Integer)  # 1 or 2
     academic_year: Mapped[str] = mapped_column(String(9))  # e.g., "2024-2025"
 
+    # Recurrence this row was materialized from, if any
+    recurrence_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("schedule_recurrences.id", ondelete="SET NULL"), nullable=True
+    )
+
     is_active: Mapped[bool] = mapped_column(default=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
@@ -59,9 +76,64 @@ class Schedule(Base):
         return f"<Schedule(id={self.id}, date={self.specific_date}, time={self.start_time}-{self.end_time})>"
 
 
+class ScheduleRecurrence(Base):
+    """
+    Weekly lesson template: the same slot every ``interval_weeks`` weeks
+    from ``start_date`` to ``end_date``. Occurrences are expanded on read
+    (see src/scheduling.py); cancelled dates are ScheduleRecurrenceException rows.
+    """
+    __tablename__ = "schedule_recurrences"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    group_id: Mapped[int] = mapped_column(ForeignKey("groups.id"), index=True)
+    subject_id: Mapped[int] = mapped_column(ForeignKey("subjects.id"))
+    teacher_id: Mapped[int] = mapped_column(ForeignKey("teachers.id"), index=True)
+
+    day_of_week: Mapped[DayOfWeek] = mapped_column(Enum(DayOfWeek))
+    start_time: Mapped[time] = mapped_column(Time)
+    end_time: Mapped[time] = mapped_column(Time)
+    room: Mapped[str] = mapped_column(String(50))
+
+    start_date: Mapped[date] = mapped_column(Date)
+    end_date: Mapped[date] = mapped_column(Date)
+    interval_weeks: Mapped[int] = mapped_column(Integer, default=1)
+
+    semester: Mapped[int] = mapped_column(Integer)
+    academic_year: Mapped[str] = mapped_column(String(9))
 
+    is_active: Mapped[bool] = mapped_column(default=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
+    # Relationships
+    group: Mapped["Group"] = relationship()
+    subject: Mapped["Subject"] = relationship()
+    teacher: Mapped["Teacher"] = relationship()
+    exceptions: Mapped[List["ScheduleRecurrenceException"]] = relationship(
+        back_populates="recurrence", cascade="all, delete-orphan"
+    )
 
+    def __repr__(self):
+        return (
+            f"<ScheduleRecurrence(id={self.id}, day={self.day_of_week}, "
+            f"time={self.start_time}-{self.end_time}, {self.start_date}..{self.end_date})>"
+        )
 
 
+class ScheduleRecurrenceException(Base):
+    """A date on which a recurring lesson does not take place."""
+    __tablename__ = "schedule_recurrence_exceptions"
+    __table_args__ = (
+        UniqueConstraint("recurrence_id", "date", name="uq_schedule_recurrence_exceptions_recurrence_date"),
+    )
 
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    recurrence_id: Mapped[int] = mapped_column(ForeignKey("schedule_recurrences.id", ondelete="CASCADE"))
+    date: Mapped[date] = mapped_column(Date)
+    reason: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+    recurrence: Mapped["ScheduleRecurrence"] = relationship(back_populates="exceptions")
+
+    def __repr__(self):
+        return f"<ScheduleRecurrenceException(recurrence_id={self.recurrence_id}, date={self.date})>"
@@ -0,0 +1,178 @@
+"""
+Cadet rankings within group, course and department.
+
+A single statement ranks every student by attendance rate and by average
+weighted final grade (see src/final_grades.py) with window functions (one
+partition per cohort). The result is turned into a ``RankingSnapshot``
+holding a per-student index and pre-sorted leaderboards, cached per
+(academic_year, semester) until the underlying tables change, so standing
+lookups and leaderboard pages never re-sort.
+"""
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache import VersionedCache
+from src.models.attendance import Attendance, AttendanceStatus
+from src.models.final_grades import FinalGrade
+from src.models.groups import Group
+from src.models.schedule import Schedule
+from src.models.students import Student
+
+
+SCOPES = ("group", "course", "department")
+METRICS = ("attendance", "score")
+
+RANKING_TABLES = (
+    Attendance.__tablename__, FinalGrade.__tablename__,
+    Schedule.__tablename__, Student.__tablename__, Group.__tablename__,
+)
+
+rankings_cache = VersionedCache(
+    max_entries=int(os.getenv("RANKINGS_CACHE_MAX_ENTRIES", "16")),
+    ttl_seconds=float(os.getenv("RANKINGS_CACHE_TTL_SECONDS", "600")),
+)
+
+
+def rankings_query(academic_year: Optional[str] = None, semester: Optional[int] = None):
+    """
+    Per-student metrics with rank and cohort size for every scope/metric pair.
+    Students without data for a metric are ranked last and reported unranked.
+    """
+    attendance_query = select(
+        Attendance.student_id,
+        (
+            func.count(Attendance.id).filter(
+                Attendance.status.in_([AttendanceStatus.PRESENT, AttendanceStatus.LATE])
+            ) * 100.0 / func.count(Attendance.id)
+        ).label("attendance"),
+    ).join(Schedule, Attendance.schedule_id == Schedule.id)
+    grades_query = select(
+        FinalGrade.student_id,
+        func.avg(FinalGrade.score).label("score"),
+    )
+
+    if academic_year:
+        attendance_query = attendance_query.where(Schedule.academic_year == academic_year)
+        grades_query = grades_query.where(FinalGrade.academic_year == academic_year)
+    if semester:
+        attendance_query = attendance_query.where(Schedule.semester == semester)
+        grades_query = grades_query.where(FinalGrade.semester == semester)
+
+    attendance = attendance_query.group_by(Attendance.student_id).subquery()
+    grades = grades_query.group_by(FinalGrade.student_id).subquery()
+
+    base = select(
+        Student.id.label("student_id"),
+        Student.first_name,
+        Student.last_name,
+        Student.group_id,
+        Group.course,
+        attendance.c.attendance,
+        grades.c.score,
+    ).join(
+        Group, Student.group_id == Group.id
+    ).outerjoin(
+        attendance, attendance.c.student_id == Student.id
+    ).outerjoin(
+        grades, grades.c.student_id == Student.id
+    ).subquery()
+
+    partitions = {"group": base.c.group_id, "course": base.c.course, "department": None}
+    windows = []
+    for metric in METRICS:
+        value = base.c[metric]
+        for scope, partition in partitions.items():
+            windows.append(func.rank().over(
+                partition_by=partition, order_by=value.desc().nulls_last()
+            ).label(f"{scope}_{metric}_rank"))
+            windows.append(func.count(value).over(
+                partition_by=partition
+            ).label(f"{scope}_{metric}_size"))
+
+    return select(base, *windows)
+
+
+def _position(rank: int, size: int) -> Dict[str, Any]:
+    """Rank within a cohort of ``size`` ranked students, with percentile (100 = best)."""
+    percentile = 100.0 if size <= 1 else (size - rank) / (size - 1) * 100
+    return {"rank": rank, "of": size, "percentile": round(percentile, 2)}
+
+
+class RankingSnapshot:
+    """Rankings for one (academic_year, semester), indexed for cheap reads."""
+
+    def __init__(self, rows):
+        self.standings: Dict[int, Dict[str, Any]] = {}
+        self.leaderboards: Dict[Tuple[str, Optional[int], str], List[Dict[str, Any]]] = {}
+
+        for r in rows:
+            values = {"attendance": r.attendance, "score": r.score}
+            scope_ids = {"group": r.group_id, "course": r.course, "department": None}
+            standing = {
+                "student_id": r.student_id,
+                "student_name": f"{r.last_name} {r.first_name}",
+                "group_id": r.group_id,
+                "course": r.course,
+                "attendance_rate": round(float(r.attendance), 2) if r.attendance is not None else None,
+                "average_score": round(float(r.score), 2) if r.score is not None else None,
+            }
+            for scope in SCOPES:
+                cohort = standing[f"{scope}_rank"] = {}
+                for metric in METRICS:
+                    if values[metric] is None:
+                        cohort[metric] = None
+                        continue
+                    position = _position(r._mapping[f"{scope}_{metric}_rank"], r._mapping[f"{scope}_{metric}_size"])
+                    cohort[metric] = position
+                    self.leaderboards.setdefault((scope, scope_ids[scope], metric), []).append({
+                        "student_id": r.student_id,
+                        "student_name": standing["student_name"],
+                        "group_id": r.group_id,
+                        "course": r.course,
+                        "value": round(float(values[metric]), 2),
+                        **position,
+                    })
+            self.standings[r.student_id] = standing
+
+        for entries in self.leaderboards.values():
+            entries.sort(key=lambda e: (e["rank"], e["student_name"]))
+
+    def standing(self, student_id: int) -> Optional[Dict[str, Any]]:
+        return self.standings.get(student_id)
+
+    def leaderboard(
+        self,
+        scope: str,
+        scope_id: Optional[int],
+        metric: str,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Return (total, page) of a pre-sorted leaderboard."""
+        entries = self.leaderboards.get((scope, None if scope == "department" else scope_id, metric), [])
+        return len(entries), entries[offset:offset + limit]
+
+
+async def _build_snapshot(
+    session: AsyncSession,
+    academic_year: Optional[str],
+    semester: Optional[int],
+) -> RankingSnapshot:
+    result = await session.execute(rankings_query(academic_year, semester))
+    return RankingSnapshot(result.all())
+
+
+async def get_rankings(
+    session: AsyncSession,
+    academic_year: Optional[str] = None,
+    semester: Optional[int] = None,
+) -> RankingSnapshot:
+    """Get the cached rankings snapshot for a period, computing it if needed."""
+    return await rankings_cache.get_or_compute(
+        (academic_year, semester),
+        RANKING_TABLES,
+        lambda: _build_snapshot(session, academic_year, semester),
+    )
@@ -0,0 +1,86 @@
+"""
+Cached read models of groups, subjects and teachers.
+
+These tables are small and rarely written, yet almost every list endpoint
+nests them into its response. Instead of a ``selectinload`` per relationship
+and request, the whole tables are kept as read models in a ``VersionedCache``
+and responses are assembled with ``read_with_references``.
+
+Commits that touch one of the tables (the create, update and delete endpoints
+of groups, subjects and teachers) bump its version, which drops the cached
+copy in this process at once; other workers pick the change up after
+REFERENCE_CACHE_TTL_SECONDS.
+"""
+import os
+from typing import Any, Dict, NamedTuple, Optional, Type, TypeVar
+
+from pydantic import BaseModel
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache import VersionedCache
+from src.models.groups import Group
+from src.models.subjects import Subject
+from src.models.teachers import Teacher
+from src.schemas.groups import GroupRead
+from src.schemas.subjects import SubjectRead
+from src.schemas.teachers import TeacherRead
+
+
+ReadModel = TypeVar("ReadModel", bound=BaseModel)
+
+reference_cache = VersionedCache(
+    max_entries=3,
+    ttl_seconds=float(os.getenv("REFERENCE_CACHE_TTL_SECONDS", "300")),
+)
+
+
+class ReferenceData(NamedTuple):
+    groups: Dict[int, GroupRead]
+    subjects: Dict[int, SubjectRead]
+    teachers: Dict[int, TeacherRead]
+
+
+# Nested field -> (foreign key field, ReferenceData attribute)
+REFERENCE_FIELDS = {
+    "group": ("group_id", "groups"),
+    "subject": ("subject_id", "subjects"),
+    "teacher": ("teacher_id", "teachers"),
+}
+
+
+async def _load_table(session: AsyncSession, model, schema: Type[ReadModel]) -> Dict[int, ReadModel]:
+    async def compute() -> Dict[int, ReadModel]:
+        result = await session.execute(select(model))
+        return {row.id: schema.model_validate(row) for row in result.scalars().all()}
+
+    return await reference_cache.get_or_compute(model.__tablename__, (model.__tablename__,), compute)
+
+
+async def load_reference_data(session: AsyncSession) -> ReferenceData:
+    """All groups, subjects and teachers as read models, from the cache when fresh."""
+    return ReferenceData(
+        groups=await _load_table(session, Group, GroupRead),
+        subjects=await _load_table(session, Subject, SubjectRead),
+        teachers=await _load_table(session, Teacher, TeacherRead),
+    )
+
+
+def read_with_references(
+    schema: Type[ReadModel],
+    obj: Any,
+    refs: ReferenceData,
+    **nested: Any,
+) -> ReadModel:
+    """
+    Validate the column values of ORM object ``obj`` into ``schema``, taking
+    its nested group, subject and teacher from ``refs`` instead of loading
+    relationships. Other nested values can be passed as keyword arguments.
+    """
+    data = {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+    for field, (id_field, table) in REFERENCE_FIELDS.items():
+        if field in schema.model_fields and field not in nested:
+            ref_id: Optional[int] = data.get(id_field)
+            data[field] = getattr(refs, table).get(ref_id) if ref_id is not None else None
+    data.update(nested)
+    return schema.model_validate(data, from_attributes=True)
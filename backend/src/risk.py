@@ -0,0 +1,299 @@
+"""
+Background detection of at-risk cadets.
+
+``RiskJob`` runs in the API process as an asyncio task. Each run finds the
+students whose attendance, grade or disciplinary rows changed since the
+previous run (all students on the first run and once per full-run interval,
+because the time-window rules drift even without writes), evaluates the
+rules below in batches and replaces their rows in ``student_risk_flags``.
+Deleted rows leave no ``updated_at`` behind, so a flush listener touches
+``students.updated_at`` of the students whose rows are deleted (or moved to
+another student) in the same transaction; that works whichever worker runs
+the job.
+
+``updated_at`` is stamped before the writing transaction commits (on
+PostgreSQL ``now()`` is the transaction start), so a long write that commits
+after a run started carries an older timestamp than that run. The next
+watermark is therefore moved back to the start of the oldest transaction
+still open on PostgreSQL, and every run looks a further
+RISK_JOB_WATERMARK_OVERLAP_MINUTES back.
+
+Rules (thresholds configurable through RISK_* environment variables):
+- low_attendance: attendance rate over the last window is below a threshold
+- falling_grades: mean of the latest graded events dropped against the
+  preceding ones by at least a number of points
+- disciplinary: repeated disciplinary records within a window
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import select, delete, insert, update, func, union, event, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.database import async_session
+from src.models.assessment_events import AssessmentEvent
+from src.models.attendance import Attendance, AttendanceStatus
+from src.models.disciplinary import DisciplinaryRecord
+from src.models.grades import Grade
+from src.models.risk import RiskFlagType, StudentRiskFlag
+from src.models.students import Student
+
+logger = logging.getLogger("uvicorn.error")
+
+ATTENDANCE_WINDOW_DAYS = int(os.getenv("RISK_ATTENDANCE_WINDOW_DAYS", "30"))
+ATTENDANCE_THRESHOLD = float(os.getenv("RISK_ATTENDANCE_THRESHOLD", "75"))  # percent
+ATTENDANCE_MIN_CLASSES = int(os.getenv("RISK_ATTENDANCE_MIN_CLASSES", "5"))
+GRADE_TREND_EVENTS = int(os.getenv("RISK_GRADE_TREND_EVENTS", "6"))
+GRADE_DROP_THRESHOLD = float(os.getenv("RISK_GRADE_DROP_THRESHOLD", "10"))  # points
+DISCIPLINARY_WINDOW_DAYS = int(os.getenv("RISK_DISCIPLINARY_WINDOW_DAYS", "90"))
+DISCIPLINARY_THRESHOLD = int(os.getenv("RISK_DISCIPLINARY_THRESHOLD", "3"))
+
+BATCH_SIZE = int(os.getenv("RISK_JOB_BATCH_SIZE", "200"))
+INTERVAL_SECONDS = float(os.getenv("RISK_JOB_INTERVAL_SECONDS", "600"))  # 0 disables the job
+FULL_RUN_SECONDS = float(os.getenv("RISK_JOB_FULL_RUN_SECONDS", "86400"))
+
+# Longest write transaction expected to commit after a run started
+WATERMARK_OVERLAP = timedelta(minutes=float(os.getenv("RISK_JOB_WATERMARK_OVERLAP_MINUTES", "5")))
+
+
+async def changed_student_ids(session: AsyncSession, since: datetime) -> Set[int]:
+    """
+    Students with attendance, grade or disciplinary rows written since
+    ``since``, and students created or touched since then.
+    """
+    since = since - WATERMARK_OVERLAP
+    query = union(
+        select(Attendance.student_id).where(Attendance.updated_at >= since),
+        select(Grade.student_id).where(Grade.updated_at >= since),
+        select(DisciplinaryRecord.student_id).where(DisciplinaryRecord.updated_at >= since),
+        select(Student.id).where(Student.updated_at >= since),
+    )
+    result = await session.execute(query)
+    return set(result.scalars().all())
+
+
+async def watermark_now(session: AsyncSession) -> datetime:
+    """
+    Database time no later than the ``updated_at`` of any write that is not
+    yet committed: the start of the oldest open transaction on PostgreSQL.
+    """
+    now = (await session.execute(select(func.now()))).scalar()
+    if session.get_bind().dialect.name == "postgresql":
+        oldest = (await session.execute(text(
+            "SELECT min(xact_start) FROM pg_stat_activity "
+            "WHERE datname = current_database() AND pid <> pg_backend_pid()"
+        ))).scalar()
+        if oldest is not None and oldest < now:
+            now = oldest
+    return now
+
+
+async def evaluate_students(
+    session: AsyncSession,
+    student_ids: List[int],
+    today: Optional[date] = None,
+) -> List[dict]:
+    """
+    Evaluate the risk rules for a batch of students with one grouped query per rule.
+    Returns the flags to store (StudentRiskFlag column values).
+    """
+    today = today or date.today()
+    flags = []
+
+    # Attendance rate over the window
+    attendance_result = await session.execute(
+        select(
+            Attendance.student_id,
+            func.count(Attendance.id).filter(
+                Attendance.status.in_([AttendanceStatus.PRESENT, AttendanceStatus.LATE])
+            ).label("attended"),
+            func.count(Attendance.id).label("total"),
+        ).where(
+            Attendance.student_id.in_(student_ids),
+            Attendance.date >= today - timedelta(days=ATTENDANCE_WINDOW_DAYS),
+        ).group_by(Attendance.student_id)
+    )
+    for r in attendance_result.all():
+        if r.total < ATTENDANCE_MIN_CLASSES:
+            continue
+        rate = r.attended / r.total * 100
+        if rate < ATTENDANCE_THRESHOLD:
+            flags.append({
+                "student_id": r.student_id,
+                "flag": RiskFlagType.LOW_ATTENDANCE,
+                "value": round(rate, 2),
+                "threshold": ATTENDANCE_THRESHOLD,
+                "details": f"Посещаемость {rate:.1f}% за {ATTENDANCE_WINDOW_DAYS} дн. ({r.attended} из {r.total})",
+            })
+
+    # Grade trend over the latest graded events
+    latest = select(
+        Grade.student_id,
+        Grade.score,
+        func.row_number().over(
+            partition_by=Grade.student_id,
+            order_by=(AssessmentEvent.date.desc(), Grade.id.desc()),
+        ).label("position"),
+    ).join(
+        AssessmentEvent, Grade.assessment_event_id == AssessmentEvent.id
+    ).where(
+        Grade.student_id.in_(student_ids),
+        Grade.score.isnot(None),
+    ).subquery()
+    grades_result = await session.execute(
+        select(latest.c.student_id, latest.c.score)
+        .where(latest.c.position <= GRADE_TREND_EVENTS)
+        .order_by(latest.c.student_id, latest.c.position)
+    )
+    recent_scores: Dict[int, List[float]] = defaultdict(list)
+    for student_id, score in grades_result.all():
+        recent_scores[student_id].append(score)  # newest first
+    for student_id, scores in recent_scores.items():
+        if len(scores) < 4:
+            continue
+        half = len(scores) // 2
+        recent = sum(scores[:half]) / half
+        earlier = sum(scores[half:]) / (len(scores) - half)
+        drop = earlier - recent
+        if drop >= GRADE_DROP_THRESHOLD:
+            flags.append({
+                "student_id": student_id,
+                "flag": RiskFlagType.FALLING_GRADES,
+                "value": round(drop, 2),
+                "threshold": GRADE_DROP_THRESHOLD,
+                "details": f"Средний балл снизился с {earlier:.1f} до {recent:.1f}",
+            })
+
+    # Repeated disciplinary records
+    disciplinary_result = await session.execute(
+        select(
+            DisciplinaryRecord.student_id,
+            func.count(DisciplinaryRecord.id).label("count"),
+        ).where(
+            DisciplinaryRecord.student_id.in_(student_ids),
+            DisciplinaryRecord.date >= today - timedelta(days=DISCIPLINARY_WINDOW_DAYS),
+        ).group_by(DisciplinaryRecord.student_id)
+    )
+    for r in disciplinary_result.all():
+        if r.count >= DISCIPLINARY_THRESHOLD:
+            flags.append({
+                "student_id": r.student_id,
+                "flag": RiskFlagType.DISCIPLINARY,
+                "value": r.count,
+                "threshold": DISCIPLINARY_THRESHOLD,
+                "details": f"{r.count} дисциплинарных записей за {DISCIPLINARY_WINDOW_DAYS} дн.",
+            })
+
+    return flags
+
+
+async def store_flags(session: AsyncSession, student_ids: List[int], flags: List[dict]) -> None:
+    """Replace the stored flags of a batch of students. Caller commits."""
+    await session.execute(
+        delete(StudentRiskFlag).where(StudentRiskFlag.student_id.in_(student_ids))
+    )
+    if flags:
+        await session.execute(insert(StudentRiskFlag), flags)
+
+
+def _batches(ids: Iterable[int], size: int):
+    ids = sorted(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+class RiskJob:
+    """Periodic in-process evaluation of at-risk cadets."""
+
+    def __init__(self, interval_seconds: float = INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self.watermark: Optional[datetime] = None
+        self.last_full_run = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def run_once(self, full: bool = False) -> dict:
+        """Evaluate changed students (or everyone). Returns run statistics."""
+        async with self._lock:
+            started = time.monotonic()
+            full = full or self.watermark is None or started - self.last_full_run > FULL_RUN_SECONDS
+
+            async with async_session() as session:
+                # Use the database clock so the watermark matches updated_at values
+                run_started_at = await watermark_now(session)
+                if full:
+                    result = await session.execute(select(Student.id))
+                    student_ids = set(result.scalars().all())
+                else:
+                    student_ids = await changed_student_ids(session, self.watermark)
+
+                flagged = 0
+                for batch in _batches(student_ids, BATCH_SIZE):
+                    flags = await evaluate_students(session, batch)
+                    await store_flags(session, batch, flags)
+                    await session.commit()
+                    flagged += len(flags)
+
+            self.watermark = run_started_at
+            if full:
+                self.last_full_run = started
+            return {
+                "full": full,
+                "evaluated": len(student_ids),
+                "flags": flagged,
+                "duration_ms": round((time.monotonic() - started) * 1000, 1),
+            }
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                stats = await self.run_once()
+                if stats["evaluated"]:
+                    logger.info(f"Risk job: {stats}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error(f"Risk job failed: {exc}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+risk_job = RiskJob()
+
+
+_RISK_TRACKED = (Attendance, Grade, DisciplinaryRecord)
+
+
+@event.listens_for(Session, "after_flush")
+def _touch_students_of_removed_rows(session: Session, flush_context) -> None:
+    student_ids = set()
+    for obj in session.deleted:
+        if isinstance(obj, _RISK_TRACKED):
+            student_ids.add(obj.student_id)
+    for obj in session.dirty:
+        if isinstance(obj, _RISK_TRACKED):
+            # Row moved to another student: the previous one lost it
+            student_ids.update(inspect(obj).attrs.student_id.history.deleted)
+    if student_ids:
+        students = Student.__table__
+        session.connection().execute(
+            update(students).where(students.c.id.in_(student_ids)).values(updated_at=func.now())
+        )
@@ -0,0 +1,250 @@
+"""
+Incrementally maintained attendance rollups.
+
+Every attendance write reports its (old, new) state through
+``record_attendance_changes`` in the same transaction, which turns it into
++/- counts on the ``attendance_daily_rollups`` table. Analytics endpoints then
+read a handful of pre-aggregated rows per day instead of scanning attendances.
+Rows are keyed by the student's current group and the lesson's current
+subject, so transferring a student or changing a lesson's subject moves the
+counts along (``move_student_rollups`` / ``move_schedule_rollups``).
+
+``rebuild_attendance_rollup`` backfills the table from raw rows and
+``check_attendance_rollup`` reports any drift between the two.
+"""
+from collections import Counter
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select, delete, insert, func, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import dialect_insert
+from src.models.attendance import Attendance, AttendanceDailyRollup, AttendanceStatus
+from src.models.schedule import Schedule
+from src.models.students import Student
+
+
+RollupKey = Tuple[date, int, int, AttendanceStatus]  # (date, group_id, subject_id, status)
+
+
+class AttendanceFact(NamedTuple):
+    """The part of an attendance row that contributes to the rollup."""
+    student_id: int
+    schedule_id: int
+    date: date
+    status: AttendanceStatus
+
+    @classmethod
+    def of(cls, attendance: Attendance) -> "AttendanceFact":
+        return cls(
+            student_id=attendance.student_id,
+            schedule_id=attendance.schedule_id,
+            date=attendance.date,
+            status=attendance.status,
+        )
+
+
+AttendanceChange = Tuple[Optional[AttendanceFact], Optional[AttendanceFact]]  # (before, after)
+
+
+async def record_attendance_changes(
+    session: AsyncSession,
+    changes: Iterable[AttendanceChange],
+    group_by_student: Optional[Dict[int, int]] = None,
+    subject_by_schedule: Optional[Dict[int, int]] = None,
+) -> None:
+    """
+    Apply attendance changes to the rollup table.
+
+    Each change is a (before, after) pair: (None, fact) for a new record,
+    (fact, None) for a deleted one and (old, new) for an update.
+    Callers that already know the students' groups or the schedules' subjects
+    can pass them to save the lookup queries.
+    Must be called before the surrounding transaction is committed.
+    """
+    changes = [(old, new) for old, new in changes if old != new]
+    if not changes:
+        return
+
+    facts = [f for change in changes for f in change if f is not None]
+
+    if group_by_student is None:
+        student_ids = {f.student_id for f in facts}
+        groups_result = await session.execute(
+            select(Student.id, Student.group_id).where(Student.id.in_(student_ids))
+        )
+        group_by_student = dict(groups_result.all())
+
+    if subject_by_schedule is None:
+        schedule_ids = {f.schedule_id for f in facts}
+        subjects_result = await session.execute(
+            select(Schedule.id, Schedule.subject_id).where(Schedule.id.in_(schedule_ids))
+        )
+        subject_by_schedule = dict(subjects_result.all())
+
+    def key_of(fact: AttendanceFact) -> Optional[RollupKey]:
+        group_id = group_by_student.get(fact.student_id)
+        subject_id = subject_by_schedule.get(fact.schedule_id)
+        if group_id is None or subject_id is None:
+            return None
+        return (fact.date, group_id, subject_id, fact.status)
+
+    deltas: Counter = Counter()
+    for old, new in changes:
+        if old is not None and (key := key_of(old)) is not None:
+            deltas[key] -= 1
+        if new is not None and (key := key_of(new)) is not None:
+            deltas[key] += 1
+
+    await apply_rollup_deltas(session, deltas)
+
+
+async def move_student_rollups(
+    session: AsyncSession,
+    student_id: int,
+    old_group_id: Optional[int],
+    new_group_id: Optional[int],
+) -> None:
+    """
+    Move a student's counts to another group's rollup rows.
+    Call when ``Student.group_id`` changes, in the same transaction.
+    """
+    if old_group_id == new_group_id:
+        return
+    result = await session.execute(
+        select(Attendance.date, Schedule.subject_id, Attendance.status, func.count(Attendance.id))
+        .join(Schedule, Attendance.schedule_id == Schedule.id)
+        .where(Attendance.student_id == student_id)
+        .group_by(Attendance.date, Schedule.subject_id, Attendance.status)
+    )
+    deltas: Counter = Counter()
+    for day, subject_id, status, count in result.all():
+        if old_group_id is not None:
+            deltas[(day, old_group_id, subject_id, status)] -= count
+        if new_group_id is not None:
+            deltas[(day, new_group_id, subject_id, status)] += count
+    await apply_rollup_deltas(session, deltas)
+
+
+async def move_schedule_rollups(
+    session: AsyncSession,
+    schedule_id: int,
+    old_subject_id: Optional[int],
+    new_subject_id: Optional[int],
+) -> None:
+    """
+    Move a lesson's counts to another subject's rollup rows.
+    Call when ``Schedule.subject_id`` changes, in the same transaction.
+    """
+    if old_subject_id == new_subject_id:
+        return
+    result = await session.execute(
+        select(Attendance.date, Student.group_id, Attendance.status, func.count(Attendance.id))
+        .join(Student, Attendance.student_id == Student.id)
+        .where(Attendance.schedule_id == schedule_id)
+        .group_by(Attendance.date, Student.group_id, Attendance.status)
+    )
+    deltas: Counter = Counter()
+    for day, group_id, status, count in result.all():
+        if old_subject_id is not None:
+            deltas[(day, group_id, old_subject_id, status)] -= count
+        if new_subject_id is not None:
+            deltas[(day, group_id, new_subject_id, status)] += count
+    await apply_rollup_deltas(session, deltas)
+
+
+async def apply_rollup_deltas(session: AsyncSession, deltas: Dict[RollupKey, int]) -> None:
+    """Add signed counts to rollup rows, creating and dropping rows as needed."""
+    rows = [
+        {"date": d, "group_id": g, "subject_id": s, "status": st, "count": n}
+        for (d, g, s, st), n in deltas.items()
+        if n != 0
+    ]
+    if not rows:
+        return
+
+    stmt = dialect_insert(session, AttendanceDailyRollup).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["date", "group_id", "subject_id", "status"],
+        set_={"count": AttendanceDailyRollup.count + stmt.excluded.count},
+    )
+    await session.execute(stmt)
+
+    if any(row["count"] < 0 for row in rows):
+        touched_dates = {row["date"] for row in rows}
+        await session.execute(
+            delete(AttendanceDailyRollup).where(
+                and_(
+                    AttendanceDailyRollup.date.in_(touched_dates),
+                    AttendanceDailyRollup.count <= 0,
+                )
+            )
+        )
+
+
+def _raw_rollup_query():
+    """Aggregate raw attendance rows into the rollup shape."""
+    return select(
+        Attendance.date,
+        Student.group_id,
+        Schedule.subject_id,
+        Attendance.status,
+        func.count(Attendance.id).label("count"),
+    ).join(
+        Student, Attendance.student_id == Student.id
+    ).join(
+        Schedule, Attendance.schedule_id == Schedule.id
+    ).group_by(
+        Attendance.date, Student.group_id, Schedule.subject_id, Attendance.status
+    )
+
+
+async def rebuild_attendance_rollup(session: AsyncSession) -> int:
+    """
+    Recompute the whole rollup table from raw attendance rows.
+    Returns the number of rollup rows written. Caller commits.
+    """
+    await session.execute(delete(AttendanceDailyRollup))
+    await session.execute(
+        insert(AttendanceDailyRollup).from_select(
+            ["date", "group_id", "subject_id", "status", "count"],
+            _raw_rollup_query(),
+        )
+    )
+    result = await session.execute(select(func.count()).select_from(AttendanceDailyRollup))
+    return result.scalar() or 0
+
+
+async def check_attendance_rollup(session: AsyncSession) -> List[dict]:
+    """
+    Compare the rollup table against raw attendance rows.
+    Returns one entry per mismatching key (empty list when consistent).
+    """
+    raw_result = await session.execute(_raw_rollup_query())
+    expected = {(r.date, r.group_id, r.subject_id, r.status): r.count for r in raw_result.all()}
+
+    rollup_result = await session.execute(
+        select(
+            AttendanceDailyRollup.date,
+            AttendanceDailyRollup.group_id,
+            AttendanceDailyRollup.subject_id,
+            AttendanceDailyRollup.status,
+            AttendanceDailyRollup.count,
+        ).where(AttendanceDailyRollup.count != 0)
+    )
+    actual = {(r.date, r.group_id, r.subject_id, r.status): r.count for r in rollup_result.all()}
+
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys(), key=lambda k: (k[0], k[1], k[2], k[3].value)):
+        if expected.get(key, 0) != actual.get(key, 0):
+            day, group_id, subject_id, status = key
+            mismatches.append({
+                "date": day.isoformat(),
+                "group_id": group_id,
+                "subject_id": subject_id,
+                "status": status.value,
+                "expected": expected.get(key, 0),
+                "actual": actual.get(key, 0),
+            })
+    return mismatches
@@ -0,0 +1,309 @@
+"""
+In-memory conflict detection for schedule batches.
+
+``LessonIndex`` keeps lessons in per-(resource, date) lists sorted by start
+time, so checking a new lesson against a whole month of existing ones is a
+bisect plus a scan of the few lessons that start before it ends. A lesson
+occupies three resources: its group, its teacher and its room.
+
+Weekly lessons are stored once as ``ScheduleRecurrence`` rules.
+``load_occurrences`` expands them for the requested window only, and
+``materialize_occurrence`` turns one occurrence into a concrete ``Schedule``
+row when attendance is first marked for it. ``load_lesson_index`` puts both
+kinds of lessons into one index, so every write path checks concrete
+lessons and recurrences against each other.
+"""
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import date, time, timedelta
+from typing import Dict, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database import dialect_insert
+from src.exceptions import NotFoundError, BusinessLogicError
+from src.models.schedule import Schedule, ScheduleRecurrence, ScheduleRecurrenceException
+
+
+class Lesson(NamedTuple):
+    """The part of a schedule entry that can conflict with another one."""
+    group_id: int
+    teacher_id: int
+    room: str
+    date: date
+    start_time: time
+    end_time: time
+    schedule_id: Optional[int] = None  # Existing schedule entry
+    item_index: Optional[int] = None  # Position in the submitted batch
+    recurrence_id: Optional[int] = None  # Recurrence the lesson belongs to
+
+
+def normalize_room(room: str) -> str:
+    return room.strip()
+
+
+def _resource_keys(lesson: Lesson) -> List[Tuple[str, Hashable]]:
+    keys = [("group", lesson.group_id), ("teacher", lesson.teacher_id)]
+    room = normalize_room(lesson.room)
+    if room:
+        keys.append(("room", room))
+    return keys
+
+
+class LessonIndex:
+    """Lessons bucketed by (resource, date) and sorted by start time."""
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, Hashable, date], List[Tuple[time, time, int]]] = defaultdict(list)
+        self._lessons: List[Lesson] = []
+
+    def __iter__(self) -> Iterator[Lesson]:
+        return iter(self._lessons)
+
+    def add(self, lesson: Lesson) -> None:
+        position = len(self._lessons)
+        self._lessons.append(lesson)
+        for resource, key in _resource_keys(lesson):
+            insort(self._buckets[(resource, key, lesson.date)], (lesson.start_time, lesson.end_time, position))
+
+    def overlapping(self, resource: str, key: Hashable, day: date, start: time, end: time) -> List[Lesson]:
+        """Lessons holding ``resource`` on ``day`` that overlap [start, end)."""
+        bucket = self._buckets.get((resource, key, day))
+        if not bucket:
+            return []
+        # Everything starting at or after ``end`` cannot overlap
+        stop = bisect_left(bucket, (end,))
+        return [self._lessons[position] for lesson_start, lesson_end, position in bucket[:stop] if lesson_end > start]
+
+    def conflicts(self, lesson: Lesson) -> List[Tuple[str, Lesson]]:
+        """(resource, other lesson) pairs that ``lesson`` would double-book."""
+        found = []
+        for resource, key in _resource_keys(lesson):
+            for other in self.overlapping(resource, key, lesson.date, lesson.start_time, lesson.end_time):
+                found.append((resource, other))
+        return found
+
+
+def occurrence_dates(rule: ScheduleRecurrence, date_from: date, date_to: date) -> List[date]:
+    """Dates of ``rule`` within [date_from, date_to], exceptions included."""
+    step = 7 * rule.interval_weeks
+    first = rule.start_date + timedelta(days=(rule.day_of_week.weekday - rule.start_date.weekday()) % 7)
+    low = max(first, date_from)
+    high = min(rule.end_date, date_to)
+    if low > high:
+        return []
+    # Jump straight to the first occurrence on or after ``low``
+    day = first + timedelta(days=-(-(low - first).days // step) * step)
+    dates = []
+    while day <= high:
+        dates.append(day)
+        day += timedelta(days=step)
+    return dates
+
+
+def is_occurrence(rule: ScheduleRecurrence, day: date) -> bool:
+    return occurrence_dates(rule, day, day) == [day]
+
+
+class Occurrence(NamedTuple):
+    """A not yet materialized lesson of a recurrence."""
+    recurrence: ScheduleRecurrence
+    date: date
+
+
+async def load_occurrences(
+    session: AsyncSession,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    group_id: Optional[int] = None,
+    teacher_id: Optional[int] = None,
+    academic_year: Optional[str] = None,
+    semester: Optional[int] = None,
+) -> List[Occurrence]:
+    """
+    Occurrences of the active recurrences matching the filters within the
+    window (each rule's own date range when no bound is given). Cancelled
+    dates and dates that already have a materialized ``Schedule`` row are
+    left out, so the latter are only returned once, as concrete rows.
+    """
+    query = select(ScheduleRecurrence).where(ScheduleRecurrence.is_active == True)
+
+    if group_id is not None:
+        query = query.where(ScheduleRecurrence.group_id == group_id)
+    if teacher_id is not None:
+        query = query.where(ScheduleRecurrence.teacher_id == teacher_id)
+    if academic_year:
+        query = query.where(ScheduleRecurrence.academic_year == academic_year)
+    if semester:
+        query = query.where(ScheduleRecurrence.semester == semester)
+    if date_from is not None:
+        query = query.where(ScheduleRecurrence.end_date >= date_from)
+    if date_to is not None:
+        query = query.where(ScheduleRecurrence.start_date <= date_to)
+
+    rules = (await session.execute(query)).scalars().all()
+    if not rules:
+        return []
+
+    low = date_from or min(rule.start_date for rule in rules)
+    high = date_to or max(rule.end_date for rule in rules)
+    rule_ids = [rule.id for rule in rules]
+
+    exception_result = await session.execute(
+        select(ScheduleRecurrenceException.recurrence_id, ScheduleRecurrenceException.date).where(
+            ScheduleRecurrenceException.recurrence_id.in_(rule_ids),
+            ScheduleRecurrenceException.date.between(low, high),
+        )
+    )
+    materialized_result = await session.execute(
+        select(Schedule.recurrence_id, Schedule.specific_date).where(
+            Schedule.recurrence_id.in_(rule_ids),
+            Schedule.specific_date.between(low, high),
+        )
+    )
+    taken = {tuple(r) for r in exception_result.all()} | {tuple(r) for r in materialized_result.all()}
+
+    return [
+        Occurrence(rule, day)
+        for rule in rules
+        for day in occurrence_dates(rule, low, high)
+        if (rule.id, day) not in taken
+    ]
+
+
+def occurrence_lesson(rule: ScheduleRecurrence, day: date) -> Lesson:
+    return Lesson(
+        group_id=rule.group_id,
+        teacher_id=rule.teacher_id,
+        room=rule.room,
+        date=day,
+        start_time=rule.start_time,
+        end_time=rule.end_time,
+        recurrence_id=rule.id,
+    )
+
+
+async def load_lesson_index(
+    session: AsyncSession,
+    date_from: date,
+    date_to: date,
+    group_ids: Iterable[int] = (),
+    teacher_ids: Iterable[int] = (),
+    rooms: Iterable[str] = (),
+    exclude_recurrence_id: Optional[int] = None,
+) -> LessonIndex:
+    """
+    Active lessons within [date_from, date_to] holding any of the given
+    groups, teachers or rooms: concrete ``Schedule`` rows and occurrences of
+    recurrences (other than ``exclude_recurrence_id``) alike.
+    """
+    group_ids, teacher_ids = set(group_ids), set(teacher_ids)
+    rooms = {normalize_room(room) for room in rooms} - {""}
+    index = LessonIndex()
+
+    result = await session.execute(
+        select(
+            Schedule.id, Schedule.group_id, Schedule.teacher_id, Schedule.room,
+            Schedule.specific_date, Schedule.start_time, Schedule.end_time, Schedule.recurrence_id,
+        ).where(
+            Schedule.specific_date.between(date_from, date_to),
+            Schedule.is_active == True,
+            or_(
+                Schedule.group_id.in_(group_ids),
+                Schedule.teacher_id.in_(teacher_ids),
+                func.trim(Schedule.room).in_(rooms),
+            ),
+        )
+    )
+    for r in result.all():
+        index.add(Lesson(
+            group_id=r.group_id,
+            teacher_id=r.teacher_id,
+            room=r.room,
+            date=r.specific_date,
+            start_time=r.start_time,
+            end_time=r.end_time,
+            schedule_id=r.id,
+            recurrence_id=r.recurrence_id,
+        ))
+
+    for occurrence in await load_occurrences(session, date_from, date_to):
+        rule = occurrence.recurrence
+        if rule.id == exclude_recurrence_id:
+            continue
+        if rule.group_id in group_ids or rule.teacher_id in teacher_ids or normalize_room(rule.room) in rooms:
+            index.add(occurrence_lesson(rule, occurrence.date))
+    return index
+
+
+async def find_conflicts(
+    session: AsyncSession,
+    lessons: List[Lesson],
+    exclude_recurrence_id: Optional[int] = None,
+) -> List[Tuple[Lesson, str, Lesson]]:
+    """(lesson, resource, other lesson) for every lesson that double-books an existing one."""
+    if not lessons:
+        return []
+    index = await load_lesson_index(
+        session,
+        min(lesson.date for lesson in lessons),
+        max(lesson.date for lesson in lessons),
+        group_ids={lesson.group_id for lesson in lessons},
+        teacher_ids={lesson.teacher_id for lesson in lessons},
+        rooms={lesson.room for lesson in lessons},
+        exclude_recurrence_id=exclude_recurrence_id,
+    )
+    return [
+        (lesson, resource, other)
+        for lesson in lessons
+        for resource, other in index.conflicts(lesson)
+    ]
+
+
+async def materialize_occurrence(session: AsyncSession, recurrence_id: int, day: date) -> Schedule:
+    """
+    The concrete ``Schedule`` row of a recurrence occurrence, created on first
+    use. Concurrent callers end up with the same row. Caller commits.
+    """
+    existing_query = select(Schedule).where(
+        Schedule.recurrence_id == recurrence_id,
+        Schedule.specific_date == day,
+    )
+    schedule = (await session.execute(existing_query)).scalar_one_or_none()
+    if schedule:
+        return schedule
+
+    rule = await session.get(ScheduleRecurrence, recurrence_id)
+    if not rule:
+        raise NotFoundError(resource="Schedule recurrence", resource_id=recurrence_id)
+
+    cancelled_result = await session.execute(
+        select(ScheduleRecurrenceException.id).where(
+            ScheduleRecurrenceException.recurrence_id == recurrence_id,
+            ScheduleRecurrenceException.date == day,
+        )
+    )
+    if not rule.is_active or not is_occurrence(rule, day) or cancelled_result.first():
+        raise BusinessLogicError(
+            code="NOT_AN_OCCURRENCE",
+            message="В этот день занятие по данному расписанию не проводится",
+            details={"recurrence_id": recurrence_id, "date": day.isoformat()},
+        )
+
+    stmt = dialect_insert(session, Schedule).values(
+        group_id=rule.group_id,
+        subject_id=rule.subject_id,
+        teacher_id=rule.teacher_id,
+        specific_date=day,
+        start_time=rule.start_time,
+        end_time=rule.end_time,
+        room=rule.room,
+        semester=rule.semester,
+        academic_year=rule.academic_year,
+        recurrence_id=rule.id,
+        is_active=True,
+    ).on_conflict_do_nothing(index_elements=["recurrence_id", "specific_date"])
+    await session.execute(stmt)
+
+    return (await session.execute(existing_query)).scalar_one()
@@ -1,5 +1,5 @@
-from datetime import date
-from pydantic import BaseModel
+from datetime import date, datetime
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Optional, Dict, Any
 
 
@@ -38,6 +38,20 @@ class StudentAnalytics(BaseModel):
     academic_year: str
 
 
+class StudentAnalyticsBatchRequest(BaseModel):
+    """Request analytics for a whole group or for specific students."""
+    group_id: Optional[int] = None
+    student_ids: Optional[List[int]] = Field(None, min_length=1, max_length=500)
+    academic_year: Optional[str] = None
+    semester: Optional[int] = None
+
+    @model_validator(mode='after')
+    def check_target(self):
+        if (self.group_id is None) == (self.student_ids is None):
+            raise ValueError('Provide either group_id or student_ids')
+        return self
+
+
 class GroupAnalytics(BaseModel):
     """Analytics for a group."""
     group_id: int
@@ -61,3 +75,77 @@ class DashboardStats(BaseModel):
     average_grade: float
     recent_violations: int
 
+
+
+class RankPosition(BaseModel):
+    """Rank within a cohort; percentile 100 is the best student."""
+    rank: int
+    of: int
+    percentile: float
+
+
+class CohortStanding(BaseModel):
+    """Positions within one cohort (None when the student has no data)."""
+    attendance: Optional[RankPosition] = None
+    score: Optional[RankPosition] = None
+
+
+class StudentStanding(BaseModel):
+    """A student's standing in group, course and department."""
+    student_id: int
+    student_name: str
+    group_id: int
+    course: int
+    attendance_rate: Optional[float] = None
+    average_score: Optional[float] = None
+    group_rank: CohortStanding
+    course_rank: CohortStanding
+    department_rank: CohortStanding
+
+
+class LeaderboardEntry(RankPosition):
+    """One leaderboard row."""
+    student_id: int
+    student_name: str
+    group_id: int
+    course: int
+    value: float
+
+
+class Leaderboard(BaseModel):
+    """A page of a leaderboard."""
+    scope: str
+    scope_id: Optional[int] = None
+    metric: str
+    total: int
+    offset: int
+    entries: List[LeaderboardEntry]
+
+
+class RiskFlagRead(BaseModel):
+    """A stored at-risk flag."""
+    flag: str
+    value: float
+    threshold: float
+    details: Optional[str] = None
+    detected_at: datetime
+
+
+class AtRiskStudent(BaseModel):
+    """A cadet with at least one at-risk flag."""
+    student_id: int
+    student_name: str
+    group_id: int
+    group_name: str
+    flags: List[RiskFlagRead]
+
+
+class CacheStats(BaseModel):
+    """Analytics cache counters."""
+    hits: int
+    misses: int
+    hit_rate: float  # Percentage
+    evictions: int
+    entries: int
+    max_entries: int
+    ttl_seconds: float
@@ -58,6 +58,10 @@ class AttachmentRead(BaseModel):
     description: Optional[str] = None
     url: Optional[str] = None
     
+    # Generated in the background for raster images
+    thumbnail_attachment_id: Optional[int] = None
+    webp_attachment_id: Optional[int] = None
+    
     uploaded_by_id: int
     created_at: datetime
     updated_at: datetime
@@ -1,23 +1,36 @@
 from datetime import datetime, date
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from typing import Optional, List
 
 from src.models.attendance import AttendanceStatus
 from src.schemas.students import StudentRead
 
 
-class AttendanceCreate(BaseModel):
+class LessonRef(BaseModel):
+    """
+    The lesson attendance is marked for: either a schedule entry, or a
+    recurring lesson whose occurrence on ``date`` is materialized on first use.
+    """
+    schedule_id: Optional[int] = None
+    recurrence_id: Optional[int] = None
+
+    @model_validator(mode='after')
+    def validate_lesson(self):
+        if (self.schedule_id is None) == (self.recurrence_id is None):
+            raise ValueError('Exactly one of schedule_id and recurrence_id is required')
+        return self
+
+
+class AttendanceCreate(LessonRef):
     """Schema for creating a single attendance record."""
     student_id: int
-    schedule_id: int
     date: date
     status: AttendanceStatus
     reason: Optional[str] = None
 
 
-class AttendanceBulkCreate(BaseModel):
+class AttendanceBulkCreate(LessonRef):
     """Schema for bulk attendance marking (entire class at once)."""
-    schedule_id: int
     date: date
     records: List["AttendanceRecord"]
 
@@ -0,0 +1,48 @@
+from datetime import datetime
+from pydantic import BaseModel, field_validator
+from typing import Optional
+
+from src.models.assessment_events import AssessmentEventType
+
+
+class GradeWeightSet(BaseModel):
+    """Schema for setting the weight of an event type (optionally for one subject)."""
+    event_type: AssessmentEventType
+    subject_id: Optional[int] = None
+    weight: float
+
+    @field_validator('weight')
+    @classmethod
+    def validate_weight(cls, v: float) -> float:
+        if v < 0:
+            raise ValueError('Weight cannot be negative')
+        return v
+
+
+class GradeWeightRead(BaseModel):
+    """Schema for reading a grade weight."""
+    id: int
+    event_type: AssessmentEventType
+    subject_id: Optional[int]
+    weight: float
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class FinalGradeRead(BaseModel):
+    """Weighted final grade of a student in a subject and semester."""
+    student_id: int
+    student_name: str
+    group_id: int
+    subject_id: int
+    subject_name: str
+    academic_year: str
+    semester: int
+    score: float
+    letter_grade: str
+    grades_count: int
+    weight_total: float
+    computed_at: datetime
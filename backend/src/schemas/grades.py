@@ -1,6 +1,8 @@
-from datetime import datetime
+from datetime import datetime, date
 from pydantic import BaseModel, field_validator
-from typing import Optional
+from typing import List, Literal, Optional
+
+from src.models.assessment_events import AssessmentEventType
 
 from src.schemas.students import StudentRead
 
@@ -69,3 +71,38 @@ class BulkGradesCreate(BaseModel):
     """Schema for creating multiple grades at once for an event."""
     assessment_event_id: int
     grades: list[BulkGradeInput]
+
+
+class GradeMatrixStudent(BaseModel):
+    """Row header of the gradebook matrix."""
+    id: int
+    last_name: str
+    first_name: str
+    middle_name: Optional[str] = None
+
+
+class GradeMatrixEvent(BaseModel):
+    """Column header of the gradebook matrix."""
+    id: int
+    name: str
+    event_type: AssessmentEventType
+    subject_id: int
+    date: date
+    max_score: float
+
+
+class GradeMatrix(BaseModel):
+    """
+    Student x assessment-event gradebook.
+
+    ``scores`` holds len(students) * len(events) values in row-major order
+    (one row per student, in roster order), null where no score was entered.
+    With ``encoding="f32"`` the same values are sent in ``scores_f32`` as
+    base64 little-endian float32, with NaN marking missing scores.
+    """
+    group_id: int
+    encoding: Literal["json", "f32"]
+    students: List[GradeMatrixStudent]
+    events: List[GradeMatrixEvent]
+    scores: Optional[List[Optional[float]]] = None
+    scores_f32: Optional[str] = None
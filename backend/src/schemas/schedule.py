@@ -1,7 +1,8 @@
 from datetime import datetime, time, date
-from pydantic import BaseModel, field_validator, model_validator
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import List, Optional
 
+from src.models.schedule import DayOfWeek
 from src.schemas.groups import GroupRead
 from src.schemas.subjects import SubjectRead
 from src.schemas.teachers import TeacherRead
@@ -48,8 +49,12 @@ class ScheduleCreate(BaseModel):
 
 
 class ScheduleRead(BaseModel):
-    """Schema for reading schedule information."""
-    id: int
+    """
+    Schema for reading schedule information.
+    Occurrences of a recurrence that have not been materialized yet have no id.
+    """
+    id: Optional[int] = None
+    recurrence_id: Optional[int] = None
     group_id: int
     subject_id: int
     teacher_id: int
@@ -130,9 +135,124 @@ class MonthlyScheduleCreate(BaseModel):
         return v
 
 
+class CopyWeeksRequest(BaseModel):
+    """Schema for copying one week of lessons to several groups' following weeks."""
+    source_date: date  # Any day of the source week
+    group_ids: List[int] = Field(..., min_length=1, max_length=500)
+    target_date: date  # Any day of the first target week
+    weeks: int = Field(1, ge=1, le=53)  # Number of consecutive target weeks
+
+    @field_validator('group_ids')
+    @classmethod
+    def validate_group_ids(cls, v: List[int]) -> List[int]:
+        return list(dict.fromkeys(v))
+
+
+class ScheduleRecurrenceCreate(BaseModel):
+    """Schema for creating a weekly recurring lesson."""
+    group_id: int
+    subject_id: int
+    teacher_id: int
+
+    day_of_week: DayOfWeek
+    start_time: time
+    end_time: time
+    room: str
+
+    start_date: date  # First day the rule applies (e.g. start of the semester)
+    end_date: date  # Last day the rule applies
+    interval_weeks: int = Field(1, ge=1, le=4)  # 2 = every other week
+
+    semester: int
+    academic_year: str
+
+    @field_validator('semester')
+    @classmethod
+    def validate_semester(cls, v: int) -> int:
+        if v not in [1, 2]:
+            raise ValueError('Semester must be 1 or 2')
+        return v
+
+    @field_validator('academic_year')
+    @classmethod
+    def validate_academic_year(cls, v: str) -> str:
+        v = v.strip()
+        if len(v) != 9 or '-' not in v:
+            raise ValueError('Academic year must be in format YYYY-YYYY')
+        return v
+
+    @field_validator('room')
+    @classmethod
+    def validate_room(cls, v: str) -> str:
+        v = v.strip()
+        if len(v) < 1 or len(v) > 50:
+            raise ValueError('Room must be 1-50 characters')
+        return v
+
+    @model_validator(mode='after')
+    def validate_ranges(self) -> 'ScheduleRecurrenceCreate':
+        if self.end_time <= self.start_time:
+            raise ValueError('End time must be after start time')
+        if self.end_date < self.start_date:
+            raise ValueError('End date must not be before start date')
+        if (self.end_date - self.start_date).days > 366:
+            raise ValueError('A recurrence cannot span more than a year')
+        return self
+
 
+class ScheduleRecurrenceUpdate(BaseModel):
+    """Schema for updating a recurring lesson; applies to occurrences not materialized yet."""
+    teacher_id: Optional[int] = None
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
+    room: Optional[str] = None
+    end_date: Optional[date] = None
+    is_active: Optional[bool] = None
 
 
+class ScheduleRecurrenceExceptionCreate(BaseModel):
+    """Schema for cancelling one occurrence of a recurring lesson."""
+    date: date
+    reason: Optional[str] = Field(None, max_length=255)
 
 
+class ScheduleRecurrenceExceptionRead(BaseModel):
+    """Schema for reading a cancelled occurrence."""
+    date: date
+    reason: Optional[str]
 
+    class Config:
+        from_attributes = True
+
+
+class ScheduleRecurrenceRead(BaseModel):
+    """Schema for reading a recurring lesson."""
+    id: int
+    group_id: int
+    subject_id: int
+    teacher_id: int
+
+    day_of_week: DayOfWeek
+    start_time: time
+    end_time: time
+    room: str
+
+    start_date: date
+    end_date: date
+    interval_weeks: int
+
+    semester: int
+    academic_year: str
+    is_active: bool
+
+    created_at: datetime
+
+    exceptions: List[ScheduleRecurrenceExceptionRead] = []
+
+    # Nested objects
+    group: Optional[GroupRead] = None
+    subject: Optional[SubjectRead] = None
+    teacher: Optional[TeacherRead] = None
+
+    class Config:
+        from_attributes = True
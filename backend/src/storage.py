@@ -3,18 +3,27 @@ File storage abstraction layer.
 Supports local filesystem and AWS S3 storage backends.
 Designed for flexibility - can switch storage backend via configuration.
 """
+import asyncio
 import os
 import uuid
 import hashlib
 import mimetypes
+import tempfile
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import BinaryIO, Optional, Tuple
+from typing import AsyncIterator, BinaryIO, Callable, Optional, Tuple, TypeVar
 from dataclasses import dataclass
 
 from src.exceptions import StorageError, FileTooLargeError, InvalidFileTypeError
 
+# Read/write size for streaming uploads and downloads
+CHUNK_SIZE = 1024 * 1024
+MB = 1024 * 1024
+
+T = TypeVar("T")
+
 
 @dataclass
 class StoredFile:
@@ -28,6 +37,24 @@ class StoredFile:
     url: Optional[str] = None  # Public URL if available
 
 
+@dataclass
+class StagedFile:
+    """An upload spooled to a temp file and hashed, not yet stored under a key."""
+    path: str  # Temp file
+    original_filename: str
+    content_type: str
+    size: int  # bytes
+    checksum: str  # MD5 hash
+    sha256: str  # Content address
+
+
+def _unlink_quietly(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
 @dataclass
 class StorageConfig:
     """Storage configuration."""
@@ -55,6 +82,10 @@ class StorageConfig:
     s3_access_key: Optional[str] = None
     s3_secret_key: Optional[str] = None
     s3_endpoint_url: Optional[str] = None  # For S3-compatible services (MinIO, etc.)
+    s3_workers: int = 16  # Threads for blocking boto3 calls
+    s3_multipart_threshold_mb: int = 16  # Larger uploads are split into parts
+    s3_multipart_chunk_mb: int = 8
+    s3_multipart_concurrency: int = 4  # Parts uploaded in parallel per file
     
     @classmethod
     def from_env(cls) -> "StorageConfig":
@@ -68,6 +99,10 @@ class StorageConfig:
             s3_access_key=os.getenv("AWS_ACCESS_KEY_ID"),
             s3_secret_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
             s3_endpoint_url=os.getenv("AWS_S3_ENDPOINT_URL"),
+            s3_workers=int(os.getenv("S3_WORKERS", "16")),
+            s3_multipart_threshold_mb=int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "16")),
+            s3_multipart_chunk_mb=int(os.getenv("S3_MULTIPART_CHUNK_MB", "8")),
+            s3_multipart_concurrency=int(os.getenv("S3_MULTIPART_CONCURRENCY", "4")),
         )
     
     @property
@@ -76,13 +111,53 @@ class StorageConfig:
         return bool(self.s3_bucket and self.s3_access_key and self.s3_secret_key)
 
 
+async def read_file_chunks(
+    file_obj: BinaryIO,
+    offset: int = 0,
+    length: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Yield ``length`` bytes (or everything) of an open file from ``offset``,
+    reading in a worker thread. Closes the file when done.
+    """
+    try:
+        await asyncio.to_thread(file_obj.seek, offset)
+        remaining = length
+        while remaining is None or remaining > 0:
+            size = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+            chunk = await asyncio.to_thread(file_obj.read, size)
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        file_obj.close()
+
+
 class StorageBackend(ABC):
-    """Abstract base class for storage backends."""
+    """
+    Abstract base class for storage backends.
+    
+    Saving is split in two steps: ``stage`` spools and hashes the upload,
+    ``store`` puts the staged file under a key. Callers that pick the key
+    from the content (see ``src/blobs.py``) can ``discard`` a staged file
+    whose content is already stored instead.
+    """
+    
+    name: str  # Value of StoredFile.storage_backend
     
     def __init__(self, config: StorageConfig):
         self.config = config
     
-    @abstractmethod
+    async def _run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run blocking storage I/O off the event loop."""
+        return await asyncio.to_thread(func, *args, **kwargs)
+    
+    def staging_dir(self) -> Optional[str]:
+        """Where uploads are spooled (None for the system temp dir)."""
+        return None
+    
     async def save(
         self,
         file: BinaryIO,
@@ -90,14 +165,85 @@ class StorageBackend(ABC):
         content_type: Optional[str] = None,
         folder: str = "",
     ) -> StoredFile:
-        """Save a file and return storage information."""
+        """Save a file under a new unique key and return storage information."""
+        staged = await self.stage(file, filename, content_type)
+        key = self.generate_key(filename, folder)
+        await self.store(staged, key)
+        return self.stored_file(staged, key)
+    
+    async def stage(
+        self,
+        file: BinaryIO,
+        filename: str,
+        content_type: Optional[str] = None,
+    ) -> StagedFile:
+        """Validate, spool and hash an upload in a single pass."""
+        self.validate_extension(filename)
+        content_type = self.guess_content_type(filename, content_type)
+        path, size, checksum, sha256 = await self._run(self._spool, file)
+        return StagedFile(
+            path=path,
+            original_filename=filename,
+            content_type=content_type,
+            size=size,
+            checksum=checksum,
+            sha256=sha256,
+        )
+    
+    def _spool(self, file: BinaryIO) -> Tuple[str, int, str, str]:
+        staging_dir = self.staging_dir()
+        if staging_dir:
+            os.makedirs(staging_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=staging_dir, prefix=".upload-", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as target:
+                size, checksum, sha256 = self.copy_stream(file, target)
+        except FileTooLargeError:
+            _unlink_quietly(temp_path)
+            raise
+        except Exception as e:
+            _unlink_quietly(temp_path)
+            raise StorageError("save", str(e))
+        return temp_path, size, checksum, sha256
+    
+    @abstractmethod
+    async def store(self, staged: StagedFile, key: str) -> None:
+        """Move a staged file into storage under ``key``, replacing what is there."""
         pass
     
+    async def discard(self, staged: StagedFile) -> None:
+        """Drop a staged file that will not be stored."""
+        await asyncio.to_thread(_unlink_quietly, staged.path)
+    
+    def stored_file(self, staged: StagedFile, key: str) -> StoredFile:
+        return StoredFile(
+            key=key,
+            original_filename=staged.original_filename,
+            content_type=staged.content_type,
+            size=staged.size,
+            checksum=staged.checksum,
+            storage_backend=self.name,
+            url=self.get_url(key),
+        )
+    
     @abstractmethod
     async def get(self, key: str) -> Tuple[BinaryIO, str]:
         """Get a file by key. Returns (file_object, content_type)."""
         pass
     
+    @abstractmethod
+    async def stream(
+        self,
+        key: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+    ) -> Tuple[AsyncIterator[bytes], str]:
+        """
+        Open a file by key for streaming, optionally only ``length`` bytes
+        starting at ``offset``. Returns (chunk iterator, content_type).
+        """
+        pass
+    
     @abstractmethod
     async def delete(self, key: str) -> bool:
         """Delete a file by key. Returns True if deleted."""
@@ -115,15 +261,20 @@ class StorageBackend(ABC):
     
     def validate_file(self, filename: str, size: int) -> None:
         """Validate file before saving."""
-        # Check file size
+        self.validate_size(size)
+        self.validate_extension(filename)
+    
+    def validate_size(self, size: int) -> None:
+        """Check file size against the configured maximum."""
         max_size_bytes = self.config.max_file_size_mb * 1024 * 1024
         if size > max_size_bytes:
             raise FileTooLargeError(
                 max_size_mb=self.config.max_file_size_mb,
                 actual_size_mb=size / (1024 * 1024)
             )
-        
-        # Check file extension
+    
+    def validate_extension(self, filename: str) -> None:
+        """Check file extension against the allowed list."""
         ext = Path(filename).suffix.lower()
         if ext not in self.config.allowed_extensions:
             raise InvalidFileTypeError(
@@ -151,66 +302,67 @@ class StorageBackend(ABC):
             md5.update(chunk)
         file.seek(0)
         return md5.hexdigest()
+    
+    def blob_key(self, sha256: str, filename: str) -> str:
+        """
+        Content-addressed key: blobs/ab/cd/abcd...-<token><ext>. The token
+        differs per blob row, so a released file deleted after its commit can
+        never be a copy stored again for the same content meanwhile.
+        """
+        ext = Path(filename).suffix.lower()
+        return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}-{uuid.uuid4().hex[:8]}{ext}"
+    
+    def copy_stream(self, source: BinaryIO, target: BinaryIO) -> Tuple[int, str, str]:
+        """
+        Copy ``source`` into ``target`` in a single pass, returning
+        (size, MD5, SHA-256). Raises FileTooLargeError as soon as the size
+        limit is crossed. Blocking - run it off the event loop.
+        """
+        md5 = hashlib.md5()
+        sha256 = hashlib.sha256()
+        size = 0
+        source.seek(0)
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+            size += len(chunk)
+            self.validate_size(size)
+            md5.update(chunk)
+            sha256.update(chunk)
+            target.write(chunk)
+        return size, md5.hexdigest(), sha256.hexdigest()
+    
+    @staticmethod
+    def guess_content_type(filename: str, content_type: Optional[str]) -> str:
+        if not content_type:
+            content_type, _ = mimetypes.guess_type(filename)
+        return content_type or "application/octet-stream"
 
 
 class LocalStorageBackend(StorageBackend):
     """Local filesystem storage backend."""
     
+    name = "local"
+    
     def __init__(self, config: StorageConfig):
         super().__init__(config)
         self.base_path = Path(config.local_storage_path)
         # Create base directory if it doesn't exist
         self.base_path.mkdir(parents=True, exist_ok=True)
     
-    async def save(
-        self,
-        file: BinaryIO,
-        filename: str,
-        content_type: Optional[str] = None,
-        folder: str = "",
-    ) -> StoredFile:
-        """Save file to local filesystem."""
-        # Read file content to get size
-        file.seek(0, 2)  # Seek to end
-        size = file.tell()
-        file.seek(0)  # Reset to beginning
-        
-        # Validate
-        self.validate_file(filename, size)
-        
-        # Generate unique key
-        key = self.generate_key(filename, folder)
-        
-        # Create folder structure if needed
-        file_path = self.base_path / key
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Calculate checksum
-        checksum = self.calculate_checksum(file)
-        
-        # Determine content type
-        if not content_type:
-            content_type, _ = mimetypes.guess_type(filename)
-            content_type = content_type or "application/octet-stream"
-        
+    def staging_dir(self) -> Optional[str]:
+        # Same filesystem as the files, so storing is an atomic rename
+        return str(self.base_path / ".staging")
+    
+    async def store(self, staged: StagedFile, key: str) -> None:
+        """Rename a staged file into place, so a key never points at a partial file."""
+        await self._run(self._move_into_place, staged.path, self.base_path / key)
+    
+    def _move_into_place(self, temp_path: str, file_path: Path) -> None:
         try:
-            # Save file
-            with open(file_path, "wb") as f:
-                file.seek(0)
-                for chunk in iter(lambda: file.read(8192), b""):
-                    f.write(chunk)
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp_path, file_path)
         except Exception as e:
+            _unlink_quietly(temp_path)
             raise StorageError("save", str(e))
-        
-        return StoredFile(
-            key=key,
-            original_filename=filename,
-            content_type=content_type,
-            size=size,
-            checksum=checksum,
-            storage_backend="local",
-            url=f"{self.config.base_url.rstrip('/')}/media/{key}",
-        )
     
     async def get(self, key: str) -> Tuple[BinaryIO, str]:
         """Get file from local filesystem."""
@@ -224,6 +376,16 @@ class LocalStorageBackend(StorageBackend):
         
         return open(file_path, "rb"), content_type
     
+    async def stream(
+        self,
+        key: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+    ) -> Tuple[AsyncIterator[bytes], str]:
+        """Stream file from local filesystem, reading chunks in a worker thread."""
+        file_obj, content_type = await self.get(key)
+        return read_file_chunks(file_obj, offset, length), content_type
+    
     async def delete(self, key: str) -> bool:
         """Delete file from local filesystem."""
         file_path = self.base_path / key
@@ -254,9 +416,20 @@ class LocalStorageBackend(StorageBackend):
 class S3StorageBackend(StorageBackend):
     """AWS S3 (and S3-compatible) storage backend."""
     
+    name = "s3"
+    
     def __init__(self, config: StorageConfig):
         super().__init__(config)
         self._client = None
+        self._transfer_config = None
+        # boto3 is blocking; its calls run here instead of the default executor,
+        # so slow S3 requests cannot starve other to_thread users
+        self._executor = ThreadPoolExecutor(max_workers=config.s3_workers, thread_name_prefix="s3")
+    
+    async def _run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run a blocking boto3 call in the S3 executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
     
     @property
     def client(self):
@@ -273,7 +446,11 @@ class S3StorageBackend(StorageBackend):
             
             boto_config = BotoConfig(
                 signature_version='s3v4',
-                retries={'max_attempts': 3, 'mode': 'standard'}
+                retries={'max_attempts': 3, 'mode': 'standard'},
+                # Enough connections for the executor plus parallel multipart parts
+                max_pool_connections=self.config.s3_workers + self.config.s3_multipart_concurrency,
+                # Custom endpoints (MinIO, local stand-ins) rarely have wildcard DNS for buckets
+                s3={'addressing_style': 'path'} if self.config.s3_endpoint_url else None,
             )
             
             client_kwargs = {
@@ -291,79 +468,100 @@ class S3StorageBackend(StorageBackend):
         
         return self._client
     
-    async def save(
-        self,
-        file: BinaryIO,
-        filename: str,
-        content_type: Optional[str] = None,
-        folder: str = "",
-    ) -> StoredFile:
-        """Save file to S3."""
-        # Read file content to get size
-        file.seek(0, 2)
-        size = file.tell()
-        file.seek(0)
-        
-        # Validate
-        self.validate_file(filename, size)
-        
-        # Generate unique key
-        key = self.generate_key(filename, folder)
-        
-        # Calculate checksum
-        checksum = self.calculate_checksum(file)
-        
-        # Determine content type
-        if not content_type:
-            content_type, _ = mimetypes.guess_type(filename)
-            content_type = content_type or "application/octet-stream"
-        
-        try:
-            file.seek(0)
-            self.client.upload_fileobj(
-                file,
-                self.config.s3_bucket,
-                key,
-                ExtraArgs={
-                    "ContentType": content_type,
-                    "Metadata": {
-                        "original-filename": filename,
-                        "checksum": checksum,
-                    }
-                }
+    @property
+    def transfer_config(self):
+        """Multipart settings for upload_fileobj."""
+        if self._transfer_config is None:
+            from boto3.s3.transfer import TransferConfig
+            
+            self._transfer_config = TransferConfig(
+                multipart_threshold=self.config.s3_multipart_threshold_mb * MB,
+                multipart_chunksize=self.config.s3_multipart_chunk_mb * MB,
+                max_concurrency=self.config.s3_multipart_concurrency,
+                use_threads=True,
             )
+        return self._transfer_config
+    
+    async def store(self, staged: StagedFile, key: str) -> None:
+        """
+        Upload a staged file. The checksum goes into the object metadata, which
+        is why uploads are spooled and hashed first. Files above the multipart
+        threshold are sent as parts in parallel.
+        """
+        await self._run(self._upload_staged, staged, key)
+    
+    def _upload_staged(self, staged: StagedFile, key: str) -> None:
+        try:
+            with open(staged.path, "rb") as source:
+                self.client.upload_fileobj(
+                    source,
+                    self.config.s3_bucket,
+                    key,
+                    ExtraArgs={
+                        "ContentType": staged.content_type,
+                        "Metadata": {
+                            "original-filename": staged.original_filename,
+                            "checksum": staged.checksum,
+                        }
+                    },
+                    Config=self.transfer_config,
+                )
+        except StorageError:
+            raise
         except Exception as e:
             raise StorageError("save", str(e))
-        
-        return StoredFile(
-            key=key,
-            original_filename=filename,
-            content_type=content_type,
-            size=size,
-            checksum=checksum,
-            storage_backend="s3",
-            url=self.get_url(key),
-        )
+        finally:
+            _unlink_quietly(staged.path)
     
     async def get(self, key: str) -> Tuple[BinaryIO, str]:
         """Get file from S3."""
         import io
         
         try:
-            response = self.client.get_object(
+            response = await self._run(
+                self.client.get_object,
                 Bucket=self.config.s3_bucket,
                 Key=key
             )
             content_type = response.get("ContentType", "application/octet-stream")
-            body = io.BytesIO(response["Body"].read())
+            body = io.BytesIO(await self._run(response["Body"].read))
             return body, content_type
         except Exception as e:
             raise StorageError("get", str(e))
     
+    async def stream(
+        self,
+        key: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+    ) -> Tuple[AsyncIterator[bytes], str]:
+        """Stream file from S3 chunk by chunk without buffering the whole body."""
+        params = {"Bucket": self.config.s3_bucket, "Key": key}
+        if offset or length is not None:
+            end = "" if length is None else offset + length - 1
+            params["Range"] = f"bytes={offset}-{end}"
+        try:
+            response = await self._run(self.client.get_object, **params)
+        except Exception as e:
+            raise StorageError("get", str(e))
+        content_type = response.get("ContentType", "application/octet-stream")
+        body = response["Body"]
+        
+        async def chunks() -> AsyncIterator[bytes]:
+            try:
+                while chunk := await self._run(body.read, CHUNK_SIZE):
+                    yield chunk
+            finally:
+                # Return the connection to the pool even if the client went away
+                body.close()
+        
+        return chunks(), content_type
+    
     async def delete(self, key: str) -> bool:
         """Delete file from S3."""
         try:
-            self.client.delete_object(
+            await self._run(
+                self.client.delete_object,
                 Bucket=self.config.s3_bucket,
                 Key=key
             )
@@ -374,7 +572,8 @@ class S3StorageBackend(StorageBackend):
     async def exists(self, key: str) -> bool:
         """Check if file exists in S3."""
         try:
-            self.client.head_object(
+            await self._run(
+                self.client.head_object,
                 Bucket=self.config.s3_bucket,
                 Key=key
             )
@@ -443,10 +642,44 @@ class Storage:
         """Save a file."""
         return await self.backend.save(file, filename, content_type, folder)
     
+    async def stage(
+        self,
+        file: BinaryIO,
+        filename: str,
+        content_type: Optional[str] = None,
+    ) -> StagedFile:
+        """Spool and hash an upload without storing it yet."""
+        return await self.backend.stage(file, filename, content_type)
+    
+    async def store(self, staged: StagedFile, key: str) -> None:
+        """Store a staged file under ``key``."""
+        await self.backend.store(staged, key)
+    
+    async def discard(self, staged: StagedFile) -> None:
+        """Drop a staged file."""
+        await self.backend.discard(staged)
+    
+    def blob_key(self, sha256: str, filename: str) -> str:
+        """Content-addressed key for a file."""
+        return self.backend.blob_key(sha256, filename)
+    
+    def stored_file(self, staged: StagedFile, key: str) -> StoredFile:
+        """Storage information of a staged file stored under ``key``."""
+        return self.backend.stored_file(staged, key)
+    
     async def get(self, key: str) -> Tuple[BinaryIO, str]:
         """Get a file."""
         return await self.backend.get(key)
     
+    async def stream(
+        self,
+        key: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+    ) -> Tuple[AsyncIterator[bytes], str]:
+        """Open a file (or a byte range of it) for streaming."""
+        return await self.backend.stream(key, offset, length)
+    
     async def delete(self, key: str) -> bool:
         """Delete a file."""
         return await self.backend.delete(key)
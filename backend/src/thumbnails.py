@@ -0,0 +1,263 @@
+"""
+Background generation of image thumbnails and WebP variants.
+
+Uploaded raster images get two generated attachments: a small WebP
+thumbnail (THUMBNAIL_SIZE px on the longest side) for palettes and lists,
+and a full-size WebP version (at most WEBP_MAX_SIZE px) for display. They
+are linked from the source through ``thumbnail_attachment_id`` and
+``webp_attachment_id``, and a symbol whose image gets a thumbnail has it
+set as its ``thumbnail_attachment_id``.
+
+Upload endpoints call ``thumbnail_pipeline.enqueue`` after committing;
+``THUMBNAIL_WORKERS`` asyncio tasks take attachments off the queue and
+decode/resize them in a process pool of the same size, so image work never
+runs on the event loop or holds the GIL of the API process. Generation is
+idempotent by checksum: an image whose content already has variants (the
+same picture uploaded for another symbol) gets references to the existing
+variant files instead of being decoded again.
+
+Pillow is optional (``pip install Pillow``); without it the pipeline stays
+off. SVG uploads are skipped - they are already small and scale freely.
+"""
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.blobs import release_blob, retain_blob, store_upload
+from src.database import async_session
+from src.models.attachments import Attachment, AttachmentType
+from src.models.gamification import TopographicSymbol
+from src.storage import Storage, StoredFile, get_storage
+
+logger = logging.getLogger("uvicorn.error")
+
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))  # 0 disables the pipeline
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "256"))  # px, longest side
+WEBP_MAX_SIZE = int(os.getenv("WEBP_MAX_SIZE", "1920"))  # px, longest side
+WEBP_QUALITY = int(os.getenv("WEBP_QUALITY", "80"))
+
+THUMBNAIL = "thumbnail"
+WEBP = "webp"
+
+
+def render_variants(data: bytes, thumbnail_size: int, webp_max_size: int, quality: int) -> Dict[str, bytes]:
+    """Encode the WebP variants of an image. Runs in a worker process."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        variants = {}
+        for variant, size in ((WEBP, webp_max_size), (THUMBNAIL, thumbnail_size)):
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+            out = io.BytesIO()
+            resized.save(out, "WEBP", quality=quality)
+            variants[variant] = out.getvalue()
+    return variants
+
+
+def needs_variants(attachment: Optional[Attachment]) -> bool:
+    """Whether ``attachment`` is an uploaded raster image without variants yet."""
+    return (
+        attachment is not None
+        and attachment.deleted_at is None
+        and attachment.variant is None
+        and attachment.thumbnail_attachment_id is None
+        and attachment.attachment_type == AttachmentType.IMAGE
+        and attachment.file_extension != "svg"
+        and "svg" not in attachment.content_type
+    )
+
+
+def _variant_attachment(source: Attachment, variant: str, stored: StoredFile, blob_id: Optional[int]) -> Attachment:
+    stem = Path(source.original_filename).stem
+    return Attachment(
+        entity_type=source.entity_type,
+        entity_id=source.entity_id,
+        original_filename=f"{stem}.{variant}.webp",
+        storage_key=stored.key,
+        blob_id=blob_id,
+        content_type="image/webp",
+        file_size=stored.size,
+        checksum=stored.checksum,
+        storage_backend=stored.storage_backend,
+        attachment_type=AttachmentType.IMAGE,
+        title=source.title,
+        uploaded_by_id=source.uploaded_by_id,
+        url=stored.url,
+        variant=variant,
+    )
+
+
+async def _reuse_variants(session: AsyncSession, source: Attachment) -> Optional[Dict[str, Attachment]]:
+    """Variants of another attachment with the same content, sharing its files."""
+    result = await session.execute(
+        select(Attachment).where(
+            Attachment.checksum == source.checksum,
+            Attachment.id != source.id,
+            Attachment.thumbnail_attachment_id.is_not(None),
+            Attachment.webp_attachment_id.is_not(None),
+        ).limit(1)
+    )
+    donor = result.scalar_one_or_none()
+    if donor is None:
+        return None
+
+    existing_variants = {}
+    for variant, variant_id in ((THUMBNAIL, donor.thumbnail_attachment_id), (WEBP, donor.webp_attachment_id)):
+        existing = await session.get(Attachment, variant_id)
+        if existing is None or existing.blob_id is None:
+            return None
+        existing_variants[variant] = existing
+
+    # Take both references or none, so a fallback to rendering leaves no
+    # extra reference behind on the donor's files
+    retained = []
+    for existing in existing_variants.values():
+        if not await retain_blob(session, existing.blob_id):
+            for blob_id in retained:
+                await release_blob(session, blob_id)
+            return None
+        retained.append(existing.blob_id)
+
+    variants = {}
+    for variant, existing in existing_variants.items():
+        stored = StoredFile(
+            key=existing.storage_key,
+            original_filename=existing.original_filename,
+            content_type=existing.content_type,
+            size=existing.file_size,
+            checksum=existing.checksum,
+            storage_backend=existing.storage_backend,
+            url=existing.url,
+        )
+        variants[variant] = _variant_attachment(source, variant, stored, existing.blob_id)
+    return variants
+
+
+async def _render_variants(
+    session: AsyncSession,
+    storage: Storage,
+    source: Attachment,
+    executor: Executor,
+) -> Dict[str, Attachment]:
+    chunks, _ = await storage.stream(source.storage_key)
+    data = b"".join([chunk async for chunk in chunks])
+    rendered = await asyncio.get_running_loop().run_in_executor(
+        executor, render_variants, data, THUMBNAIL_SIZE, WEBP_MAX_SIZE, WEBP_QUALITY
+    )
+
+    variants = {}
+    stem = Path(source.original_filename).stem
+    for variant, content in rendered.items():
+        stored, blob_id = await store_upload(
+            session, storage, io.BytesIO(content), f"{stem}.{variant}.webp", "image/webp"
+        )
+        variants[variant] = _variant_attachment(source, variant, stored, blob_id)
+    return variants
+
+
+async def generate_variants(attachment_id: int, executor: Executor, storage: Optional[Storage] = None) -> bool:
+    """
+    Create and link the thumbnail and WebP variant of an image attachment.
+    Returns False when the attachment needs none (or already has them).
+    """
+    storage = storage or get_storage()
+    async with async_session() as session:
+        source = await session.get(Attachment, attachment_id)
+        if not needs_variants(source):
+            return False
+
+        variants = await _reuse_variants(session, source)
+        if variants is None:
+            variants = await _render_variants(session, storage, source, executor)
+
+        session.add_all(variants.values())
+        await session.flush()
+        source.thumbnail_attachment_id = variants[THUMBNAIL].id
+        source.webp_attachment_id = variants[WEBP].id
+        await session.execute(
+            update(TopographicSymbol)
+            .where(
+                TopographicSymbol.attachment_id == source.id,
+                TopographicSymbol.thumbnail_attachment_id.is_(None),
+            )
+            .values(thumbnail_attachment_id=variants[THUMBNAIL].id)
+        )
+        await session.commit()
+    return True
+
+
+def create_executor(workers: int) -> ProcessPoolExecutor:
+    # Spawned rather than forked: the API process runs other thread pools
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+class ThumbnailPipeline:
+    """Queue of attachments waiting for variants, drained by background tasks."""
+
+    def __init__(self, workers: int = THUMBNAIL_WORKERS):
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        if self.workers <= 0 or self._tasks:
+            return
+        if find_spec("PIL") is None:
+            logger.warning("Pillow is not installed, image thumbnails are disabled (pip install Pillow)")
+            return
+        self._executor = create_executor(self.workers)
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._queue = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def enqueue(self, attachment: Attachment) -> None:
+        """Schedule variant generation for a committed attachment, if it is an image."""
+        if self._queue is not None and needs_variants(attachment):
+            self._queue.put_nowait(attachment.id)
+
+    async def join(self) -> None:
+        """Wait until every queued attachment has been processed."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _consume(self) -> None:
+        while True:
+            attachment_id = await self._queue.get()
+            try:
+                await generate_variants(attachment_id, self._executor)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.error(f"Thumbnail generation failed for attachment {attachment_id}: {exc}")
+            finally:
+                self._queue.task_done()
+
+
+thumbnail_pipeline = ThumbnailPipeline()